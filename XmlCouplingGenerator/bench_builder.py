@@ -0,0 +1,67 @@
+#################### COUPLING BUILDER SCALING BENCHMARK ####################
+# Time append_coupled_fields on synthetic couplings of increasing size.
+# With the indexed CouplingBuilder the time per coupling should stay flat,
+# i.e. the total time grows linearly with the number of coupled fields.
+#
+# Usage: python bench_builder.py [n_components]
+
+import contextlib
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from coupling_table import Coupling
+from generator import generate_initial_context, append_coupled_fields, create_standard_temporal_params
+
+N_COUPLINGS_LIST = [1000, 2000, 4000, 8000, 16000, 32000, 64000]
+
+
+def synthetic_couplings(n_couplings, components, temporal):
+    """Create n_couplings fields exchanged round-robin between the components."""
+    n_comp = len(components)
+    fields = []
+    for i in range(n_couplings):
+        sender_field = f"SRC{i}"
+        receiver_field = f"DST{i}"
+        fields.append(Coupling(
+            sender_context=components[i % n_comp],
+            receiver_context=components[(i + 1) % n_comp],
+            sender_field=sender_field,
+            receiver_field=receiver_field,
+            restart_field=f"{receiver_field}_restart",
+            restart_file_name="zero_restart_file",
+            restart_field_in_file="zero_restart",
+            output_file_name=f"{sender_field}_next",
+            cpl_interface=f"{sender_field}_to_{receiver_field}",
+            temporal_params=temporal))
+    return fields
+
+
+def time_append(n_couplings, components, temporal):
+    root = ET.Element("simulation")
+    for comp in components:
+        root.append(generate_initial_context(context_id=comp, timestep="3600s", total_duration="1d", all_components=components))
+    fields = synthetic_couplings(n_couplings, components, temporal)
+
+    # Silence the per-field progress messages
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        append_coupled_fields(root, fields)
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+if __name__ == "__main__":
+    n_components = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    components = [f"comp{c}" for c in range(n_components)]
+    temporal = create_standard_temporal_params(
+                total_duration="1d",
+                coupler_send_freq_op="1ts",
+                coupler_recv_freq_op="1ts",
+                operation="instant")
+
+    print(f"{'couplings':>10} {'time (s)':>10} {'us/coupling':>12}")
+    for n_couplings in N_COUPLINGS_LIST:
+        elapsed = time_append(n_couplings, components, temporal)
+        print(f"{n_couplings:>10} {elapsed:>10.3f} {1e6 * elapsed / n_couplings:>12.2f}")
@@ -0,0 +1,215 @@
+#################### XML COUPLING GENERATOR BENCHMARK SUITE ####################
+# Time the stages of generate_xml on synthetic cmip6.csv-shaped tables:
+#   parse      read_coupled_fields_from_csv
+#   table      CouplingTable.from_columns
+#   build      build_component_context (with the referenced grids only)
+#   serialize  serialize_element, and the writes of the IodefWriter
+# build and serialize are summed over the contexts, which are processed by
+# the --workers pool as in write_iodef, so with workers > 1 they add up the
+# time of all the processes; total_time is the wall-clock time of the run.
+# The peak Python memory of every case is also recorded (of the main process
+# only when workers > 1). The results are written to a CSV and can be
+# plotted with make_generator_plot().
+#
+# Used as a regression gate, the run fails (exit code 1) if a case is slower
+# than the same case of a baseline CSV by more than the given tolerance:
+#   python bench_generator.py --results new.csv --baseline old.csv --tolerance 0.25
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from coupling_table import CouplingTable
+from generator import (build_component_context, component_context_tasks, create_standard_temporal_params,
+                       generate_xios_context)
+from parse_csv import read_coupled_fields_from_csv
+from xml_writer import IodefWriter, serialize_element
+
+COMPONENTS_LIST = [2, 10, 50, 100, 500]
+COUPLINGS_LIST = [10, 100, 1000, 10000, 100000]
+STAGES = ["parse", "table", "build", "serialize"]
+
+
+def write_synthetic_csv(path, n_components, n_couplings):
+    """Write a table of n_couplings fields spread round-robin over n_components."""
+    with open(path, "w") as f:
+        f.write("src_var,dst_var,src_comp,dst_comp\n")
+        for i in range(n_couplings):
+            sender = i % n_components
+            # Cycle over all the other components as receivers
+            receiver = (sender + 1 + (i // n_components) % (n_components - 1)) % n_components
+            f.write(f"SRC{i},DST{i},comp{sender},comp{receiver}\n")
+
+
+def timed_context(task, level=1):
+    """Build and serialize a component context, return (text, build time, serialize time)."""
+    start = time.perf_counter()
+    context = build_component_context(**task)
+    built = time.perf_counter()
+    text = serialize_element(context, level=level)
+    return text, built - start, time.perf_counter() - built
+
+
+def run_stages(csv_path, output_path, workers=1):
+    """Run the generator stages on csv_path and return their durations in seconds."""
+    times = {}
+    run_start = start = time.perf_counter()
+    coupled_fields = read_coupled_fields_from_csv(path=csv_path)
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    temporal = create_standard_temporal_params(
+                total_duration="1d",
+                coupler_send_freq_op="1ts",
+                coupler_recv_freq_op="1ts",
+                operation="instant")
+    coupling_params = CouplingTable.from_columns(coupled_fields.columns, temporal)
+    times["table"] = time.perf_counter() - start
+
+    # Same contexts and pool as write_iodef, timed context by context
+    tasks = list(component_context_tasks(coupled_fields.components, coupling_params, "3600s", "1d").values())
+    times["build"] = times["serialize"] = 0.0
+    with contextlib.ExitStack() as stack:
+        if workers > 1 and len(tasks) > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            results = pool.map(timed_context, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+        else:
+            results = map(timed_context, tasks)
+
+        with IodefWriter(output_path) as writer:
+            for text, build_time, serialize_time in results:
+                times["build"] += build_time
+                start = time.perf_counter()
+                writer.write_text(text)
+                times["serialize"] += serialize_time + time.perf_counter() - start
+            start = time.perf_counter()
+            writer.write_context(generate_xios_context())
+        times["serialize"] += time.perf_counter() - start
+
+    times["total"] = time.perf_counter() - run_start
+    return times
+
+
+def run_case(n_components, n_couplings, workdir, workers=1):
+    csv_path = os.path.join(workdir, f"couplings_c{n_components}_n{n_couplings}.csv")
+    output_path = os.path.join(workdir, "coupling_config.xml")
+    write_synthetic_csv(csv_path, n_components, n_couplings)
+
+    # Silence the progress messages of the generator
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        times = run_stages(csv_path, output_path, workers)
+
+        # Second run under tracemalloc, which would distort the timings
+        tracemalloc.start()
+        run_stages(csv_path, output_path, workers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    record = {"components": n_components, "couplings": n_couplings, "workers": workers}
+    for stage in STAGES:
+        record[f"{stage}_time"] = times[stage]
+    record["total_time"] = times["total"]
+    record["peak_mem_mb"] = peak / 2**20
+    record["xml_size_mb"] = os.path.getsize(output_path) / 2**20
+    return record
+
+
+def run_suite(components_list, couplings_list, results_csv, workers=1):
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_components in components_list:
+            for n_couplings in couplings_list:
+                record = run_case(n_components, n_couplings, workdir, workers)
+                print(f"components={n_components:>4} couplings={n_couplings:>7} "
+                      + " ".join(f"{stage}={record[stage + '_time']:.3f}s" for stage in STAGES)
+                      + f" peak={record['peak_mem_mb']:.1f}MB")
+                records.append(record)
+
+    df = pd.DataFrame(records)
+    if os.path.dirname(results_csv):
+        os.makedirs(os.path.dirname(results_csv), exist_ok=True)
+    df.to_csv(results_csv, index=False)
+    return df
+
+
+# Compare the results with a baseline CSV of the same suite.
+# @param tolerance: Allowed relative slowdown (0.25 = 25%) on the total time and peak memory
+# @param min_time: Cases faster than this (seconds) in the baseline are too noisy to be checked
+# @return list of the regressions found, empty if none
+def check_regressions(df, baseline_csv, tolerance, min_time=0.05):
+    baseline = pd.read_csv(baseline_csv)
+    # Runs with other worker counts are not comparable
+    merged = df.merge(baseline, on=["components", "couplings", "workers"], suffixes=("", "_baseline"))
+    if merged.empty:
+        return [f"no case of {baseline_csv} has the same components, couplings and workers"]
+
+    regressions = []
+    for metric in ["total_time", "peak_mem_mb"]:
+        ref = merged[metric + "_baseline"]
+        slower = merged[metric] > ref * (1 + tolerance)
+        if metric == "total_time":
+            slower &= ref >= min_time
+        columns = ["components", "couplings", "workers", metric, metric + "_baseline"]
+        for components, couplings, workers, value, baseline in merged.loc[slower, columns].itertuples(index=False):
+            regressions.append(
+                f"components={components} couplings={couplings} workers={workers}: "
+                f"{metric} {value:.3f} > {baseline:.3f} * (1 + {tolerance})")
+    return regressions
+
+
+def make_generator_plot(df, title, save_path):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    for n_components, group in df.groupby("components"):
+        plt.plot(
+            group["couplings"], group["total_time"],
+            'o-',
+            label=f"{n_components} components"
+        )
+
+    plt.xlabel('Coupled fields')
+    plt.ylabel('Time (seconds)')
+    plt.title(title)
+    plt.xscale('log')
+    plt.yscale('log')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(save_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the XML coupling generator on synthetic coupling tables.")
+    parser.add_argument("--components", type=int, nargs="+", default=COMPONENTS_LIST, help="Numbers of components")
+    parser.add_argument("--couplings", type=int, nargs="+", default=COUPLINGS_LIST, help="Numbers of coupled fields")
+    parser.add_argument("--results", default="bench_results/generator_results.csv", help="Output CSV")
+    parser.add_argument("--plot", help="Save a plot of the total time to this path")
+    parser.add_argument("--baseline", help="Baseline CSV to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown w.r.t. the baseline")
+    parser.add_argument("--workers", type=int, default=1, help="Processes building the component contexts (0: one per core)")
+    args = parser.parse_args()
+
+    if min(args.components) < 2:
+        parser.error("At least two components are needed to couple fields")
+
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    df = run_suite(args.components, args.couplings, args.results, workers)
+
+    if args.plot:
+        make_generator_plot(df, "XML coupling generator scaling", save_path=args.plot)
+
+    if args.baseline:
+        regressions = check_regressions(df, args.baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        if regressions:
+            sys.exit(1)
+        print("No regression w.r.t.", args.baseline)
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TemporalParams:
+    operation: str
+    sampling_freq_op: str
+    sampling_freq_offset: str
+    coupler_send_freq_op: str
+    coupler_restart_send_freq_op: str
+    coupler_recv_freq_op: str
+    coupler_recv_freq_offset: str
+    coupler_restart_recv_freq_op: str
+    coupler_restart_recv_freq_offset: str
+    file_output_freq: str
+    file_restart_output_freq: str
+    file_restart_record_offset: str
+    # Restart records read, sent and received once each, one coupling period apart (the lag)
+    restart_exchanges: int = 1
+
+
+COLUMNS = (
+    "sender_context",
+    "receiver_context",
+    "sender_field",
+    "receiver_field",
+    "restart_field",
+    "restart_file_name",
+    "restart_field_in_file",
+    "output_file_name",
+    "cpl_interface",
+    "temporal_params",
+)
+
+# How the output (_next) files of the couplings are aggregated
+OUTPUT_FILE_POLICIES = ("field", "context", "frequency")
+
+
+class Coupling:
+    """Parameters of one coupled field, as consumed by CouplingBuilder."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, sender_context, receiver_context, sender_field, receiver_field,
+                 restart_field, restart_file_name, restart_field_in_file,
+                 output_file_name, cpl_interface, temporal_params):
+        self.sender_context = sender_context
+        self.receiver_context = receiver_context
+        self.sender_field = sender_field
+        self.receiver_field = receiver_field
+        self.restart_field = restart_field
+        self.restart_file_name = restart_file_name
+        # None: the restart field is read from the file under its own name
+        self.restart_field_in_file = restart_field_in_file
+        self.output_file_name = output_file_name
+        self.cpl_interface = cpl_interface
+        self.temporal_params = temporal_params
+
+    @property
+    def grid_ref(self):
+        """Grid of the coupled field, the 2-D grid of the sender."""
+        return "grid_2D_" + self.sender_context
+
+    def __repr__(self):
+        return f"Coupling({self.sender_context}:{self.sender_field} -> {self.receiver_context}:{self.receiver_field})"
+
+
+class CouplingTable:
+    """
+    Coupling parameters stored column-wise, one list per Coupling attribute.
+
+    Iterating over the table yields Coupling records, which are created on
+    the fly from the columns.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, **columns):
+        lengths = {len(columns[name]) for name in COLUMNS}
+        if len(lengths) > 1:
+            raise ValueError(f"All columns must have the same length, got {sorted(lengths)}")
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_columns(cls, columns, temporal_params,
+                     restart_file_name="zero_restart_file",
+                     restart_field_in_file="zero_restart"):
+        """
+        Build the table from lists of already stripped values keyed by the CSV
+        column names, as read by parse_csv.read_coupled_fields_from_csv.
+        """
+        src_var = columns['src_var']
+        dst_var = columns['dst_var']
+        n = len(src_var)
+
+        return cls(
+            sender_context=columns['src_comp'],
+            receiver_context=columns['dst_comp'],
+            sender_field=src_var,
+            receiver_field=dst_var,
+            restart_field=[f"{dst}_restart" for dst in dst_var],
+            restart_file_name=[restart_file_name] * n,
+            restart_field_in_file=[restart_field_in_file] * n,
+            output_file_name=[f"{src}_next" for src in src_var],
+            cpl_interface=[f"{src}_to_{dst}" for src, dst in zip(src_var, dst_var)],
+            temporal_params=[temporal_params] * n,
+        )
+
+    def aggregate_output_files(self, policy):
+        """
+        Set the output file of every coupling following the policy:
+          field      one <sender_field>_next file per coupled field
+          context    one <sender_context>_next file per sending context
+          frequency  one <sender_context>_next_<output_freq> file per sending
+                     context and output frequency
+        """
+        if policy == "field":
+            names = [f"{src}_next" for src in self.sender_field]
+        elif policy == "context":
+            names = [f"{comp}_next" for comp in self.sender_context]
+        elif policy == "frequency":
+            names = [f"{comp}_next_{temporal.file_output_freq}"
+                     for comp, temporal in zip(self.sender_context, self.temporal_params)]
+        else:
+            raise ValueError(f"Unknown output file policy '{policy}', expected one of {OUTPUT_FILE_POLICIES}")
+        self.output_file_name = names
+
+    def __len__(self):
+        return len(self.sender_context)
+
+    def __iter__(self):
+        return map(Coupling, *(getattr(self, name) for name in COLUMNS))
@@ -1,34 +1,21 @@
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
-from dataclasses import dataclass
-from parse_csv import parse_coupled_fields_from_csv, generate_fortran_labels
-
-
-def prettify(elem):
-    """Return a pretty-printed XML string for the Element."""
-    rough_string = ET.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="    ")
-
-@dataclass
-class TemporalParams:
-    operation: str
-    sampling_freq_op: str
-    sampling_freq_offset: str
-    coupler_send_freq_op: str
-    coupler_restart_send_freq_op: str
-    coupler_recv_freq_op: str
-    coupler_recv_freq_offset: str
-    coupler_restart_recv_freq_op: str
-    coupler_restart_recv_freq_offset: str
-    file_output_freq: str
-    file_restart_output_freq: str
-    file_restart_record_offset: str
-
-def generate_initial_context(context_id, timestep, total_duration, all_components):
+from parse_csv import read_coupled_fields_from_csv, generate_fortran_labels
+from xml_writer import IodefWriter, serialize_element
+from coupling_table import CouplingTable, TemporalParams, OUTPUT_FILE_POLICIES
+from temporal_planner import plan_coupling_table, restart_exchange_id, shift_offset
+from xios_server import ServerTopology, load_server_topology
+from stacking import stack_couplings, is_stacked, restart_couplings
+from incremental import IncrementalContexts, context_digest
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def generate_initial_context(context_id, timestep, total_duration, all_components,
+                             ni_glo="10", nj_glo="10", calendar="Gregorian", domain_type="rectilinear"):
     """Create a context element with basic structure."""
     context = ET.Element("context", id=context_id)
-    ET.SubElement(context, "calendar", type="Gregorian", time_origin="2025-01-01", start_date="2025-01-01")
+    ET.SubElement(context, "calendar", type=calendar, time_origin="2025-01-01", start_date="2025-01-01")
 
     grid_def = ET.SubElement(context, "grid_definition")
     for comp in all_components:
@@ -40,9 +27,9 @@ def generate_initial_context(context_id, timestep, total_duration, all_component
     variables = [
         ("toymodel_timestep_duration", timestep),
         ("toymodel_duration", total_duration),
-        ("toymodel_ni_glo", "10"),
-        ("toymodel_nj_glo", "10"),
-        ("toymodel_type", "rectilinear"),
+        ("toymodel_ni_glo", str(ni_glo)),
+        ("toymodel_nj_glo", str(nj_glo)),
+        ("toymodel_type", domain_type),
     ]
     for var_id, value in variables:
         ET.SubElement(var_def, "variable", id=var_id).text = value
@@ -53,137 +40,344 @@ def generate_initial_context(context_id, timestep, total_duration, all_component
     ET.SubElement(context, "file_definition")
     return context
 
-def append_coupled_fields(root, user_fields):
-    """Append coupled field definitions and related elements to the XML tree."""
-    for field in user_fields:
-        context_sender = root.find(f"context[@id='{field['sender_context']}']")
-        context_receiver = root.find(f"context[@id='{field['receiver_context']}']")
-        field_def_sender = context_sender.find("field_definition")
-        field_def_receiver = context_receiver.find("field_definition")
-        coupler_out_def = context_sender.find("coupler_out_definition")
-        coupler_in_def = context_receiver.find("coupler_in_definition")
-        file_definition = context_sender.find("file_definition")
-
-        # Field definitions
+class ContextIndex:
+    """Direct references to the sub-definitions of a context element."""
+
+    def __init__(self, context):
+        self.context = context
+        self.grid_definition = context.find("grid_definition")
+        # Only present when a stacked coupling needs an axis
+        self.axis_definition = context.find("axis_definition")
+        self.field_definition = context.find("field_definition")
+        self.coupler_out_definition = context.find("coupler_out_definition")
+        self.coupler_in_definition = context.find("coupler_in_definition")
+        self.file_definition = context.find("file_definition")
+        # Files already defined in the context, by id
+        self.files = {f.get("id"): f for f in self.file_definition.findall("file")}
+
+
+class CouplingBuilder:
+    """
+    Append coupled fields to a simulation tree in constant time per coupling.
+
+    The contexts and their files are indexed once by id, so no XPath scan of
+    the tree is needed when a coupling is added.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.contexts = {}
+        for context in root.findall("context"):
+            self.contexts[context.get("id")] = ContextIndex(context)
+
+    def add_context(self, context):
+        """Append a context element to the tree and index it."""
+        self.root.append(context)
+        self.contexts[context.get("id")] = ContextIndex(context)
+
+    def add_coupling(self, field):
+        """Add both sides of a coupling to the sender and receiver contexts."""
+        sender = self.contexts[field.sender_context]
+        receiver = self.contexts[field.receiver_context]
+        self.add_sender_side(sender, field)
+        self.add_receiver_side(receiver, field)
+
+    @staticmethod
+    def add_stack_grid(index, stack):
+        """Define the field index axis and the 3-D grid of a stacked coupling."""
+        if index.axis_definition is None:
+            # Axes are defined before the grids using them
+            position = list(index.context).index(index.grid_definition)
+            index.axis_definition = ET.Element("axis_definition")
+            index.context.insert(position, index.axis_definition)
+
+        ET.SubElement(index.axis_definition, "axis", id=stack.axis_id, n_glo=str(len(stack)))
+        grid = ET.SubElement(index.grid_definition, "grid", id=stack.grid_ref)
+        ET.SubElement(grid, "domain", domain_ref=stack.domain_ref)
+        ET.SubElement(grid, "axis", axis_ref=stack.axis_id)
+
+    @staticmethod
+    def add_sender_side(sender, field):
+        """Add the source field, coupler_out, restart and output files of a coupling."""
+        if is_stacked(field):
+            CouplingBuilder.add_stack_grid(sender, field)
+
+        # Field definition
         ET.SubElement(
-            field_def_sender, "field",
-            id=field['sender_field'],
-            grid_ref="grid_2D_"+field['sender_context'],
-            operation=field['temporal_params'].operation,
-            freq_op=field['temporal_params'].sampling_freq_op,
-            freq_offset=field['temporal_params'].sampling_freq_offset
+            sender.field_definition, "field",
+            id=field.sender_field,
+            grid_ref=field.grid_ref,
+            operation=field.temporal_params.operation,
+            freq_op=field.temporal_params.sampling_freq_op,
+            freq_offset=field.temporal_params.sampling_freq_offset
         )
 
-        ET.SubElement(
-            field_def_receiver, "field",
-            id=field['receiver_field'],
-            field_ref=field['cpl_interface']
-        )
-
-        # Coupler out/in
+        # Coupler out
         coupler_out = ET.SubElement(
-            coupler_out_def, "coupler_out",
-            context=f"{field['receiver_context']}::{field['receiver_context']}"
+            sender.coupler_out_definition, "coupler_out",
+            context=f"{field.receiver_context}::{field.receiver_context}"
         )
 
         ET.SubElement(
             coupler_out, "field",
-            id=field['cpl_interface'],
-            field_ref=field['sender_field'],
-            freq_op=field['temporal_params'].coupler_send_freq_op,
+            id=field.cpl_interface,
+            field_ref=field.sender_field,
+            freq_op=field.temporal_params.coupler_send_freq_op,
             expr="@this_ref"
         )
-        coupler_in = ET.SubElement(
-            coupler_in_def, "coupler_in",
-            context=f"{field['sender_context']}::{field['sender_context']}"
-        )
-        ET.SubElement(
-            coupler_in, "field",
-            id=field['cpl_interface'],
-            grid_ref="grid_2D_" + field['sender_context'],
-            freq_op=field['temporal_params'].coupler_recv_freq_op,
-            freq_offset=field['temporal_params'].coupler_recv_freq_offset,
-            read_access="true"
-        )
 
-        # Restart fields
-        file_field_name = field['restart_field'] + "_read"
-        ET.SubElement(
-            coupler_out, "field",
-            id=field['restart_field'],
-            field_ref=file_field_name,
-            freq_op="1y"
-        )
-
-        ET.SubElement(
-            coupler_in, "field",
-            id=field['restart_field'],
-            grid_ref="grid_2D_" + field['sender_context'],
-            freq_op="1y",
-            freq_offset="1ts",
-            read_access="true"
-        )
+        # Restart fields, one per level of a stack and per restart record (lag)
+        temporal = field.temporal_params
+        for k in range(temporal.restart_exchanges):
+            for member in restart_couplings(field):
+                restart_field = ET.SubElement(
+                    coupler_out, "field",
+                    id=restart_exchange_id(member.restart_field, k),
+                    field_ref=restart_exchange_id(member.restart_field, k) + "_read",
+                    freq_op=temporal.coupler_restart_send_freq_op
+                )
+                if k > 0:
+                    # Sent k coupling periods after the first record
+                    restart_field.set("freq_offset", shift_offset("0ts", k, temporal.coupler_send_freq_op))
 
         # RESTART file definition ---------------------------------------------------
 
-        # Restart file (add only if not already present)
-        if not any(f.get("id") == field["restart_file_name"] for f in file_definition.findall("file")):
-            file = ET.SubElement(
-                file_definition, "file",
-                id=field["restart_file_name"],
-                name=field["restart_file_name"],
-                enabled="true",
+        for k in range(temporal.restart_exchanges):
+            # Restart file, one per record read (add only if not already present)
+            file_id = restart_exchange_id(field.restart_file_name, k)
+            file = sender.files.get(file_id)
+            if file is None:
+                file = ET.SubElement(
+                    sender.file_definition, "file",
+                    id=file_id,
+                    name=field.restart_file_name,
+                    enabled="true",
+                    type="one_file",
+                    output_freq=temporal.file_restart_output_freq,
+                    record_offset=str(int(temporal.file_restart_record_offset) + k),
+                    mode="read"
+                )
+                sender.files[file_id] = file
+
+            for member in restart_couplings(field):
+                # If specified, use the restart field in the file
+                if member.restart_field_in_file is not None:
+                    field_in_restart_file = member.restart_field_in_file
+                else:
+                    field_in_restart_file = member.restart_field
+
+                file_field_name = restart_exchange_id(member.restart_field, k) + "_read"
+                print(f"Adding restart field {file_field_name} to file {file_id} in context {field.sender_context}") 
+                # Add restart field to the file
+                read_field = ET.SubElement(
+                    file, "field",
+                    id=file_field_name,
+                    name=field_in_restart_file,
+                    grid_ref=member.grid_ref,
+                    operation="instant",
+                    read_access="true"
+                )
+                if k > 0:
+                    # Read when it is sent
+                    read_field.set("freq_offset", shift_offset("0ts", k, temporal.coupler_send_freq_op))
+
+        # OUTPUT file -----------------------------------------------------------------
+
+        # Output file (shared by the couplings aggregated under the same name)
+        output_file = sender.files.get(field.output_file_name)
+        if output_file is None:
+            output_file = ET.SubElement(
+                sender.file_definition, "file",
+                id=field.output_file_name,
+                name=field.output_file_name,
+                output_freq=field.temporal_params.file_output_freq,
                 type="one_file",
-                output_freq=field['temporal_params'].file_restart_output_freq,
-                record_offset=field['temporal_params'].file_restart_record_offset,
-                mode="read"
+                enabled="true",
+                append="false"
             )
-        else:
-            file = file_definition.find(f"file[@id='{field['restart_file_name']}']")
-
-        # If specified, use the restart field in the file
-        if 'restart_field_in_file' in field:
-            field_in_restart_file = field['restart_field_in_file']
-        else:
-            field_in_restart_file = field['restart_field']
+            sender.files[field.output_file_name] = output_file
+        elif output_file.get("output_freq") != field.temporal_params.file_output_freq:
+            raise ValueError(
+                f"Output file {field.output_file_name} in context {field.sender_context} "
+                f"aggregates fields with output_freq {output_file.get('output_freq')} and "
+                f"{field.temporal_params.file_output_freq}, aggregate the files per frequency instead")
 
-        print(f"Adding restart field {file_field_name} to file {field['restart_file_name']} in context {field['sender_context']}") 
-        # Add restart field to the file
         ET.SubElement(
-            file, "field",
-            id=file_field_name,
-            name=field_in_restart_file,
-            grid_ref="grid_2D_" + field['sender_context'],
-            operation="instant",
-            read_access="true"
+            output_file, "field",
+            field_ref=field.cpl_interface,
+            name=field.cpl_interface
         )
 
-        # OUTPUT file -----------------------------------------------------------------
-        output_file = ET.SubElement(
-            file_definition, "file",
-            id=field['output_file_name'],
-            name=field['output_file_name'],
-            output_freq=field['temporal_params'].file_output_freq,
-            type="one_file",
-            enabled="true",
-            append="false"
+    @staticmethod
+    def add_receiver_side(receiver, field):
+        """Add the destination field and coupler_in of a coupling."""
+        # A context receiving its own stack already has the grid from the sender side
+        if is_stacked(field) and field.sender_context != receiver.context.get("id"):
+            CouplingBuilder.add_stack_grid(receiver, field)
+
+        # Field definition
+        ET.SubElement(
+            receiver.field_definition, "field",
+            id=field.receiver_field,
+            field_ref=field.cpl_interface
         )
 
+        # Coupler in
+        coupler_in = ET.SubElement(
+            receiver.coupler_in_definition, "coupler_in",
+            context=f"{field.sender_context}::{field.sender_context}"
+        )
         ET.SubElement(
-            output_file, "field",
-            field_ref=field['cpl_interface'],
-            name=field['cpl_interface']
+            coupler_in, "field",
+            id=field.cpl_interface,
+            grid_ref=field.grid_ref,
+            freq_op=field.temporal_params.coupler_recv_freq_op,
+            freq_offset=field.temporal_params.coupler_recv_freq_offset,
+            read_access="true"
         )
 
+        # Restart fields, one per level of a stack and per restart record (lag)
+        temporal = field.temporal_params
+        for k in range(temporal.restart_exchanges):
+            for member in restart_couplings(field):
+                ET.SubElement(
+                    coupler_in, "field",
+                    id=restart_exchange_id(member.restart_field, k),
+                    grid_ref=member.grid_ref,
+                    freq_op=temporal.coupler_restart_recv_freq_op,
+                    # Record k is received at the beginning of period k
+                    freq_offset=shift_offset(temporal.coupler_restart_recv_freq_offset, k, temporal.coupler_recv_freq_op),
+                    read_access="true"
+                )
+
+
+def append_coupled_fields(root, user_fields):
+    """Append coupled field definitions and related elements to the XML tree."""
+    builder = CouplingBuilder(root)
+    for field in user_fields:
+        builder.add_coupling(field)
+
     return root
 
-def generate_xios_context():
-    """Generate the default XIOS context."""
+def couplings_by_context(user_fields):
+    """Group the couplings by the contexts they touch, keeping their order."""
+    groups = {}
+    for field in user_fields:
+        groups.setdefault(field.sender_context, []).append(field)
+        if field.receiver_context != field.sender_context:
+            groups.setdefault(field.receiver_context, []).append(field)
+    return groups
+
+def referenced_components(context_id, all_components, user_fields):
+    """
+    Return the components whose grid is referenced in the context: its own
+    grid, used by the fields it sends and by its restart file, and the grids
+    of the senders it receives from, used by its coupler_in fields.
+    """
+    referenced = {context_id}
+    for field in user_fields:
+        if field.receiver_context == context_id:
+            referenced.add(field.sender_context)
+    return [comp for comp in all_components if comp in referenced]
+
+def build_component_context(context_id, timestep, total_duration, all_components, user_fields, all_grids=False, context_params=None,
+                            server_topology=None):
+    """
+    Create a complete context from the couplings in which it takes part.
+
+    context_params are passed to generate_initial_context (grid size,
+    calendar, domain type). The restart and _next files are routed to the
+    I/O services of server_topology, if given.
+
+    Unless all_grids is set, only the grids and domains referenced by the
+    context are defined, instead of one per component. Otherwise the result
+    is the same as the corresponding context built by append_coupled_fields
+    on the whole tree, so contexts can be built and written one at a time.
+    """
+    if not all_grids:
+        all_components = referenced_components(context_id, all_components, user_fields)
+    context = generate_initial_context(context_id, timestep, total_duration, all_components, **(context_params or {}))
+    index = ContextIndex(context)
+    for field in user_fields:
+        if field.sender_context == context_id:
+            CouplingBuilder.add_sender_side(index, field)
+        if field.receiver_context == context_id:
+            CouplingBuilder.add_receiver_side(index, field)
+
+    if server_topology is not None:
+        for file in index.files.values():
+            file.attrib.update(server_topology.file_attributes(file.get("mode", "write")))
+    return context
+
+def context_inputs(task):
+    """
+    The build_component_context arguments of a task that its output depends
+    on: all_components is reduced to the components the context references,
+    so that adding a component only rewrites the contexts coupled to it.
+    """
+    if task["all_grids"]:
+        return task
+    return {**task, "all_components": referenced_components(task["context_id"], task["all_components"], task["user_fields"])}
+
+def component_context_tasks(all_components, coupling_params, timestep, total_duration, context_params=None,
+                            all_grids=False, timesteps=None, server_topology=None):
+    """Arguments of build_component_context for every component, as {component: kwargs}."""
+    groups = couplings_by_context(coupling_params)
+    return {
+        comp_name: dict(
+            context_id=comp_name,
+            timestep=(timesteps or {}).get(comp_name, timestep),
+            total_duration=total_duration,
+            all_components=all_components,
+            user_fields=groups.get(comp_name, []),
+            all_grids=all_grids,
+            context_params=context_params,
+            server_topology=server_topology)
+        for comp_name in all_components
+    }
+
+def serialize_component_context(task, level):
+    """Build a component context from its build_component_context arguments and serialize it."""
+    return serialize_element(build_component_context(**task), level=level)
+
+def serialize_component_contexts(tasks, level, workers=1):
+    """
+    Yield the serialized component contexts, in the order of the tasks.
+
+    With workers > 1 the contexts are built and serialized by a process pool,
+    and the results are merged back in task order, so the output does not
+    depend on which worker finishes first.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield serialize_component_context(task, level)
+        return
+
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(serialize_component_context, tasks, [level] * len(tasks), chunksize=chunksize)
+
+def generate_xios_context(topology=None):
+    """
+    Generate the XIOS context, with the server layout and parameters of
+    topology (a xios_server.ServerTopology, by default attached mode with
+    the p2p transport).
+    """
+    if topology is None:
+        topology = ServerTopology()
+
     xios = ET.Element("context", id="xios")
     var_def = ET.SubElement(xios, "variable_definition")
     var_grp = ET.SubElement(var_def, "variable_group", id="parameters")
-    ET.SubElement(var_grp, "variable", id="print_file", type="bool").text = "true"
-    ET.SubElement(var_grp, "variable", id="transport_protocol", type="string").text = "p2p"
+    for var_id, var_type, value in topology.variables():
+        ET.SubElement(var_grp, "variable", id=var_id, type=var_type).text = value
+
+    if topology.pools:
+        pool_def = ET.SubElement(xios, "pool_definition")
+        for pool in topology.pools:
+            pool_elem = ET.SubElement(pool_def, "pool", name=pool.name, nprocs=str(pool.nprocs))
+            for service in pool.services:
+                ET.SubElement(pool_elem, "service", name=service.name, nprocs=str(service.nprocs), type=service.type)
     return xios
 
 def create_standard_temporal_params( 
@@ -206,10 +400,11 @@ def create_standard_temporal_params(
         sampling_freq_op=sampling_freq_op,
         sampling_freq_offset=sampling_freq_offset,
         coupler_send_freq_op=coupler_send_freq_op,
-        coupler_restart_send_freq_op=total_duration,
+        # Restart field sent and received once, at the first timestep
+        coupler_restart_send_freq_op="1y",
         coupler_recv_freq_op=coupler_recv_freq_op,
         coupler_recv_freq_offset=add_ts_string(coupler_recv_freq_op, 1),
-        coupler_restart_recv_freq_op="100000y",
+        coupler_restart_recv_freq_op="1y",
         coupler_restart_recv_freq_offset="1ts",
         file_output_freq=total_duration,
         file_restart_output_freq="100000y",
@@ -217,17 +412,87 @@ def create_standard_temporal_params(
     )
 
 
-def generate_xml():
+def write_iodef(output_path, all_components, coupling_params, timestep, total_duration,
+                context_params=None, incremental=False, contexts_dir="contexts", workers=1, all_grids=False,
+                timesteps=None, server_topology=None):
+    """
+    Write the iodef of the given components and couplings, one context at a time.
+
+    server_topology (a xios_server.ServerTopology) describes the XIOS
+    servers, transport and logging written in the xios context.
 
-    all_components, df = parse_coupled_fields_from_csv(path="cmip6.csv")
-    generate_fortran_labels(all_components, df)
+    timesteps optionally maps components to their own timestep, the others
+    use timestep.
 
-    total_duration = "1d" 
+    With incremental=True, every component context goes to its own file in
+    contexts_dir, included by output_path with src=, and a file is rewritten
+    only when the coupling rows or the parameters of its context change.
 
-    root = ET.Element("simulation")
+    Each context only defines the grids it references, unless all_grids is
+    set, in which case every context defines the grids of all components.
 
-    for comp_name in all_components:
-        root.append(generate_initial_context(context_id=comp_name, timestep="3600s", total_duration=total_duration, all_components=all_components))
+    With workers > 1, the component contexts are built and serialized in
+    parallel by a pool of processes.
+    """
+
+    # Build and write one context at a time, following the provided parameters
+    tasks = component_context_tasks(all_components, coupling_params, timestep, total_duration,
+                                    context_params=context_params, all_grids=all_grids, timesteps=timesteps,
+                                    server_topology=server_topology)
+
+    with IodefWriter(output_path) as writer:
+        if not incremental:
+            for text in serialize_component_contexts(list(tasks.values()), level=1, workers=workers):
+                writer.write_text(text)
+        else:
+            contexts = IncrementalContexts(contexts_dir)
+
+            # Hash everything a context depends on, rebuild it only if changed
+            digests = {comp_name: context_digest(*context_inputs(task).values()) for comp_name, task in tasks.items()}
+            changed = [comp_name for comp_name in all_components if not contexts.is_up_to_date(comp_name, digests[comp_name])]
+            texts = serialize_component_contexts([tasks[comp_name] for comp_name in changed], level=0, workers=workers)
+            for comp_name, text in zip(changed, texts):
+                contexts.write(comp_name, digests[comp_name], text)
+            contexts.close(all_components)
+            print(f"Rewritten contexts: {contexts.written}")
+
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            for comp_name in all_components:
+                src = os.path.relpath(contexts.context_file(comp_name), output_dir)
+                writer.write_context(ET.Element("context", id=comp_name, src="./" + src))
+
+        # Append standard XIOS context
+        writer.write_context(generate_xios_context(server_topology))
+
+    print(f"✅ XML written to {output_path}")
+
+def generate_xml(csv_path="cmip6.csv", output_path="coupling_config.xml", incremental=False, contexts_dir="contexts",
+                 workers=1, all_grids=False, stack=False, output_files="field", timestep="3600s", total_duration="1d",
+                 timesteps=None, coupling_period=None, lag=1, restart_records=None, server_topology=None):
+    """
+    Generate the iodef from the coupled fields listed in csv_path.
+
+    output_files sets how the _next output files are aggregated: one file per
+    coupled field ("field"), per sending context ("context") or per sending
+    context and output frequency ("frequency").
+
+    With stack=True, couplings between the same components with the same
+    temporal parameters are exchanged as one 3-D field with a field index
+    axis, and the level of every field in its stack is printed with the
+    Fortran labels.
+
+    By default, fields are exchanged every timestep and received one
+    timestep later. Given a coupling_period, per-component timesteps or a
+    lag > 1 (in coupling periods), the temporal parameters of each coupling
+    are computed by temporal_planner.plan_temporal_params instead, so that
+    receptions can be prefetched lag periods ahead. restart_records is the
+    number of records of the restart file, checked against the lag.
+
+    See write_iodef for the other options.
+    """
+
+    coupled_fields = read_coupled_fields_from_csv(path=csv_path)
+    all_components = coupled_fields.components
 
     # Create standard temporal parameters object 
     temporal = create_standard_temporal_params(
@@ -236,40 +501,45 @@ def generate_xml():
                 coupler_recv_freq_op="1ts",
                 operation="instant")
 
-    coupling_params = []
-    print(df)
-    # Iterate through the DataFrame to create coupling parameters
-    for _, row in df.iterrows():
-        sender_context = row['src_comp'].strip()
-        receiver_context = row['dst_comp'].strip()
-        sender_field = row['src_var'].strip()
-        receiver_field = row['dst_var'].strip()
-        coupling_params.append({
-            "sender_context": sender_context,
-            "receiver_context": receiver_context,
-            "sender_field": sender_field,
-            "receiver_field": receiver_field,
-            "restart_field": f"{receiver_field}_restart",
-            "restart_file_name": "zero_restart_file",
-            "restart_field_in_file": "zero_restart",
-            "output_file_name": f"{sender_field}_next",
-            "cpl_interface":  f"{sender_field}_to_{receiver_field}",
-            "temporal_params": temporal
-        })
-
-
-
-
-    # Append coupled fields to the XML tree following the provided parameters
-    append_coupled_fields(root, coupling_params)
-
-    # Append standard XIOS context
-    root.append(generate_xios_context())
-
-    xml_str = prettify(root)
-    with open("coupling_config.xml", "w") as f:
-        f.write(xml_str)
-    print("✅ XML written to coupling_config.xml")
+    # Build the coupling parameters column-wise
+    coupling_params = CouplingTable.from_columns(coupled_fields.columns, temporal)
+    if coupling_period is not None or timesteps or lag != 1:
+        component_timesteps = {comp_name: (timesteps or {}).get(comp_name, timestep) for comp_name in all_components}
+        plan_coupling_table(coupling_params, component_timesteps, coupling_period or timestep, total_duration,
+                            lag=lag, restart_records=restart_records)
+    coupling_params.aggregate_output_files(output_files)
+    if stack:
+        coupling_params = stack_couplings(coupling_params)
+        generate_fortran_labels(all_components, coupled_fields, stacks=[c for c in coupling_params if is_stacked(c)])
+    else:
+        generate_fortran_labels(all_components, coupled_fields)
+
+    write_iodef(output_path, all_components, coupling_params, timestep, total_duration,
+                incremental=incremental, contexts_dir=contexts_dir, workers=workers, all_grids=all_grids,
+                timesteps=timesteps, server_topology=server_topology)
 
 if __name__ == "__main__":
-    generate_xml()
+    parser = argparse.ArgumentParser(description="Generate the XIOS iodef for the coupled fields of a CSV file.")
+    parser.add_argument("--csv", default="cmip6.csv", help="CSV of coupled fields (src_var,dst_var,src_comp,dst_comp)")
+    parser.add_argument("--output", default="coupling_config.xml", help="Path of the generated iodef")
+    parser.add_argument("--incremental", action="store_true", help="Write one file per context and rewrite only the changed ones")
+    parser.add_argument("--contexts-dir", default="contexts", help="Directory of the per-context files in incremental mode")
+    parser.add_argument("--all-grids", action="store_true", help="Define the grids of all components in every context")
+    parser.add_argument("--stack", action="store_true", help="Exchange the couplings with the same components and frequencies as one 3-D field")
+    parser.add_argument("--output-files", choices=OUTPUT_FILE_POLICIES, default="field", help="One output file per coupled field, per sending context or per sending context and output frequency")
+    parser.add_argument("--timestep", default="3600s", help="Timestep of the models")
+    parser.add_argument("--duration", default="1d", help="Total duration of the run")
+    parser.add_argument("--component-timestep", action="append", default=[], metavar="COMP=TIMESTEP", help="Timestep of a component, if different from --timestep (repeatable)")
+    parser.add_argument("--coupling-period", help="Coupling period (e.g. 6h), a multiple of the timesteps")
+    parser.add_argument("--lag", type=int, default=1, help="Coupling periods between a send and the matching reception")
+    parser.add_argument("--restart-records", type=int, help="Number of records in the restart file")
+    parser.add_argument("--server-config", help="JSON file describing the XIOS servers, transport and logging (see xios_server.py)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes building the component contexts (0: one per core)")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    timesteps = dict(item.split("=", 1) for item in args.component_timestep)
+    server_topology = load_server_topology(args.server_config) if args.server_config else None
+    generate_xml(csv_path=args.csv, output_path=args.output, incremental=args.incremental, contexts_dir=args.contexts_dir, workers=workers, all_grids=args.all_grids, stack=args.stack, output_files=args.output_files, timestep=args.timestep, total_duration=args.duration,
+                 timesteps=timesteps, coupling_period=args.coupling_period, lag=args.lag, restart_records=args.restart_records,
+                 server_topology=server_topology)
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, is_dataclass
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _canonical(value):
+    """Turn the generator inputs into JSON-serializable values."""
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical(v) for v in value]
+        return sorted(items) if isinstance(value, (set, frozenset)) else items
+    if hasattr(value, "__slots__"):
+        return {k: _canonical(getattr(value, k)) for k in value.__slots__}
+    return value
+
+
+def context_digest(*inputs):
+    """Hash of everything a context depends on (coupling rows, temporal params, ...)."""
+    payload = json.dumps(_canonical(list(inputs)), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IncrementalContexts:
+    """
+    Per-context XML files that are rewritten only when their inputs change.
+
+    Each context is written to <contexts_dir>/context_<id>.xml and the digest
+    of its inputs is stored in <contexts_dir>/manifest.json. The top-level
+    iodef includes the files with <context id="..." src="..."/>.
+    """
+
+    def __init__(self, contexts_dir):
+        self.contexts_dir = contexts_dir
+        self.manifest_path = os.path.join(contexts_dir, MANIFEST_FILE)
+        os.makedirs(contexts_dir, exist_ok=True)
+
+        self.digests = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.digests = json.load(f)
+
+        self.written = []
+
+    def context_file(self, context_id):
+        return os.path.join(self.contexts_dir, f"context_{context_id}.xml")
+
+    def is_up_to_date(self, context_id, digest):
+        """Tell whether the file of the context was generated from the same inputs."""
+        return self.digests.get(context_id) == digest and os.path.exists(self.context_file(context_id))
+
+    def write(self, context_id, digest, text):
+        """Write a context serialized at the top level of its own file."""
+        with open(self.context_file(context_id), "w") as f:
+            f.write('<?xml version="1.0" ?>\n')
+            f.write(text)
+        self.digests[context_id] = digest
+        self.written.append(context_id)
+
+    def close(self, context_ids):
+        """Remove the files of the contexts not in context_ids and save the manifest."""
+        context_ids = set(context_ids)
+        for context_id in list(self.digests):
+            if context_id not in context_ids:
+                path = self.context_file(context_id)
+                if os.path.exists(path):
+                    os.remove(path)
+                del self.digests[context_id]
+
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.digests, f, indent=4, sort_keys=True)
@@ -0,0 +1,205 @@
+#################### STREAMING IODEF MERGE ####################
+# Merge the couplings of a CSV file into an existing, possibly hand-written,
+# iodef. The iodef is streamed with ET.iterparse: every top-level element of
+# <simulation> is merged, written and dropped as soon as it has been parsed,
+# so only one context is held in memory at a time. The ids of a context are
+# indexed when it is merged, to add only the grids it lacks and to reject
+# couplings whose ids are already defined.
+#
+# Contexts of components that are not in the iodef are generated as by
+# generator.py, and written before the xios context (or at the end).
+#
+# Usage:
+#   python iodef_merge.py iodef.xml --csv new_couplings.csv --output merged.xml
+
+import argparse
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+
+from coupling_table import CouplingTable, OUTPUT_FILE_POLICIES
+from generator import (ContextIndex, CouplingBuilder, build_component_context, couplings_by_context,
+                       create_standard_temporal_params)
+from parse_csv import read_coupled_fields_from_csv
+from stacking import restart_couplings
+from temporal_planner import restart_exchange_id
+from xml_writer import IodefWriter, open_xml
+
+# Sub-definitions the CouplingBuilder appends to, in the order generated by generator.py
+DEFINITIONS = ("grid_definition", "field_definition", "coupler_out_definition",
+               "coupler_in_definition", "file_definition")
+
+
+def _comment_parser():
+    """XML parser keeping the comments of the hand-written files."""
+    return ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+
+
+def _strip_indentation(elem):
+    """Drop the whitespace-only text of elem, the writer indents the tree again."""
+    for node in elem.iter():
+        if node.text is not None and not node.text.strip():
+            node.text = None
+        if node.tail is not None and not node.tail.strip():
+            node.tail = None
+
+
+def _coupling_ids(context_id, field):
+    """Ids a coupling defines in a context (the files may be shared)."""
+    ids = []
+    restart_fields = [restart_exchange_id(member.restart_field, k)
+                      for k in range(field.temporal_params.restart_exchanges) for member in restart_couplings(field)]
+    if field.sender_context == context_id:
+        ids += [field.sender_field, field.cpl_interface] + restart_fields + [restart + "_read" for restart in restart_fields]
+    if field.receiver_context == context_id:
+        ids += [field.receiver_field, field.cpl_interface] + restart_fields
+    return ids
+
+
+def merge_context(context, fields, base_dir="."):
+    """
+    Add the couplings in fields to an existing context element and return it.
+
+    A context included with src= is loaded from its file (relative to
+    base_dir) and returned inlined. Raise a ValueError listing the ids of
+    the couplings that are already defined in the context.
+    """
+    context_id = context.get("id")
+    if context.get("src") is not None:
+        src = os.path.join(base_dir, context.get("src"))
+        with open_xml(src) as f:
+            context = ET.parse(f, parser=_comment_parser()).getroot()
+        context.set("id", context_id)
+    _strip_indentation(context)
+
+    for tag in DEFINITIONS:
+        if context.find(tag) is None:
+            ET.SubElement(context, tag)
+
+    # Index the ids once, the grids and conflicts are then checked in constant time
+    ids = {node.get("id") for node in context.iter() if node.get("id") is not None}
+    index = ContextIndex(context)
+
+    conflicts = []
+    for field in fields:
+        for field_id in _coupling_ids(context_id, field):
+            if field_id in ids:
+                conflicts.append(field_id)
+            ids.add(field_id)
+    if conflicts:
+        raise ValueError(f"Context {context_id} already defines {', '.join(dict.fromkeys(conflicts))}")
+
+    for field in fields:
+        # Stacked grids are added by the builder, the 2-D grids (also used by
+        # the restarts of a stack) only if missing
+        for grid_ref in dict.fromkeys(member.grid_ref for member in restart_couplings(field)):
+            if grid_ref in ids:
+                continue
+            grid = ET.SubElement(index.grid_definition, "grid", id=grid_ref)
+            domain_id = "domain_" + field.sender_context
+            if domain_id in ids:
+                ET.SubElement(grid, "domain", domain_ref=domain_id)
+            else:
+                domain = ET.SubElement(grid, "domain", id=domain_id)
+                ET.SubElement(domain, "generate_rectilinear_domain")
+                ids.add(domain_id)
+            ids.add(grid_ref)
+
+        if field.sender_context == context_id:
+            CouplingBuilder.add_sender_side(index, field)
+        if field.receiver_context == context_id:
+            CouplingBuilder.add_receiver_side(index, field)
+    return context
+
+
+def merge_iodef(iodef_path, output_path, all_components, coupling_params, timestep, total_duration,
+                context_params=None):
+    """
+    Stream iodef_path, add the couplings of coupling_params to its contexts
+    and write the result to output_path (which may be iodef_path).
+
+    The contexts of the components in all_components missing from the
+    iodef are built with build_component_context and context_params.
+    Return the ids of the created contexts.
+    """
+    groups = couplings_by_context(coupling_params)
+    base_dir = os.path.dirname(os.path.abspath(iodef_path))
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".xml", dir=output_dir)
+    os.close(fd)
+    created = []
+
+    def write_new_contexts(writer):
+        for comp_name in all_components:
+            if comp_name in groups:
+                writer.write_context(build_component_context(
+                    comp_name, timestep, total_duration, all_components, groups.pop(comp_name),
+                    context_params=context_params))
+                created.append(comp_name)
+
+    try:
+        with open_xml(iodef_path) as source, IodefWriter(tmp_path) as writer:
+            root = None
+            depth = 0
+            for event, elem in ET.iterparse(source, events=("start", "end"), parser=_comment_parser()):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 1:
+                    continue
+
+                # A direct child of <simulation> is complete
+                if elem.tag == "context" and elem.get("id") == "xios":
+                    # Existing contexts are merged as they come, the others are new
+                    write_new_contexts(writer)
+                merged = elem
+                if elem.tag == "context" and elem.get("id") in groups:
+                    merged = merge_context(elem, groups.pop(elem.get("id")), base_dir)
+
+                # Comments before this element are written first. The parser
+                # reads ahead, so the following elements may already be in root
+                for child in list(root):
+                    root.remove(child)
+                    if child is elem:
+                        writer.write_context(merged)
+                        break
+                    _strip_indentation(child)
+                    writer.write_context(child)
+
+            write_new_contexts(writer)
+            for child in list(root):
+                _strip_indentation(child)
+                writer.write_context(child)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"✅ Merged XML written to {output_path}, new contexts: {created}")
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the coupled fields of a CSV file into an existing iodef.")
+    parser.add_argument("iodef", help="Existing iodef")
+    parser.add_argument("--csv", default="cmip6.csv", help="CSV of coupled fields (src_var,dst_var,src_comp,dst_comp)")
+    parser.add_argument("--output", help="Path of the merged iodef (default: overwrite the input)")
+    parser.add_argument("--output-files", choices=OUTPUT_FILE_POLICIES, default="field", help="Aggregation of the output files (see generator.py)")
+    parser.add_argument("--timestep", default="3600s", help="Timestep of the new contexts")
+    parser.add_argument("--duration", default="1d", help="Total duration of the run")
+    args = parser.parse_args()
+
+    coupled_fields = read_coupled_fields_from_csv(path=args.csv)
+    temporal = create_standard_temporal_params(
+                total_duration=args.duration,
+                coupler_send_freq_op="1ts",
+                coupler_recv_freq_op="1ts",
+                operation="instant")
+    coupling_params = CouplingTable.from_columns(coupled_fields.columns, temporal)
+    coupling_params.aggregate_output_files(args.output_files)
+
+    merge_iodef(args.iodef, args.output or args.iodef, coupled_fields.components, coupling_params,
+                args.timestep, args.duration)
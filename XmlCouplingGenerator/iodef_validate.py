@@ -0,0 +1,181 @@
+#################### IODEF REFERENCE VALIDATOR ####################
+# Check an iodef before submitting a job, instead of waiting for XIOS to
+# abort at context close. Every context is walked once to index its ids and
+# collect its references, which are then resolved by dict lookups, so the
+# check is linear in the number of elements. Reported errors:
+#   - field_ref, grid_ref, domain_ref, axis_ref or scalar_ref to an id
+#     that is not defined in the context (e.g. a missing restart field)
+#   - ids defined twice in a context
+#   - coupler_out/coupler_in context= naming a context that does not exist
+#   - coupler_out fields without the matching coupler_in field in the
+#     destination context, and the reverse
+#   - sender and receiver freq_op that do not describe the same period
+#
+# Usage:
+#   python iodef_validate.py coupling_config.xml
+
+import argparse
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+from temporal_planner import duration_seconds
+from xml_writer import open_xml
+
+# Reference attribute -> tag of the element it points to
+REFERENCES = {
+    "field_ref": "field",
+    "grid_ref": "grid",
+    "domain_ref": "domain",
+    "axis_ref": "axis",
+    "scalar_ref": "scalar",
+}
+# Elements whose ids must be unique in a context
+UNIQUE_IDS = ("field", "grid", "domain", "axis", "scalar", "file")
+
+
+class ContextReferences:
+    """Ids and references of a context, collected in a single walk."""
+
+    def __init__(self, context_id):
+        self.context_id = context_id
+        # tag -> set of ids
+        self.ids = {tag: set() for tag in REFERENCES.values()}
+        self.duplicates = []
+        # (attribute, value, element tag) of every reference
+        self.references = []
+        # (coupler tag, partner context, field id, freq_op) of the coupler fields
+        self.coupler_fields = []
+        self.couplers = []
+        self.timestep = None
+        self._periods = {}
+
+    def walk(self, context):
+        """Index the ids and collect the references of the elements of context."""
+        ids = self.ids
+        references = self.references
+        for elem in context.iter():
+            tag = elem.tag
+            attrib = elem.attrib
+            elem_id = attrib.get("id")
+            if elem_id is not None:
+                tag_ids = ids.get(tag)
+                if tag_ids is None:
+                    tag_ids = ids[tag] = set()
+                elif elem_id in tag_ids and tag in UNIQUE_IDS:
+                    self.duplicates.append(f"{tag} {elem_id}")
+                tag_ids.add(elem_id)
+                if tag == "variable" and elem_id == "toymodel_timestep_duration" and elem.text:
+                    self.timestep = duration_seconds(elem.text)
+
+            for attribute in attrib:
+                if attribute in REFERENCES:
+                    references.append((attribute, attrib[attribute], tag))
+
+            # The fields of a coupler are its children
+            if tag == "coupler_out" or tag == "coupler_in":
+                partner = attrib.get("context", "").split("::")[-1]
+                self.couplers.append((tag, partner))
+                for field in elem:
+                    if field.tag == "field":
+                        self.coupler_fields.append((tag, partner, field.get("id"), field.get("freq_op")))
+
+    def period(self, freq_op):
+        """Length in seconds of a freq_op, None when unknown."""
+        if freq_op not in self._periods:
+            if freq_op is None or (freq_op.endswith("ts") and self.timestep is None):
+                period = None
+            elif freq_op.endswith("ts"):
+                period = float(freq_op[:-2]) * self.timestep
+            else:
+                period = duration_seconds(freq_op)
+            self._periods[freq_op] = period
+        return self._periods[freq_op]
+
+
+def load_contexts(iodef_path):
+    """Yield the context elements of an iodef, loading the ones included with src=."""
+    base_dir = os.path.dirname(os.path.abspath(iodef_path))
+    with open_xml(iodef_path) as f:
+        root = ET.parse(f).getroot()
+    for context in root.findall("context"):
+        src = context.get("src")
+        if src is not None:
+            with open_xml(os.path.join(base_dir, src)) as f:
+                included = ET.parse(f).getroot()
+            included.set("id", context.get("id"))
+            context = included
+        yield context
+
+
+def validate_contexts(contexts):
+    """Return the list of the reference errors of the context elements."""
+    errors = []
+    indexes = {}
+    for context in contexts:
+        index = ContextReferences(context.get("id"))
+        index.walk(context)
+        indexes[index.context_id] = index
+
+    # Every coupler field, by (sender, receiver, field id)
+    sent = {}
+    received = {}
+    for context_id, index in indexes.items():
+        prefix = f"context {context_id}: "
+        errors += [prefix + f"{duplicate} is defined twice" for duplicate in index.duplicates]
+
+        for attribute, value, tag in index.references:
+            if value not in index.ids[REFERENCES[attribute]]:
+                errors.append(prefix + f"{tag} has {attribute}=\"{value}\", no {REFERENCES[attribute]} with this id")
+
+        for coupler_tag, partner in dict.fromkeys(index.couplers):
+            if partner not in indexes:
+                errors.append(prefix + f"{coupler_tag} with context=\"{partner}::{partner}\", no such context")
+
+        for coupler_tag, partner, field_id, freq_op in index.coupler_fields:
+            if coupler_tag == "coupler_out":
+                sent[(context_id, partner, field_id)] = freq_op
+            else:
+                received[(partner, context_id, field_id)] = freq_op
+
+    for (sender, receiver, field_id), send_freq in sent.items():
+        if receiver not in indexes:
+            continue
+        if (sender, receiver, field_id) not in received:
+            errors.append(f"context {sender}: {field_id} is sent to {receiver}, which has no coupler_in field {field_id} from {sender}")
+            continue
+        recv_freq = received[(sender, receiver, field_id)]
+        send_period = indexes[sender].period(send_freq)
+        recv_period = indexes[receiver].period(recv_freq)
+        if send_period is not None and recv_period is not None:
+            if send_period != recv_period:
+                errors.append(f"context {receiver}: {field_id} is received from {sender} every {recv_period:g}s "
+                              f"(freq_op={recv_freq}), sent every {send_period:g}s (freq_op={send_freq})")
+        # Timesteps unknown or calendar units: only identical freq_op can be checked
+        elif send_freq != recv_freq and "ts" not in (send_freq or "") + (recv_freq or ""):
+            errors.append(f"context {receiver}: {field_id} is received from {sender} with freq_op={recv_freq}, "
+                          f"sent with freq_op={send_freq}")
+
+    for (sender, receiver, field_id) in received:
+        if sender in indexes and (sender, receiver, field_id) not in sent:
+            errors.append(f"context {receiver}: {field_id} is received from {sender}, which has no coupler_out field {field_id} to {receiver}")
+    return errors
+
+
+def validate_iodef(iodef_path):
+    """Return the list of the reference errors of an iodef."""
+    return validate_contexts(load_contexts(iodef_path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the references of an iodef before running XIOS.")
+    parser.add_argument("iodef", nargs="?", default="coupling_config.xml", help="Path of the iodef")
+    args = parser.parse_args()
+
+    errors = validate_iodef(args.iodef)
+    for error in errors:
+        print(error)
+    if errors:
+        print(f"❌ {len(errors)} errors in {args.iodef}")
+        sys.exit(1)
+    print(f"✅ {args.iodef} is consistent")
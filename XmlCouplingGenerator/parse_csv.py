@@ -1,28 +1,97 @@
-import pandas as pd
+import csv
+from dataclasses import dataclass, field
 
-# Returns the names of the components and the dataframe with the coupled fields
-def parse_coupled_fields_from_csv(path):
+CSV_COLUMNS = ("src_var", "dst_var", "src_comp", "dst_comp")
+
+@dataclass
+class CoupledFields:
+    """Coupled fields of a CSV file, collected in a single pass over the rows."""
+    # Component labels, in order of first appearance
+    components: list = field(default_factory=list)
+    # Per component source and destination variables, in order of first appearance
+    src_vars: dict = field(default_factory=dict)
+    dst_vars: dict = field(default_factory=dict)
+    # One list per CSV column, values stripped
+    columns: dict = field(default_factory=lambda: {name: [] for name in CSV_COLUMNS})
+
+def collect_coupled_fields(rows):
+    """
+    Collect the components, their variables and the columns from an iterable
+    of (src_var, dst_var, src_comp, dst_comp) rows.
+    """
+    fields = CoupledFields()
+    # dicts are used as ordered sets
+    components = {}
+    src_vars = fields.src_vars
+    dst_vars = fields.dst_vars
+    src_var_col, dst_var_col, src_comp_col, dst_comp_col = (fields.columns[name] for name in CSV_COLUMNS)
+
+    for src_var, dst_var, src_comp, dst_comp in rows:
+        src_var, dst_var = src_var.strip(), dst_var.strip()
+        src_comp, dst_comp = src_comp.strip(), dst_comp.strip()
+
+        src_var_col.append(src_var)
+        dst_var_col.append(dst_var)
+        src_comp_col.append(src_comp)
+        dst_comp_col.append(dst_comp)
+
+        components[src_comp] = None
+        components[dst_comp] = None
+        src_vars.setdefault(src_comp, {})[src_var] = None
+        dst_vars.setdefault(dst_comp, {})[dst_var] = None
 
-    df = pd.read_csv(path, header=0, encoding='latin1')
+    fields.components = list(components)
+    return fields
 
-    # All labels of source and destination components
-    src_comp = df['src_comp'].unique().tolist()
-    dst_comp = df['dst_comp'].unique().tolist()
-    all_comp = set(src_comp + dst_comp)
-    print("All components of source and destination:", all_comp)
+# Returns the coupled fields of the CSV file, without pandas
+def read_coupled_fields_from_csv(path):
 
-    print(df)
-    return all_comp, df 
+    with open(path, newline='', encoding='latin1') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        try:
+            indexes = [header.index(name) for name in CSV_COLUMNS]
+        except ValueError:
+            raise ValueError(f"{path}: expected columns {CSV_COLUMNS}, got {header}")
 
-def generate_fortran_labels(all_comp, df):
+        rows = ((row[i] for i in indexes) for row in reader if row)
+        fields = collect_coupled_fields(rows)
+
+    print("All components of source and destination:", fields.components)
+    return fields
+
+# Returns the set of components and a DataFrame of the CSV columns, kept for
+# the callers of the pandas-based reader
+def parse_coupled_fields_from_csv(path):
+    # Imported here so that the csv-only path does not pay for pandas
+    import pandas as pd
+
+    fields = read_coupled_fields_from_csv(path)
+    return set(fields.components), pd.DataFrame(fields.columns)
+
+def generate_fortran_labels(all_comp, fields, stacks=()):
     """
-    Generate Fortran labels for the fields in the DataFrame.
+    Generate Fortran labels for the coupled fields.
+
+    fields is either a CoupledFields or a DataFrame with the CSV columns.
+
+    For every stacked coupling sent or received by a component, the labels
+    are printed in level order: level k (1-based) of the stacked field holds
+    the k-th label, which is the index table used to pack and unpack it.
     """
+    if not isinstance(fields, CoupledFields):
+        fields = collect_coupled_fields(zip(*(fields[name] for name in CSV_COLUMNS)))
+
     # For each model, retrieved the labels of the src_var and dst_var
     for comp in all_comp:
-        src_vars = df[df['src_comp'] == comp]['src_var'].unique().tolist()
-        dst_vars = df[df['dst_comp'] == comp]['dst_var'].unique().tolist()
+        src_vars = list(fields.src_vars.get(comp, ()))
+        dst_vars = list(fields.dst_vars.get(comp, ()))
         print(f"Component: {comp}")
         print(f"len={len(src_vars)} Source variables:", src_vars)
         print(f"len={len(dst_vars)} Destination variables:", dst_vars)
+        for stack in stacks:
+            if stack.sender_context == comp:
+                print(f"len={len(stack)} Send stack {stack.sender_field}:", [f.sender_field for f in stack.fields])
+            if stack.receiver_context == comp:
+                print(f"len={len(stack)} Receive stack {stack.receiver_field}:", [f.receiver_field for f in stack.fields])
         print()
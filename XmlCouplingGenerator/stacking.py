@@ -0,0 +1,110 @@
+from dataclasses import astuple
+
+
+class StackedCoupling:
+    """
+    Couplings between the same sender and receiver, on the same grid and with
+    the same temporal parameters, exchanged as a single 3-D field.
+
+    The third dimension is a "field index" axis: level k of the stacked field
+    holds fields[k] (0-based here, k+1 in Fortran). It exposes the attributes
+    of a Coupling, so it is consumed by CouplingBuilder in the same way.
+    """
+
+    __slots__ = ("stack_id", "fields", "sender_context", "receiver_context",
+                 "restart_file_name", "restart_field_in_file", "output_file_name",
+                 "temporal_params")
+
+    def __init__(self, stack_id, fields):
+        first = fields[0]
+        self.stack_id = stack_id
+        self.fields = fields
+        self.sender_context = first.sender_context
+        self.receiver_context = first.receiver_context
+        self.restart_file_name = first.restart_file_name
+        self.restart_field_in_file = first.restart_field_in_file
+        self.temporal_params = first.temporal_params
+
+        # Keep the output file if the fields are aggregated in a shared one
+        if all(f.output_file_name == first.output_file_name for f in fields[1:]):
+            self.output_file_name = first.output_file_name
+        else:
+            self.output_file_name = f"{stack_id}_next"
+
+    # Ids used by the models: they send stack_id and receive receiver_field
+    @property
+    def sender_field(self):
+        return self.stack_id
+
+    @property
+    def receiver_field(self):
+        return f"{self.stack_id}_recv"
+
+    @property
+    def cpl_interface(self):
+        return f"{self.stack_id}_cpl"
+
+    @property
+    def restart_field(self):
+        return f"{self.stack_id}_restart"
+
+    @property
+    def axis_id(self):
+        return f"axis_{self.stack_id}"
+
+    @property
+    def grid_ref(self):
+        return f"grid_3D_{self.stack_id}"
+
+    @property
+    def domain_ref(self):
+        return f"domain_{self.sender_context}"
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return f"StackedCoupling({self.stack_id}, {len(self.fields)} fields)"
+
+
+def stack_key(field):
+    """Couplings with the same key can be exchanged as one stacked field."""
+    return (field.sender_context, field.receiver_context, field.grid_ref,
+            field.restart_file_name, field.restart_field_in_file,
+            astuple(field.temporal_params))
+
+
+def stack_couplings(user_fields):
+    """
+    Group the couplings sharing sender, receiver, grid and temporal parameters
+    into StackedCoupling objects, in order of first appearance.
+
+    Groups of a single coupling are left as they are.
+    """
+    groups = {}
+    for field in user_fields:
+        groups.setdefault(stack_key(field), []).append(field)
+
+    stacked = []
+    stacks_per_pair = {}
+    for (sender, receiver, *_), fields in groups.items():
+        if len(fields) == 1:
+            stacked.append(fields[0])
+            continue
+        i = stacks_per_pair.get((sender, receiver), 0)
+        stacks_per_pair[(sender, receiver)] = i + 1
+        stacked.append(StackedCoupling(f"{sender}_to_{receiver}_stack{i}", fields))
+    return stacked
+
+
+def is_stacked(field):
+    return isinstance(field, StackedCoupling)
+
+
+def restart_couplings(field):
+    """
+    Couplings whose restart fields are exchanged for field: the restart files
+    hold 2-D variables, so the restarts of a stack are read and exchanged
+    level by level, on the 2-D grid of each of its fields.
+    """
+    return field.fields if is_stacked(field) else [field]
@@ -0,0 +1,127 @@
+#################### SCALING CONFIGURATIONS SWEEP ####################
+# Generate a family of iodef files over three axes:
+#   - number of coupled fields sent from the first to the second component
+#   - global grid size (ni_glo x nj_glo)
+#   - coupling frequency (in timesteps)
+# Every file gets an entry in a manifest CSV with the payload it exchanges,
+# to measure the coupling throughput (fields x points per second) of XIOS.
+#
+# Usage:
+#   python sweep.py --fields 1 10 100 --grids 10x10 100x100 --freqs 1ts 4ts --output-dir sweep
+
+import argparse
+import contextlib
+import csv
+import itertools
+import os
+import re
+
+from coupling_table import CouplingTable, OUTPUT_FILE_POLICIES
+from generator import create_standard_temporal_params, write_iodef
+from temporal_planner import duration_seconds
+
+MANIFEST_COLUMNS = [
+    "file", "n_fields", "ni_glo", "nj_glo", "coupling_freq", "timestep", "total_duration",
+    "points_per_field", "points_per_exchange", "bytes_per_exchange", "n_exchanges",
+]
+
+def parse_grid(grid):
+    """Parse a "<ni>x<nj>" grid size."""
+    ni, nj = grid.lower().split("x")
+    return int(ni), int(nj)
+
+
+def synthetic_columns(n_fields, sender, receiver):
+    """CSV-like columns of n_fields couplings from sender to receiver."""
+    return {
+        "src_var": [f"FLD{i}" for i in range(n_fields)],
+        "dst_var": [f"FLD{i}_RCV" for i in range(n_fields)],
+        "src_comp": [sender] * n_fields,
+        "dst_comp": [receiver] * n_fields,
+    }
+
+
+def generate_sweep(output_dir, fields_list, grids, freqs, components=("ocn", "atm"),
+                   timestep="3600s", total_duration="1d", output_files="context", workers=1):
+    """Write one iodef per combination of the sweep axes and the manifest describing them."""
+    os.makedirs(output_dir, exist_ok=True)
+    sender, receiver = components
+    timestep_sec = duration_seconds(timestep)
+    duration_sec = duration_seconds(total_duration)
+
+    rows = []
+    for n_fields, (ni_glo, nj_glo), freq in itertools.product(fields_list, grids, freqs):
+        file_name = f"iodef_f{n_fields}_g{ni_glo}x{nj_glo}_c{freq}.xml"
+
+        temporal = create_standard_temporal_params(
+                    total_duration=total_duration,
+                    coupler_send_freq_op=freq,
+                    coupler_recv_freq_op=freq,
+                    operation="instant")
+        coupling_params = CouplingTable.from_columns(synthetic_columns(n_fields, sender, receiver), temporal)
+        coupling_params.aggregate_output_files(output_files)
+
+        # Silence the per-field progress messages
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            write_iodef(
+                os.path.join(output_dir, file_name), list(components), coupling_params,
+                timestep, total_duration,
+                context_params={"ni_glo": ni_glo, "nj_glo": nj_glo},
+                workers=workers)
+
+        points_per_field = ni_glo * nj_glo
+        n_exchanges = None
+        if timestep_sec and duration_sec:
+            n_exchanges = int(duration_sec // (timestep_sec * int(freq[:-2])))
+        rows.append({
+            "file": file_name,
+            "n_fields": n_fields,
+            "ni_glo": ni_glo,
+            "nj_glo": nj_glo,
+            "coupling_freq": freq,
+            "timestep": timestep,
+            "total_duration": total_duration,
+            "points_per_field": points_per_field,
+            "points_per_exchange": n_fields * points_per_field,
+            # Fields are exchanged in double precision
+            "bytes_per_exchange": 8 * n_fields * points_per_field,
+            "n_exchanges": n_exchanges,
+        })
+        print(f"Written {file_name}")
+
+    manifest_path = os.path.join(output_dir, "manifest.csv")
+    with open(manifest_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ {len(rows)} configurations, manifest written to {manifest_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a sweep of iodef files over field count, grid size and coupling frequency.")
+    parser.add_argument("--fields", type=int, nargs="+", default=[1, 10, 100, 1000], help="Numbers of coupled fields")
+    parser.add_argument("--grids", nargs="+", default=["10x10", "100x100", "1000x1000"], help="Global grid sizes <ni>x<nj>")
+    parser.add_argument("--freqs", nargs="+", default=["1ts"], help="Coupling frequencies, in timesteps (e.g. 1ts 4ts)")
+    parser.add_argument("--components", nargs=2, default=["ocn", "atm"], help="Sender and receiver components")
+    parser.add_argument("--timestep", default="3600s", help="Timestep of the models")
+    parser.add_argument("--duration", default="1d", help="Total duration of the run")
+    parser.add_argument("--output-files", choices=OUTPUT_FILE_POLICIES, default="context", help="Aggregation of the output files (see generator.py)")
+    parser.add_argument("--output-dir", default="sweep", help="Directory of the generated iodef files and manifest")
+    parser.add_argument("--workers", type=int, default=1, help="Processes building the component contexts")
+    args = parser.parse_args()
+
+    for freq in args.freqs:
+        if not re.fullmatch(r"\d+ts", freq):
+            parser.error(f"Coupling frequency '{freq}' must be given in timesteps, e.g. 2ts")
+
+    generate_sweep(
+        args.output_dir,
+        fields_list=args.fields,
+        grids=[parse_grid(grid) for grid in args.grids],
+        freqs=args.freqs,
+        components=args.components,
+        timestep=args.timestep,
+        total_duration=args.duration,
+        output_files=args.output_files,
+        workers=args.workers)
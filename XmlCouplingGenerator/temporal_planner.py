@@ -0,0 +1,135 @@
+#################### LAG-AWARE TEMPORAL PLANNER ####################
+# Compute the temporal parameters of a coupling from the timesteps of the two
+# components, the coupling period and a lag expressed in coupling periods.
+#
+# With a lag L, the field sent by the sender at the end of period k is
+# received at the beginning of period k + L:
+#
+#   sender    freq_op = P_s ts                  (P_s = period / sender timestep)
+#   receiver  freq_op = P_r ts, freq_offset = L * P_r + 1 ts
+#
+# so the receiver can prefetch the data during L periods of computation
+# instead of blocking on the field produced in the same step. The first L
+# receptions (at ts 1, P_r + 1, ..., (L-1) * P_r + 1) come from the restart
+# file, which must therefore hold L records. As with L = 1 (the standard
+# scheme of create_standard_temporal_params), every record is read, sent and
+# received exactly once: record k (0-based) has its own restart field
+# <restart>_k (<restart> for k = 0), read from the file with record_offset + k
+# and exchanged with freq_op = 1y and offsets moved k periods later, so
+# nothing is read past the L records of the file.
+
+import re
+
+from coupling_table import TemporalParams
+
+# Seconds per unit of the XIOS durations with a fixed length
+_DURATION_UNITS = {"s": 1, "mi": 60, "h": 3600, "d": 86400}
+
+
+def duration_seconds(duration):
+    """Length of an XIOS duration such as "3600s" or "1d", None for calendar units (mo, y)."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(s|mi|h|d)", duration.strip())
+    if match is None:
+        return None
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def restart_exchange_id(name, k):
+    """Id of the restart field or file of the k-th (0-based) restart record."""
+    return name if k == 0 else f"{name}_{k}"
+
+
+def shift_offset(offset, k, freq_op):
+    """The "Nts" offset moved k periods of freq_op ("Pts") later."""
+    if k == 0:
+        return offset
+    return f"{int(offset[:-2]) + k * int(freq_op[:-2])}ts"
+
+
+def _timesteps_per(duration, timestep, what):
+    """Number of timesteps in duration, which must be a multiple of timestep."""
+    duration_sec = duration_seconds(duration)
+    timestep_sec = duration_seconds(timestep)
+    if duration_sec is None or timestep_sec is None:
+        raise ValueError(f"{what}: durations must be given in s, mi, h or d, got {duration} and {timestep}")
+    n = duration_sec / timestep_sec
+    if n < 1 or n != int(n):
+        raise ValueError(f"{what}: {duration} is not a multiple of the timestep {timestep}")
+    return int(n)
+
+
+def plan_temporal_params(sender_timestep, receiver_timestep, coupling_period, total_duration,
+                         lag=1, operation="instant", restart_records=None):
+    """
+    Return the TemporalParams of a coupling exchanged every coupling_period
+    with a lag of lag coupling periods.
+
+    restart_records is the number of records in the restart file, when known
+    (e.g. the _next file of a previous run of the same configuration); the
+    last lag records are read.
+    """
+    if not isinstance(lag, int) or lag < 1:
+        raise ValueError(f"The lag must be a positive number of coupling periods, got {lag}")
+
+    period_sender = _timesteps_per(coupling_period, sender_timestep, "Sender")
+    period_receiver = _timesteps_per(coupling_period, receiver_timestep, "Receiver")
+    n_periods = _timesteps_per(total_duration, coupling_period, "Run")
+    check_restart_layout(lag, n_periods, restart_records)
+
+    if lag == 1:
+        # Only the last send is needed by the next run
+        output_freq = total_duration
+    else:
+        # Every send is saved, the next run reads the last lag records
+        output_freq = coupling_period
+
+    record_offset = 0 if restart_records is None else restart_records - lag
+
+    return TemporalParams(
+        operation=operation,
+        sampling_freq_op="1ts",
+        sampling_freq_offset="0ts",
+        coupler_send_freq_op=f"{period_sender}ts",
+        # Every restart record read, sent and received once
+        coupler_restart_send_freq_op="1y",
+        coupler_recv_freq_op=f"{period_receiver}ts",
+        coupler_recv_freq_offset=f"{lag * period_receiver + 1}ts",
+        coupler_restart_recv_freq_op="1y",
+        coupler_restart_recv_freq_offset="1ts",
+        file_output_freq=output_freq,
+        file_restart_output_freq="100000y",
+        file_restart_record_offset=str(record_offset),
+        restart_exchanges=lag
+    )
+
+
+def check_restart_layout(lag, n_periods, restart_records=None):
+    """
+    Check that the run and the restart file are long enough for a lag of lag
+    periods. Raise a ValueError listing all the inconsistencies found.
+    """
+    errors = []
+    if lag > n_periods:
+        errors.append(f"lag of {lag} periods is longer than the run ({n_periods} periods)")
+    if restart_records is not None and restart_records < lag:
+        errors.append(f"restart file holds {restart_records} records, {lag} are needed")
+
+    if errors:
+        raise ValueError("Inconsistent restart layout: " + "; ".join(errors))
+
+
+def plan_coupling_table(table, timesteps, coupling_period, total_duration, lag=1, restart_records=None):
+    """
+    Set the temporal parameters of every coupling of a CouplingTable from the
+    timesteps of its sender and receiver (dict component -> timestep).
+    """
+    plans = {}
+    temporal_params = []
+    for sender, receiver in zip(table.sender_context, table.receiver_context):
+        if (sender, receiver) not in plans:
+            plans[(sender, receiver)] = plan_temporal_params(
+                timesteps[sender], timesteps[receiver], coupling_period, total_duration,
+                lag=lag, restart_records=restart_records)
+        temporal_params.append(plans[(sender, receiver)])
+    table.temporal_params = temporal_params
+    return plans
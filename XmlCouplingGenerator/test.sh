@@ -1,7 +1,16 @@
 exec_dir=/scratch/globc/ferrario/xios_experiments/cnrm-cm6
 
+# Check the references before copying, XIOS would only fail at context close
+python iodef_validate.py coupling_config.xml || exit 1
+
 mv $exec_dir/iodef.xml $exec_dir/iodef_old.xml
 cp coupling_config.xml $exec_dir/iodef.xml
+# Incremental mode: copy only the context files rewritten since the last copy,
+# and delete those of the components that are no longer in the iodef
+if [ -d contexts ]; then
+    mkdir -p $exec_dir/contexts
+    rsync -a --delete contexts/ $exec_dir/contexts/
+fi
 cd $exec_dir
 ./run.sh
 
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from bench_generator import STAGES, check_regressions, run_case
+
+
+def test_stages_are_timed_separately(tmp_path):
+    record = run_case(3, 30, str(tmp_path))
+    assert all(record[f"{stage}_time"] > 0 for stage in STAGES)
+    assert record["total_time"] >= sum(record[f"{stage}_time"] for stage in STAGES)
+
+
+def test_regressions_compare_the_same_workers(tmp_path):
+    baseline = tmp_path / "baseline.csv"
+    pd.DataFrame({"components": [2, 2], "couplings": [10, 10], "workers": [1, 4],
+                  "total_time": [1.0, 0.3], "peak_mem_mb": [1.0, 1.0]}).to_csv(baseline, index=False)
+
+    # Slower than the 4 workers run, but compared with the serial one only
+    df = pd.DataFrame({"components": [2], "couplings": [10], "workers": [1], "total_time": [1.1], "peak_mem_mb": [1.0]})
+    assert check_regressions(df, baseline, tolerance=0.25) == []
+    df["workers"] = 4
+    assert check_regressions(df, baseline, tolerance=0.25) == [
+        "components=2 couplings=10 workers=4: total_time 1.100 > 0.300 * (1 + 0.25)"]
+    df["workers"] = 8
+    assert check_regressions(df, baseline, tolerance=0.25) == [
+        f"no case of {baseline} has the same components, couplings and workers"]
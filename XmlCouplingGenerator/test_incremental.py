@@ -0,0 +1,51 @@
+import os
+
+from generator import generate_xml
+
+
+def write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write("src_var,dst_var,src_comp,dst_comp\n")
+        for row in rows:
+            f.write(",".join(row) + "\n")
+
+
+def generate(tmp_path, rows):
+    csv_path = tmp_path / "couplings.csv"
+    write_csv(csv_path, rows)
+    output = tmp_path / "coupling_config.xml"
+    generate_xml(csv_path=str(csv_path), output_path=str(output), incremental=True, contexts_dir=str(tmp_path / "contexts"))
+    return {name: os.path.getmtime(tmp_path / "contexts" / name) for name in os.listdir(tmp_path / "contexts")}
+
+
+ROWS = [
+    ("SST", "SSTA", "oce", "atm"),
+    ("TAU", "TAUO", "atm", "oce"),
+    ("RUNOFF", "RUNOFFO", "lnd", "oce"),
+]
+
+
+def test_unchanged_inputs_rewrite_nothing(tmp_path, capsys):
+    generate(tmp_path, ROWS)
+    generate(tmp_path, ROWS)
+    assert "Rewritten contexts: []" in capsys.readouterr().out
+
+
+def test_new_component_rewrites_only_its_partners(tmp_path, capsys):
+    generate(tmp_path, ROWS)
+    capsys.readouterr()
+    generate(tmp_path, ROWS + [("CO2", "CO2A", "bgc", "atm")])
+    assert "Rewritten contexts: ['atm', 'bgc']" in capsys.readouterr().out
+
+
+def test_changed_coupling_rewrites_both_sides(tmp_path, capsys):
+    generate(tmp_path, ROWS)
+    capsys.readouterr()
+    generate(tmp_path, [("SST2", "SSTA", "oce", "atm")] + ROWS[1:])
+    assert "Rewritten contexts: ['oce', 'atm']" in capsys.readouterr().out
+
+
+def test_removed_component_file_is_deleted(tmp_path):
+    generate(tmp_path, ROWS)
+    files = generate(tmp_path, ROWS[:2])
+    assert sorted(files) == ["context_atm.xml", "context_oce.xml", "manifest.json"]
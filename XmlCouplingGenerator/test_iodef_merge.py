@@ -0,0 +1,65 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from coupling_table import CouplingTable
+from generator import build_component_context, create_standard_temporal_params
+from iodef_merge import merge_context, merge_iodef
+from iodef_validate import validate_contexts
+
+COMPONENTS = ["atm", "oce"]
+
+
+def table(columns):
+    temporal = create_standard_temporal_params(total_duration="1d", coupler_send_freq_op="1ts", coupler_recv_freq_op="1ts")
+    return list(CouplingTable.from_columns(columns, temporal))
+
+
+SST = {"src_var": ["SST"], "dst_var": ["SSTA"], "src_comp": ["oce"], "dst_comp": ["atm"]}
+TAU = {"src_var": ["TAU"], "dst_var": ["TAUO"], "src_comp": ["atm"], "dst_comp": ["oce"]}
+
+
+def write_iodef(path, couplings):
+    simulation = ET.Element("simulation")
+    for comp in COMPONENTS:
+        simulation.append(build_component_context(comp, "3600s", "1d", COMPONENTS, couplings))
+    ET.SubElement(simulation, "context", id="xios")
+    ET.ElementTree(simulation).write(path)
+
+
+def test_already_defined_couplings_are_rejected():
+    context = build_component_context("oce", "3600s", "1d", COMPONENTS, table(SST))
+    with pytest.raises(ValueError, match="Context oce already defines SST, SST_to_SSTA, SSTA_restart, SSTA_restart_read$"):
+        merge_context(context, table(SST))
+
+
+def test_duplicates_within_the_new_couplings_are_rejected():
+    context = ET.Element("context", id="atm")
+    with pytest.raises(ValueError, match="Context atm already defines SSTA"):
+        merge_context(context, table({key: values * 2 for key, values in SST.items()}))
+
+
+def test_merged_iodef_matches_the_generated_one(tmp_path):
+    iodef = tmp_path / "iodef.xml"
+    write_iodef(iodef, table(SST))
+    assert merge_iodef(str(iodef), str(iodef), COMPONENTS, table(TAU), "3600s", "1d") == []
+
+    merged = ET.parse(iodef).getroot()
+    assert [context.get("id") for context in merged] == ["atm", "oce", "xios"]
+    assert validate_contexts(merged.findall("context")[:2]) == []
+    ids = {node.get("id") for node in merged.iter()}
+    assert {"SST", "SSTA", "TAU", "TAUO", "SSTA_restart", "TAUO_restart"} <= ids
+
+    # Merging the same couplings again is an error, and leaves the iodef untouched
+    before = iodef.read_bytes()
+    with pytest.raises(ValueError, match="already defines"):
+        merge_iodef(str(iodef), str(iodef), COMPONENTS, table(TAU), "3600s", "1d")
+    assert iodef.read_bytes() == before
+    assert [path.name for path in tmp_path.iterdir()] == ["iodef.xml"]
+
+
+def test_missing_contexts_are_created(tmp_path):
+    iodef = tmp_path / "iodef.xml"
+    ET.ElementTree(ET.fromstring('<simulation><context id="xios"/></simulation>')).write(iodef)
+    assert merge_iodef(str(iodef), str(iodef), COMPONENTS, table(SST), "3600s", "1d") == ["atm", "oce"]
+    assert [context.get("id") for context in ET.parse(iodef).getroot()] == ["atm", "oce", "xios"]
@@ -0,0 +1,44 @@
+import xml.etree.ElementTree as ET
+
+from coupling_table import CouplingTable
+from generator import build_component_context, create_standard_temporal_params
+from iodef_merge import merge_context
+from iodef_validate import validate_contexts
+from stacking import stack_couplings, is_stacked
+
+COMPONENTS = ["atm", "oce"]
+
+
+def stacked_table():
+    temporal = create_standard_temporal_params(total_duration="1d", coupler_send_freq_op="1ts", coupler_recv_freq_op="1ts")
+    columns = {
+        "src_var": ["SST", "SSS", "TAU"],
+        "dst_var": ["SSTA", "SSSA", "TAUO"],
+        "src_comp": ["oce", "oce", "atm"],
+        "dst_comp": ["atm", "atm", "oce"],
+    }
+    return stack_couplings(CouplingTable.from_columns(columns, temporal))
+
+
+def restart_fields(context):
+    return {f.get("id"): f.get("grid_ref") for f in context.iter("field")
+            if f.get("id", "").endswith("_restart") and f.get("grid_ref") is not None}
+
+
+def test_stack_restarts_are_2d_per_level():
+    couplings = stacked_table()
+    assert [is_stacked(c) for c in couplings] == [True, False]
+    contexts = {comp: build_component_context(comp, "3600s", "1d", COMPONENTS, couplings) for comp in COMPONENTS}
+
+    # The restart variables of the file are read on the 2-D grid, one per level
+    read = {f.get("id"): f.get("grid_ref") for f in contexts["oce"].iter("field") if f.get("read_access") and f.get("name")}
+    assert read == {"SSTA_restart_read": "grid_2D_oce", "SSSA_restart_read": "grid_2D_oce"}
+    assert restart_fields(contexts["atm"]) == {"SSTA_restart": "grid_2D_oce", "SSSA_restart": "grid_2D_oce"}
+    assert validate_contexts(contexts.values()) == []
+
+
+def test_merged_stack_restarts_are_2d_per_level():
+    couplings = stacked_table()
+    contexts = [merge_context(ET.Element("context", id=comp), couplings) for comp in COMPONENTS]
+    assert restart_fields(contexts[0]) == {"SSTA_restart": "grid_2D_oce", "SSSA_restart": "grid_2D_oce"}
+    assert validate_contexts(contexts) == []
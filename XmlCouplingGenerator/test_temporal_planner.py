@@ -0,0 +1,59 @@
+import pytest
+
+from coupling_table import CouplingTable
+from generator import build_component_context, create_standard_temporal_params
+from iodef_validate import validate_contexts
+from temporal_planner import plan_coupling_table, plan_temporal_params
+
+COMPONENTS = ["atm", "oce"]
+
+
+def planned_contexts(lag, restart_records=None):
+    temporal = create_standard_temporal_params(total_duration="1d", coupler_send_freq_op="1ts", coupler_recv_freq_op="1ts")
+    columns = {"src_var": ["SST"], "dst_var": ["SSTA"], "src_comp": ["oce"], "dst_comp": ["atm"]}
+    table = CouplingTable.from_columns(columns, temporal)
+    timesteps = {"oce": "3600s", "atm": "1800s"}
+    plan_coupling_table(table, timesteps, "6h", "1d", lag=lag, restart_records=restart_records)
+    return {comp: build_component_context(comp, timesteps[comp], "1d", COMPONENTS, list(table)) for comp in COMPONENTS}
+
+
+def test_lag_one_is_the_standard_scheme():
+    params = plan_temporal_params("3600s", "3600s", "1h", "1d", lag=1)
+    assert params.coupler_restart_send_freq_op == "1y"
+    assert params.coupler_restart_recv_freq_offset == "1ts"
+    assert params.file_restart_output_freq == "100000y"
+    assert params.restart_exchanges == 1
+
+
+def test_lag_reads_each_restart_record_once():
+    contexts = planned_contexts(lag=3, restart_records=5)
+
+    # One read-once file entry per record, the last 3 records of the file
+    files = [f for f in contexts["oce"].iter("file") if f.get("mode") == "read"]
+    assert [(f.get("id"), f.get("name"), f.get("record_offset"), f.get("output_freq")) for f in files] == [
+        ("zero_restart_file", "zero_restart_file", "2", "100000y"),
+        ("zero_restart_file_1", "zero_restart_file", "3", "100000y"),
+        ("zero_restart_file_2", "zero_restart_file", "4", "100000y"),
+    ]
+
+    # Sent once, k periods of 6 sender timesteps later
+    sent = [f for f in contexts["oce"].find("coupler_out_definition").iter("field") if "restart" in f.get("id")]
+    assert [(f.get("id"), f.get("freq_op"), f.get("freq_offset")) for f in sent] == [
+        ("SSTA_restart", "1y", None), ("SSTA_restart_1", "1y", "6ts"), ("SSTA_restart_2", "1y", "12ts")]
+
+    # Received once, at the beginning of periods 0, 1 and 2 (12 receiver timesteps each)
+    received = [f for f in contexts["atm"].find("coupler_in_definition").iter("field") if "restart" in f.get("id")]
+    assert [(f.get("id"), f.get("freq_op"), f.get("freq_offset")) for f in received] == [
+        ("SSTA_restart", "1y", "1ts"), ("SSTA_restart_1", "1y", "13ts"), ("SSTA_restart_2", "1y", "25ts")]
+
+    assert validate_contexts(contexts.values()) == []
+
+
+def test_too_few_restart_records():
+    with pytest.raises(ValueError, match="restart file holds 1 records, 2 are needed"):
+        plan_temporal_params("3600s", "3600s", "6h", "1d", lag=2, restart_records=1)
+
+
+def test_lag_longer_than_the_run():
+    with pytest.raises(ValueError, match=r"lag of 5 periods is longer than the run \(4 periods\)"):
+        plan_temporal_params("3600s", "3600s", "6h", "1d", lag=5)
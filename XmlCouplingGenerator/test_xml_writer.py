@@ -0,0 +1,62 @@
+import random
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+import pytest
+
+from generator import build_component_context, generate_xios_context, create_standard_temporal_params
+from coupling_table import CouplingTable
+from xml_writer import IodefWriter, serialize_element
+
+
+def minidom_pretty(elem):
+    """Reference output: the tree reparsed and pretty-printed by minidom."""
+    return minidom.parseString(ET.tostring(elem, "utf-8")).toprettyxml(indent="    ")
+
+
+def random_tree(rng, depth=0):
+    alphabet = "ab <>&\"'\r\n\té"
+    elem = ET.Element(rng.choice(["context", "field", "file", "grid"]))
+    for i in range(rng.randint(0, 3)):
+        elem.set(f"attr{i}", "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6))))
+    if rng.random() < 0.5:
+        elem.text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+    if depth < 3:
+        for _ in range(rng.randint(0, 3)):
+            child = random_tree(rng, depth + 1)
+            if rng.random() < 0.3:
+                child.tail = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+            elem.append(child)
+    return elem
+
+
+def write_iodef(path, contexts):
+    with IodefWriter(path) as writer:
+        for context in contexts:
+            writer.write_context(context)
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_serialize_element_matches_minidom(seed):
+    root = ET.Element("simulation")
+    root.append(random_tree(random.Random(seed)))
+    expected = minidom_pretty(root)
+    assert '<?xml version="1.0" ?>\n<simulation>\n' + serialize_element(root[0], level=1) + "</simulation>\n" == expected
+
+
+def test_iodef_writer_matches_minidom(tmp_path):
+    temporal = create_standard_temporal_params(total_duration="1d", coupler_send_freq_op="1ts", coupler_recv_freq_op="1ts")
+    columns = {"src_var": ["SST", "TAU"], "dst_var": ["SSTA", "TAUO"], "src_comp": ["oce", "atm"], "dst_comp": ["atm", "oce"]}
+    table = CouplingTable.from_columns(columns, temporal)
+    contexts = [build_component_context(comp, "3600s", "1d", ["atm", "oce"], list(table)) for comp in ["atm", "oce"]]
+    contexts.append(generate_xios_context())
+
+    root = ET.Element("simulation")
+    root.extend(contexts)
+    assert write_iodef(tmp_path / "iodef.xml", contexts) == minidom_pretty(root)
+
+
+def test_iodef_writer_empty(tmp_path):
+    assert write_iodef(tmp_path / "iodef.xml", []) == minidom_pretty(ET.Element("simulation"))
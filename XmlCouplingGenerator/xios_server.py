@@ -0,0 +1,135 @@
+import json
+from dataclasses import dataclass, field
+
+SERVICE_TYPES = ("gatherer", "writer", "reader")
+TRANSPORT_PROTOCOLS = ("p2p", "one_sided", "legacy")
+
+
+@dataclass
+class Service:
+    name: str
+    nprocs: int
+    type: str
+
+
+@dataclass
+class Pool:
+    name: str
+    nprocs: int
+    services: list = field(default_factory=list)
+
+
+@dataclass
+class FileServices:
+    """Pool and services handling a kind of files (empty: XIOS defaults)."""
+    pool: str = None
+    gatherer: str = None
+    writer: str = None
+    reader: str = None
+
+    def attributes(self):
+        """XIOS file attributes routing the file to the services."""
+        attrs = {}
+        for kind in ("gatherer", "writer", "reader"):
+            service = getattr(self, kind)
+            if service is not None:
+                attrs["pool_" + kind] = self.pool
+                attrs[kind] = service
+        return attrs
+
+
+@dataclass
+class ServerTopology:
+    """
+    XIOS server layout and parameters written in the xios context.
+
+    The default is the attached mode with the p2p transport, as generated
+    before. pools describe the I/O servers (XIOS3 pools of gatherer, writer
+    and reader services); next_files and restart_files route the coupling
+    _next output files and the restart files to them.
+    """
+    using_server: bool = False
+    transport_protocol: str = "p2p"
+    print_file: bool = True
+    info_level: int = None
+    optimal_buffer_size: str = None
+    buffer_size_factor: float = None
+    min_buffer_size: int = None
+    pools: list = field(default_factory=list)
+    next_files: FileServices = field(default_factory=FileServices)
+    restart_files: FileServices = field(default_factory=FileServices)
+
+    def variables(self):
+        """(id, type, value) of the XIOS parameters to write, in order."""
+        variables = [
+            ("print_file", "bool", self.print_file),
+            ("transport_protocol", "string", self.transport_protocol),
+        ]
+        if self.using_server:
+            variables.append(("using_server", "bool", True))
+        optional = [
+            ("info_level", "int", self.info_level),
+            ("optimal_buffer_size", "string", self.optimal_buffer_size),
+            ("buffer_size_factor", "double", self.buffer_size_factor),
+            ("min_buffer_size", "int", self.min_buffer_size),
+        ]
+        variables += [variable for variable in optional if variable[2] is not None]
+        return [(var_id, var_type, _xml_value(value)) for var_id, var_type, value in variables]
+
+    def file_attributes(self, mode):
+        """Attributes of the files opened in mode "read" (restart) or "write" (_next)."""
+        return (self.restart_files if mode == "read" else self.next_files).attributes()
+
+    def validate(self):
+        """Raise a ValueError listing every inconsistency of the topology."""
+        errors = []
+        if self.transport_protocol not in TRANSPORT_PROTOCOLS:
+            errors.append(f"unknown transport protocol {self.transport_protocol}, expected one of {TRANSPORT_PROTOCOLS}")
+        if self.pools and not self.using_server:
+            errors.append("pools are defined but using_server is false")
+
+        services = {}
+        for pool in self.pools:
+            used = sum(service.nprocs for service in pool.services)
+            if used > pool.nprocs:
+                errors.append(f"pool {pool.name}: services use {used} processes, the pool has {pool.nprocs}")
+            for service in pool.services:
+                if service.type not in SERVICE_TYPES:
+                    errors.append(f"service {service.name}: unknown type {service.type}, expected one of {SERVICE_TYPES}")
+                services[(pool.name, service.name)] = service.type
+
+        for label, files in (("next_files", self.next_files), ("restart_files", self.restart_files)):
+            for kind in ("gatherer", "writer", "reader"):
+                service = getattr(files, kind)
+                if service is None:
+                    continue
+                if (files.pool, service) not in services:
+                    errors.append(f"{label}: no service {service} in pool {files.pool}")
+                elif services[(files.pool, service)] != kind:
+                    errors.append(f"{label}: service {service} is a {services[(files.pool, service)]}, not a {kind}")
+
+        if errors:
+            raise ValueError("Invalid XIOS server topology: " + "; ".join(errors))
+
+
+def _xml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def load_server_topology(path):
+    """Read a ServerTopology from a JSON file with the same keys as the dataclass."""
+    with open(path) as f:
+        config = json.load(f)
+
+    pools = [
+        Pool(name=pool["name"], nprocs=pool["nprocs"],
+             services=[Service(**service) for service in pool.get("services", [])])
+        for pool in config.pop("pools", [])
+    ]
+    next_files = FileServices(**config.pop("next_files", {}))
+    restart_files = FileServices(**config.pop("restart_files", {}))
+    topology = ServerTopology(pools=pools, next_files=next_files, restart_files=restart_files, **config)
+    topology.validate()
+    return topology
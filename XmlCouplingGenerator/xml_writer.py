@@ -0,0 +1,126 @@
+import io
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+# Same entities as minidom when writing text and attribute values
+_ENTITIES = {'"': "&quot;"}
+
+
+def _escape(data):
+    return escape(data, _ENTITIES)
+
+
+def _escape_text(data):
+    # minidom reparses the text, which normalizes the line ends to \n
+    return _escape(data.replace("\r\n", "\n").replace("\r", "\n"))
+
+
+def serialize_element(elem, level=0, indent="    "):
+    """Return the text write_element() would write for the element."""
+    buf = io.StringIO()
+    write_element(buf, elem, level, indent)
+    return buf.getvalue()
+
+
+def write_element(f, elem, level=0, indent="    "):
+    """
+    Write an Element to a text file, indented as minidom's toprettyxml() does.
+
+    The element is written as it is walked, no intermediate copy of the
+    document is built.
+    """
+    prefix = indent * level
+    if elem.tag is ET.Comment:
+        f.write(f"{prefix}<!--{elem.text}-->\n")
+        return
+
+    f.write(prefix + "<" + elem.tag)
+    for name, value in elem.attrib.items():
+        f.write(f' {name}="{_escape(value)}"')
+
+    # Children nodes as seen by minidom: leading text, then each child and its tail
+    has_text = bool(elem.text)
+    children = len(elem)
+    if not has_text and not children:
+        f.write("/>\n")
+        return
+
+    f.write(">")
+    if has_text and not children:
+        f.write(_escape_text(elem.text))
+    else:
+        f.write("\n")
+        child_prefix = prefix + indent
+        if has_text:
+            f.write(child_prefix + _escape_text(elem.text) + "\n")
+        for child in elem:
+            write_element(f, child, level + 1, indent)
+            if child.tail:
+                f.write(child_prefix + _escape_text(child.tail) + "\n")
+        f.write(prefix)
+    f.write(f"</{elem.tag}>\n")
+
+
+def open_xml(path):
+    """
+    Open an XML file for parsing, after the blank lines some hand-written
+    iodefs have before the XML declaration (accepted by XIOS, not by expat).
+    """
+    f = open(path, "rb")
+    position = 0
+    while True:
+        chunk = f.read(4096)
+        stripped = chunk.lstrip()
+        if stripped or not chunk:
+            f.seek(position + len(chunk) - len(stripped))
+            return f
+        position += len(chunk)
+
+
+class IodefWriter:
+    """
+    Stream a <simulation> document to a file one context at a time.
+
+    Usage:
+        with IodefWriter("iodef.xml") as writer:
+            for context in contexts:
+                writer.write_context(context)
+
+    The output is byte-identical to minidom.parseString(ET.tostring(tree))
+    .toprettyxml(indent="    ") on the equivalent tree, but only the context
+    being written has to be kept in memory.
+    """
+
+    def __init__(self, path, indent="    "):
+        self.path = path
+        self.indent = indent
+        self.file = None
+        self.n_contexts = 0
+
+    def __enter__(self):
+        self.file = open(self.path, "w")
+        self.file.write('<?xml version="1.0" ?>\n')
+        return self
+
+    def write_context(self, context):
+        """Write a context element (or any child of <simulation>)."""
+        if self.n_contexts == 0:
+            self.file.write("<simulation>\n")
+        write_element(self.file, context, level=1, indent=self.indent)
+        self.n_contexts += 1
+
+    def write_text(self, text):
+        """Write a context already serialized by write_element at level 1."""
+        if self.n_contexts == 0:
+            self.file.write("<simulation>\n")
+        self.file.write(text)
+        self.n_contexts += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.n_contexts == 0:
+            self.file.write("<simulation/>\n")
+        else:
+            self.file.write("</simulation>\n")
+        self.file.close()
+        self.file = None
+        return False
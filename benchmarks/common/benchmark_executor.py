@@ -0,0 +1,188 @@
+#################### BENCHMARK EXECUTORS ####################
+# A benchmark run renders the job template of the software for every
+# configuration (n, m) or (n, m, levels), runs the jobs and collects each one
+# as soon as it is over. The executors only differ in how the jobs are run:
+#   - SlurmSbatcher (slurm_sbatcher.py): sbatch, followed with sacct/squeue
+#   - LocalExecutor (local_executor.py): bash + mpirun on this machine
+# Both write the logs to the same outputs/ layout, read by parser_utils.
+
+import os
+import re
+
+# Weak scaling: the levels grow with the process count, so that every rank
+# exchanges the same number of bytes as with p_list[0] processes and base_levels
+def weak_scaling_configs(p_list, base_levels=1):
+    return [(p, p, base_levels * p // p_list[0]) for p in p_list]
+
+# Message size sweep: the levels exchanged at a fixed process count
+def message_size_configs(p, levels_list):
+    return [(p, p, levels) for levels in levels_list]
+
+# Placeholders of the job templates that change with the configuration. In a
+# job array they become shell variables, read from the parameter table of the
+# array at the line of SLURM_ARRAY_TASK_ID
+TASK_PLACEHOLDERS = ("N", "M", "NTOT", "LEVELS", "SUFFIX")
+
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# State of the jobs that left squeue, when sacct is not available
+FINISHED = "FINISHED"
+# States of the jobs whose results can be collected
+SUCCESS_STATES = ("COMPLETED", FINISHED)
+
+# Fill all the {{NAME}} placeholders of a template in a single pass
+def render_template(template, values):
+    def value(match):
+        if match.group(1) not in values:
+            raise KeyError(f"No value for the placeholder {match.group(0)} of the job template")
+        return str(values[match.group(1)])
+    return PLACEHOLDER.sub(value, template)
+
+class BenchmarkExecutor:
+    """
+    Run a benchmark job per configuration (n, m) or (n, m, levels) of
+    nm_list, rendered from the job template of the software.
+
+    The ping pong benchmark passes do_interpolation to the jobs, the
+    interpolation one sets interpolation_iterations, run_dir_suffix="_interp"
+    and min_ntasks (to get whole nodes for the small process counts).
+
+    The executors implement submit_all_jobs and wait_for_jobs, run() is
+    the same for all of them.
+    """
+
+    def __init__(
+        self,
+        nm_list,
+        res,
+        software_path,
+        template_file,
+        results_dir,
+        output_dir,
+        do_interpolation=None,
+        interpolation_iterations=None,
+        run_dir_suffix="",
+        min_ntasks=None):
+
+        self.NM_LIST = nm_list
+        self.DO_INTERPOLATION = do_interpolation
+        self.INTERP_ITERATIONS = interpolation_iterations
+        self.RES = res
+
+        # High resolution grids labels
+        if self.RES == "high":
+            self.GRIDS = (("t12e", "LR"), ("icoh", "U"))  # Highres
+        # Low resolution grids labels for debugging
+        elif self.RES == "low":
+            self.GRIDS = (("torc", "LR"), ("lmdz", "LR"))  # Lowres
+        else:
+            raise ValueError("RES must be either 'high' or 'low'")
+
+        self.SOFTWARE_PATH = software_path
+        self.TEMPLATE_PATH = software_path+template_file
+        self.RESULTS_DIR_PATH = software_path+results_dir
+        self.OUTPUT_DIR_PATH = software_path+output_dir
+        self.RUN_DIR_SUFFIX = run_dir_suffix
+        self.MIN_NTASKS = min_ntasks
+
+        os.makedirs(self.RESULTS_DIR_PATH, exist_ok=True)
+        os.makedirs(self.OUTPUT_DIR_PATH, exist_ok=True)
+
+    # Values of the placeholders common to all the jobs
+    def common_values(self):
+        return {
+            "RES": self.RES,
+            "GRID_NAME_SRC": self.GRIDS[0][0],
+            "GRID_TYPE_SRC": self.GRIDS[0][1],
+            "GRID_NAME_DST": self.GRIDS[1][0],
+            "GRID_TYPE_DST": self.GRIDS[1][1],
+            # The jobs run from the software folder wherever they are started
+            "SOFTWARE_DIR": os.path.abspath(self.SOFTWARE_PATH),
+            "INTERP_ITERATIONS": self.INTERP_ITERATIONS,
+        }
+
+    # Values of the placeholders of a configuration
+    def task_values(self, n, m, levels=1):
+        ntask = n + m
+        if self.MIN_NTASKS is not None:
+            ntask = max(ntask, self.MIN_NTASKS)
+        return {
+            "N": n,
+            "M": m,
+            "NTOT": ntask,
+            "LEVELS": levels,
+            # Runs with levels (weak scaling and message size sweeps) get their own files
+            "SUFFIX": "" if levels == 1 else f"_l{levels}",
+        }
+
+    # Arguments passed to the job scripts
+    def script_args(self):
+        # Pass also if to generate the weights or not during the run
+        return [] if self.DO_INTERPOLATION is None else [str(self.DO_INTERPOLATION).lower()]
+
+    def read_template(self):
+        with open(self.TEMPLATE_PATH) as f:
+            return f.read()
+
+    def make_run_dir(self, values):
+        # Create folder named run_n_m
+        run_dir = f"{self.SOFTWARE_PATH}/run_{values['N']}_{values['M']}{values['SUFFIX']}{self.RUN_DIR_SUFFIX}"
+        os.makedirs(run_dir, exist_ok=True)
+        return run_dir
+
+    # Write the job script of a configuration in its run folder, return its path
+    def write_job_script(self, n, m, levels=1, template=None):
+        values = self.task_values(n, m, levels)
+        run_dir = self.make_run_dir(values)
+
+        # Create job script name based on n and m in
+        job_script = f"{run_dir}/job_n{n}_m{m}{values['SUFFIX']}.sh"
+
+        # Customize the job script content using the template
+        content = render_template(template or self.read_template(), {**self.common_values(), **values})
+        with open(job_script, "w") as f:
+            f.write(content)
+        return job_script
+
+    # Start the jobs of all the configurations, return one job ID per configuration, in order
+    def submit_all_jobs(self):
+        raise NotImplementedError
+
+    # Wait for all jobs to finish, calling on_finish(job_id, state) as soon as
+    # each one is over. labels gives the names of the jobs in the reports.
+    # Return the final state of every job
+    def wait_for_jobs(self, job_ids, on_finish=None, labels=None):
+        raise NotImplementedError
+
+    # Run all jobs and wait for them, calling on_finish(config, state) as soon
+    # as the job of each configuration is over (e.g. to collect its results).
+    # Return the final state of every configuration
+    def run(self, on_finish=None):
+        job_ids = self.submit_all_jobs()
+        configs = dict(zip(job_ids, self.NM_LIST))
+        labels = {job_id: "(" + ", ".join(f"{name}={value}" for name, value in zip("nml", config)) + ")"
+                  for job_id, config in configs.items()}
+
+        def finished(job_id, state):
+            if on_finish is None:
+                return
+            try:
+                on_finish(configs[job_id], state)
+            except Exception as e:
+                # A job without results must not stop the others from being collected
+                print(f"❌ Collection of job {job_id} {labels[job_id]} failed: {e}")
+
+        final = self.wait_for_jobs(job_ids, on_finish=finished, labels=labels)
+        failed = {job_id: state for job_id, state in final.items() if state not in SUCCESS_STATES}
+        if failed:
+            print(f"❌ {len(failed)} jobs did not complete: " + ", ".join(f"{labels[job_id]} {state}" for job_id, state in failed.items()))
+        else:
+            print("All jobs have finished.")
+        return {configs[job_id]: state for job_id, state in final.items()}
+
+    # Print the end of a job, as soon as it is over
+    def report_job(self, job_id, state, label=""):
+        if state in SUCCESS_STATES:
+            print(f"✅ Job {job_id} {label} {state}")
+        else:
+            print(f"❌ Job {job_id} {label} {state}")
@@ -1,33 +1,56 @@
 #################### OASIS COLLECT DATA FROM BENCHMARKS ####################
 
+import os
 from parser_utils import *
+from trace_analysis import load_ping_pong_traces, trace_results, make_trace_plot
 
-# Collect and plot results from already run jobs
-trim_outliers = 10  # Percentage of outliers to trim
-NM_LIST = [(n, n) for n in [2, 4, 8, 16, 32, 64, 128, 256, 512]]  # Process counts for ping-pong tests
-
-df = collect_results(
-    IS_XIOS=False,
-    NM_LIST=NM_LIST, 
-    PING_PONG_LINE_PREFIX=" TIMING:",
-    INTERPOLATION_LINE_PREFIX=" YAC mapping time =",
-    RESULTS_CSV="../oasis/results/scaling_results.csv", 
-    RAW_TIMES_DIR="../oasis/outputs", 
-    PARSE_INTERPOLATIONS=False, 
-    trim_outliers=trim_outliers)
-print(df)
-
-dfi = collect_interpolations_results(
-    IS_XIOS=False,
-    NM_LIST=NM_LIST,
-    INTERPOLATION_LINE_PREFIX=" YAC mapping time =",
-    RESULTS_CSV="../oasis/results_interp/interpolation_results.csv",
-    RAW_TIMES_DIR="../oasis/outputs_interp",
-)
-
-print(dfi)
-title_pp = "OASIS 100 Ping Pongs Scaling Results (trimmed outliers: {}%)".format(trim_outliers)
-title_interp = "Two OASIS (with YAC) 1° order conservative weights generation time"
-
-make_ping_pong_plot(df, title_pp, save_path="benchmark_oasis_ping_pong.svg")
-make_interpolation_plot(dfi, title_interp, save_path="benchmark_oasis_interpolation.svg")
\ No newline at end of file
+if __name__ == "__main__":
+    # Collect and plot results from already run jobs
+    trim_outliers = 10  # Percentage of outliers to trim
+    NM_LIST = [(n, n) for n in [2, 4, 8, 16, 32, 64, 128, 256, 512]]  # Process counts for ping-pong tests
+    CACHE_DIR = "../oasis/.parse_cache"  # Parsed logs, reused while the logs are unchanged
+    workers = os.cpu_count()  # Processes parsing the logs
+
+    df = collect_results(
+        IS_XIOS=False,
+        NM_LIST=NM_LIST, 
+        PING_PONG_LINE_PREFIX=" TIMING:",
+        INTERPOLATION_LINE_PREFIX=" YAC mapping time =",
+        RESULTS_CSV="../oasis/results/scaling_results.csv", 
+        RAW_TIMES_DIR="../oasis/outputs", 
+        PARSE_INTERPOLATIONS=False, 
+        trim_outliers=trim_outliers,
+        CACHE_DIR=CACHE_DIR,
+        workers=workers,
+        exclude_warmup=True)
+
+    # Warm-up, first exchange, jitter and autocorrelation of every ping pong trace
+    traces = load_ping_pong_traces(NM_LIST, "../oasis/outputs", " TIMING:", CACHE_DIR, workers)
+    dft = trace_results(traces, RESULTS_CSV="../oasis/results/trace_results.csv")
+    print(dft)
+    print(df)
+
+    dfi = collect_interpolations_results(
+        IS_XIOS=False,
+        NM_LIST=NM_LIST,
+        INTERPOLATION_LINE_PREFIX=" YAC mapping time =",
+        RESULTS_CSV="../oasis/results_interp/interpolation_results.csv",
+        RAW_TIMES_DIR="../oasis/outputs_interp",
+        CACHE_DIR=CACHE_DIR,
+        workers=workers,
+    )
+
+    print(dfi)
+    title_pp = "OASIS 100 Ping Pongs Scaling Results (warm-up excluded, trimmed outliers: {}%)".format(trim_outliers)
+    title_interp = "Two OASIS (with YAC) 1° order conservative weights generation time"
+
+    make_ping_pong_plot(df, title_pp, save_path="benchmark_oasis_ping_pong.svg")
+    make_trace_plot(traces, "OASIS Ping Pong times per iteration", save_path="benchmark_oasis_ping_pong_traces.svg")
+    make_interpolation_plot(dfi, title_interp, save_path="benchmark_oasis_interpolation.svg")
+
+    # Per-rank weights generation times of the largest run with interpolation results
+    if not dfi["avg_interp"].dropna().empty:
+        n, m = dfi.dropna(subset=["avg_interp"])[["n", "m"]].iloc[-1]
+        matrix = interpolation_matrices(False, [(n, m)], "../oasis/outputs_interp", " YAC mapping time =", CACHE_DIR)[0]
+        make_imbalance_heatmap(matrix, f"OASIS weights generation time per rank (n={n}, m={m})",
+                               save_path="benchmark_oasis_interpolation_imbalance.svg", model_names=("ocean", "atmos"))
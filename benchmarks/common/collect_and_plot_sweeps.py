@@ -0,0 +1,51 @@
+#################### COLLECT DATA FROM THE WEAK SCALING AND MESSAGE SIZE SWEEPS ####################
+
+import os
+import sys
+from parser_utils import *
+from benchmark_executor import weak_scaling_configs, message_size_configs
+
+if __name__ == "__main__":
+    # Get XIOS or OASIS from argv
+    if len(sys.argv) < 2 or sys.argv[1].lower() not in ["xios", "oasis"]:
+        print("Usage: python collect_and_plot_sweeps.py <xios|oasis>")
+        sys.exit(1)
+    software = sys.argv[1].lower()
+    name = software.upper()
+
+    # Same sweeps as runBenchmark.py
+    trim_outliers = 10 # Percentage of outliers to trim
+    WEAK_LIST = weak_scaling_configs([1, 2, 4, 8, 16, 32, 64])
+    MESSAGE_SIZE_LIST = message_size_configs(64, [1, 2, 4, 8, 16, 32, 64])
+    CACHE_DIR = f"../{software}/.parse_cache"  # Parsed logs, reused while the logs are unchanged
+    workers = os.cpu_count()  # Processes parsing the logs
+
+    df_weak = collect_sweep_results(
+        NML_LIST=WEAK_LIST,
+        RAW_TIMES_DIR=f"../{software}/outputs",
+        RESULTS_CSV=f"../{software}/results/weak_scaling_results.csv",
+        RES="high",
+        PING_PONG_LINE_PREFIX=" TIMING:",
+        trim_outliers=trim_outliers,
+        CACHE_DIR=CACHE_DIR,
+        workers=workers,
+        exclude_warmup=True)
+
+    df_size = collect_sweep_results(
+        NML_LIST=MESSAGE_SIZE_LIST,
+        RAW_TIMES_DIR=f"../{software}/outputs",
+        RESULTS_CSV=f"../{software}/results/message_size_results.csv",
+        RES="high",
+        PING_PONG_LINE_PREFIX=" TIMING:",
+        trim_outliers=trim_outliers,
+        CACHE_DIR=CACHE_DIR,
+        workers=workers,
+        exclude_warmup=True)
+
+    print(df_weak)
+    print(df_size)
+
+    make_weak_scaling_plot(df_weak, f"{name} Ping Pong Weak Scaling (warm-up excluded, trimmed outliers: {trim_outliers}%)",
+                           save_path=f"benchmark_{software}_weak_scaling.svg")
+    make_message_size_plot(df_size, f"{name} Ping Pong Message Size (p={MESSAGE_SIZE_LIST[0][0]}, warm-up excluded, trimmed outliers: {trim_outliers}%)",
+                           save_path=f"benchmark_{software}_message_size.svg")
@@ -1,32 +1,55 @@
 #################### XIOS COLLECT DATA FROM BENCHMARKS ####################
 
+import os
 from parser_utils import *
+from trace_analysis import load_ping_pong_traces, trace_results, make_trace_plot
 
-# Collect and plot results from already run jobs
-trim_outliers = 10 # Percentage of outliers to trim
-NM_LIST = [(n, n) for n in [2, 4, 8, 16, 32, 64, 128, 256, 512]]  # Process counts for ping-pong tests
-
-df = collect_results(
-    IS_XIOS=True,
-    NM_LIST=NM_LIST, 
-    PING_PONG_LINE_PREFIX=" TIMING:",
-    INTERPOLATION_LINE_PREFIX="",
-    RESULTS_CSV="../xios/results/scaling_results.csv", 
-    RAW_TIMES_DIR="../xios/outputs", 
-    PARSE_INTERPOLATIONS=False, 
-    trim_outliers=trim_outliers)
-
-dfi = collect_interpolations_results(
-    IS_XIOS=True,
-    NM_LIST=NM_LIST, 
-    INTERPOLATION_LINE_PREFIX="",
-    RESULTS_CSV="../xios/results_interp/scaling_results.csv", 
-    RAW_TIMES_DIR="../xios/outputs_interp")
-
-print(dfi)
-
-title_pp = "XIOS Ping Pong Scaling Results (trimmed outliers: {}%)".format(trim_outliers)
-title_interp = "Two XIOS 1° order conservative weights generation time"
-
-make_ping_pong_plot(df, title_pp, save_path="benchmark_xios_ping_pong.svg")
-make_interpolation_plot(dfi, title_interp, save_path="benchmark_xios_interpolation.svg")
\ No newline at end of file
+if __name__ == "__main__":
+    # Collect and plot results from already run jobs
+    trim_outliers = 10 # Percentage of outliers to trim
+    NM_LIST = [(n, n) for n in [2, 4, 8, 16, 32, 64, 128, 256, 512]]  # Process counts for ping-pong tests
+    CACHE_DIR = "../xios/.parse_cache"  # Parsed logs, reused while the logs are unchanged
+    workers = os.cpu_count()  # Processes parsing the logs
+
+    df = collect_results(
+        IS_XIOS=True,
+        NM_LIST=NM_LIST, 
+        PING_PONG_LINE_PREFIX=" TIMING:",
+        INTERPOLATION_LINE_PREFIX="",
+        RESULTS_CSV="../xios/results/scaling_results.csv", 
+        RAW_TIMES_DIR="../xios/outputs", 
+        PARSE_INTERPOLATIONS=False, 
+        trim_outliers=trim_outliers,
+        CACHE_DIR=CACHE_DIR,
+        workers=workers,
+        exclude_warmup=True)
+
+    # Warm-up, first exchange, jitter and autocorrelation of every ping pong trace
+    traces = load_ping_pong_traces(NM_LIST, "../xios/outputs", " TIMING:", CACHE_DIR, workers)
+    dft = trace_results(traces, RESULTS_CSV="../xios/results/trace_results.csv")
+    print(dft)
+
+    dfi = collect_interpolations_results(
+        IS_XIOS=True,
+        NM_LIST=NM_LIST, 
+        INTERPOLATION_LINE_PREFIX="",
+        RESULTS_CSV="../xios/results_interp/scaling_results.csv", 
+        RAW_TIMES_DIR="../xios/outputs_interp",
+        CACHE_DIR=CACHE_DIR,
+        workers=workers)
+
+    print(dfi)
+
+    title_pp = "XIOS Ping Pong Scaling Results (warm-up excluded, trimmed outliers: {}%)".format(trim_outliers)
+    title_interp = "Two XIOS 1° order conservative weights generation time"
+
+    make_ping_pong_plot(df, title_pp, save_path="benchmark_xios_ping_pong.svg")
+    make_trace_plot(traces, "XIOS Ping Pong times per iteration", save_path="benchmark_xios_ping_pong_traces.svg")
+    make_interpolation_plot(dfi, title_interp, save_path="benchmark_xios_interpolation.svg")
+
+    # Per-rank weights generation times of the largest run with interpolation results
+    if not dfi["avg_interp"].dropna().empty:
+        n, m = dfi.dropna(subset=["avg_interp"])[["n", "m"]].iloc[-1]
+        matrix = interpolation_matrices(True, [(n, m)], "../xios/outputs_interp", "", CACHE_DIR)[0]
+        make_imbalance_heatmap(matrix, f"XIOS weights generation time per rank (n={n}, m={m})",
+                               save_path="benchmark_xios_interpolation_imbalance.svg", model_names=("oce", "atm"))
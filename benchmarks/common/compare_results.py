@@ -0,0 +1,171 @@
+#################### BENCHMARK REGRESSION DETECTOR ####################
+# Compare benchmark result sets (e.g. two XIOS builds) configuration by
+# configuration. A result set is either a directory of raw logs (the
+# outputs/ or outputs_interp/ of a benchmark) or a results CSV written by
+# collect_results/collect_interpolations_results.
+#
+# For raw logs, the ratio candidate median / baseline median of every (n, m)
+# gets a bootstrap confidence interval: the samples of both sets are
+# resampled with replacement n_resamples times, all at once in NumPy. A
+# configuration is a regression if the whole interval is above 1 and the
+# ratio exceeds 1 + threshold, an improvement if the whole interval is below
+# 1 and the ratio is under 1 - threshold. CSV files only hold one value per
+# configuration, which are compared to the threshold without interval.
+#
+# The exit code is 1 if any candidate has a regression, so the script can
+# gate XIOS upgrades.
+#
+# Usage:
+#   python compare_results.py ../xios/outputs ../xios_new/outputs [--threshold 0.05]
+#   python compare_results.py ../xios/outputs_interp ../xios_new/outputs_interp --kind interpolation
+
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from log_ingest import load_all_samples
+from parser_utils import interpolation_matrix
+
+# Default log files and line prefixes of the raw result sets
+LOG_FILES = {
+    ("ping_pong", True): ("ocean_times", " TIMING:"),
+    ("ping_pong", False): ("ocean_times", " TIMING:"),
+    ("interpolation", True): ("interpolations_times", ""),
+    ("interpolation", False): ("ocean_times", " YAC mapping time ="),
+}
+# Value compared in the results CSV files
+CSV_COLUMNS = {"ping_pong": "medi_pp", "interpolation": "avg_interp"}
+
+
+def bootstrap_ratio_ci(baseline, candidate, n_resamples=2000, confidence=0.95, seed=0, max_chunk=2**24):
+    """
+    Return the ratio of the medians of candidate and baseline and its
+    bootstrap confidence interval (ratio, low, high).
+
+    The resamples are drawn as index matrices, in chunks of at most
+    max_chunk elements to bound the memory.
+    """
+    rng = np.random.default_rng(seed)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+
+    def resampled_medians(samples):
+        medians = np.empty(n_resamples)
+        rows = max(1, max_chunk // samples.size)
+        for start in range(0, n_resamples, rows):
+            stop = min(start + rows, n_resamples)
+            idx = rng.integers(0, samples.size, size=(stop - start, samples.size))
+            medians[start:stop] = np.median(samples[idx], axis=1)
+        return medians
+
+    ratios = resampled_medians(candidate) / resampled_medians(baseline)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(ratios, [alpha, 1 - alpha])
+    return np.median(candidate) / np.median(baseline), low, high
+
+
+def load_result_set(path, kind="ping_pong", is_xios=True, prefix=None, cache_dir=None, workers=1):
+    """
+    Return {(n, m): samples} for a directory of raw logs, or {(n, m): value}
+    for a results CSV file.
+
+    The interpolation samples are the iteration times (the two interpolations
+    of an iteration, averaged over the ranks of each model).
+    """
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+        column = CSV_COLUMNS[kind]
+        return {(int(n), int(m)): value for n, m, value in zip(df["n"], df["m"], df[column]) if pd.notna(value)}
+
+    file_prefix, default_prefix = LOG_FILES[(kind, is_xios)]
+    line_prefix = default_prefix if prefix is None else prefix
+    pattern = re.compile(rf"{file_prefix}_n(\d+)_m(\d+)\.txt$")
+    configs = sorted((int(match.group(1)), int(match.group(2)), os.path.join(path, name))
+                     for name in os.listdir(path) if (match := pattern.match(name)))
+    all_samples = load_all_samples([(file, line_prefix) for _, _, file in configs], cache_dir, workers)
+
+    result_set = {}
+    for (n, m, _), samples in zip(configs, all_samples):
+        if kind == "interpolation":
+            samples = np.nanmean(interpolation_matrix(samples, n, m), axis=2).sum(axis=1)
+        if len(samples) > 0:
+            result_set[(n, m)] = samples
+    return result_set
+
+
+def compare_result_sets(baseline, candidate, threshold=0.05, n_resamples=2000, confidence=0.95):
+    """
+    Compare two result sets of load_result_set and return a DataFrame with
+    one row per (n, m) present in both.
+    """
+    records = []
+    for n, m in sorted(baseline.keys() & candidate.keys()):
+        base, cand = baseline[(n, m)], candidate[(n, m)]
+        if np.ndim(base) and np.ndim(cand):
+            ratio, low, high = bootstrap_ratio_ci(base, cand, n_resamples, confidence)
+            base_median, cand_median = np.median(base), np.median(cand)
+        else:
+            # Single values: no interval, only the threshold is checked
+            base_median = np.median(base) if np.ndim(base) else base
+            cand_median = np.median(cand) if np.ndim(cand) else cand
+            ratio = cand_median / base_median
+            low = high = ratio
+
+        if low > 1 and ratio > 1 + threshold:
+            status = "regression"
+        elif high < 1 and ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        records.append({
+            "n": n,
+            "m": m,
+            "baseline_median": base_median,
+            "candidate_median": cand_median,
+            "ratio": ratio,
+            "ci_low": low,
+            "ci_high": high,
+            "status": status,
+        })
+    return pd.DataFrame(records, columns=["n", "m", "baseline_median", "candidate_median",
+                                          "ratio", "ci_low", "ci_high", "status"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect performance regressions between benchmark result sets.")
+    parser.add_argument("baseline", help="Directory of raw logs or results CSV of the reference")
+    parser.add_argument("candidates", nargs="+", help="Directories of raw logs or results CSV to compare with the baseline")
+    parser.add_argument("--kind", choices=["ping_pong", "interpolation"], default="ping_pong", help="Benchmark of the result sets")
+    parser.add_argument("--oasis", action="store_true", help="Raw logs of the OASIS benchmark (default: XIOS)")
+    parser.add_argument("--prefix", help="Prefix of the timing lines (default: the one of the benchmark)")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Relative change of the median reported as regression or improvement")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the bootstrap intervals")
+    parser.add_argument("--resamples", type=int, default=2000, help="Number of bootstrap resamples")
+    parser.add_argument("--output", help="CSV file of the comparison of all the candidates")
+    args = parser.parse_args()
+
+    def load(path):
+        return load_result_set(path, kind=args.kind, is_xios=not args.oasis, prefix=args.prefix)
+
+    baseline = load(args.baseline)
+    reports = []
+    regressions = 0
+    for candidate_path in args.candidates:
+        report = compare_result_sets(baseline, load(candidate_path), args.threshold, args.resamples, args.confidence)
+        print(f"{candidate_path} vs {args.baseline}:")
+        print(report.to_string(index=False))
+        print()
+        regressions += (report["status"] == "regression").sum()
+        reports.append(report.assign(candidate=candidate_path))
+
+    if args.output:
+        pd.concat(reports).to_csv(args.output, index=False)
+
+    if regressions:
+        print(f"❌ {regressions} regressions above {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"✅ No regression above {args.threshold:.0%}")
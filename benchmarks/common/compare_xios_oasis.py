@@ -0,0 +1,34 @@
+#################### XIOS VS OASIS SCALING MODELS ####################
+
+from scaling_models import *
+
+if __name__ == "__main__":
+    # Results collected by collect_and_plot_xios.py and collect_and_plot_oasis.py
+    res = "high"
+    efficiency = 0.5  # Parallel efficiency target for the core count recommendation
+
+    ping_pong = {
+        "XIOS": pd.read_csv("../xios/results/scaling_results.csv"),
+        "OASIS": pd.read_csv("../oasis/results/scaling_results.csv"),
+    }
+    interpolation = {
+        "XIOS": pd.read_csv("../xios/results_interp/scaling_results.csv"),
+        "OASIS": pd.read_csv("../oasis/results_interp/interpolation_results.csv"),
+    }
+
+    report_pp = scaling_report(ping_pong, "avg_pp", res=res, ping_pong=True, efficiency=efficiency)
+    report_interp = scaling_report(interpolation, "avg_interp", res=res, efficiency=efficiency)
+    print("Ping pong:")
+    print(report_pp.to_string(index=False))
+    print(karp_flatt_table(ping_pong, "avg_pp"))
+    print("Interpolation:")
+    print(report_interp.to_string(index=False))
+    print(karp_flatt_table(interpolation, "avg_interp"))
+
+    report_pp.to_latex("benchmark_scaling_models_ping_pong.tex", index=False)
+    report_interp.to_latex("benchmark_scaling_models_interpolation.tex", index=False)
+
+    make_scaling_comparison_plot(ping_pong, "avg_pp", "XIOS vs OASIS ping pong scaling models",
+                                 save_path="benchmark_scaling_models_ping_pong.svg", report=report_pp)
+    make_scaling_comparison_plot(interpolation, "avg_interp", "XIOS vs OASIS weights generation scaling models",
+                                 save_path="benchmark_scaling_models_interpolation.svg", report=report_interp)
@@ -0,0 +1,158 @@
+#################### FAKE SLURM ####################
+# Stand-in for sbatch, squeue and sacct, to test the submission and the
+# follow-up of the benchmarks without a cluster. The jobs are only recorded
+# (with their options, script and arguments) in FAKE_SLURM_DIR/jobs.json:
+#   - each one is running for FAKE_SLURM_POLLS calls of squeue or sacct
+#     (default 0)
+#   - then it ends COMPLETED, or with the state given for its ID in
+#     FAKE_SLURM_STATES (e.g. "1001_2=TIMEOUT,1002=FAILED")
+# The first FAKE_SLURM_SQUEUE_ERRORS calls of squeue fail as when the
+# controller does not respond (default 0).
+# As sbatch, it reads the #SBATCH directives of the script before any shell
+# expansion, and rejects the numeric options that are not numbers (e.g. a
+# --ntasks=${NTOT} left in a job array script).
+#
+# Usage:
+#   sbatcher = SlurmSbatcher(...,
+#                            sbatch=["python", "fake_slurm.py", "sbatch"],
+#                            squeue=["python", "fake_slurm.py", "squeue"],
+#                            sacct=["python", "fake_slurm.py", "sacct"])
+
+import json
+import os
+import sys
+
+STATE_DIR = os.environ.get("FAKE_SLURM_DIR", ".fake_slurm")
+STATE_FILE = os.path.join(STATE_DIR, "jobs.json")
+
+
+def load_jobs():
+    if not os.path.exists(STATE_FILE):
+        return []
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def save_jobs(jobs):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(jobs, f, indent=1)
+
+
+def task_ids(job):
+    """IDs of the tasks of a job, <id>_<index> for a job array."""
+    if job["array"] is None:
+        return [str(job["id"])]
+    first, last = map(int, job["array"].split("-"))
+    return [f"{job['id']}_{index}" for index in range(first, last + 1)]
+
+
+def final_state(task_id):
+    states = dict(item.split("=") for item in os.environ.get("FAKE_SLURM_STATES", "").split(",") if "=" in item)
+    return states.get(task_id, "COMPLETED")
+
+
+def selected_jobs(args):
+    """Jobs of the --jobs=<id>,<id> option, all of them without it."""
+    jobs = load_jobs()
+    selection = next((arg.split("=", 1)[1].split(",") for arg in args if arg.startswith("--jobs=")), None)
+    return jobs, [job for job in jobs if selection is None or str(job["id"]) in selection]
+
+
+def poll(jobs, selected):
+    """Running tasks of the selected jobs (before this poll), one poll less for each job."""
+    running = []
+    for job in selected:
+        if job["polls"] > 0:
+            job["polls"] -= 1
+            running.append(job)
+    save_jobs(jobs)
+    return running
+
+
+# Options of sbatch taking a number
+NUMERIC_OPTIONS = ("--ntasks", "--nodes", "--ntasks-per-node", "--cpus-per-task")
+
+
+def script_directives(path):
+    """Options of the #SBATCH lines of a script, up to its first command (as sbatch)."""
+    directives = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith("#SBATCH"):
+                directives += line.split()[1:2]
+            elif line.strip() and not line.startswith("#"):
+                break
+    return directives
+
+
+def sbatch(args):
+    options = [arg for arg in args if arg.startswith("-")]
+    positional = [arg for arg in args if not arg.startswith("-")]
+    array = next((option.split("=", 1)[1] for option in options if option.startswith("--array=")), None)
+
+    if not os.path.exists(positional[0]):
+        print(f"sbatch: error: Unable to open file {positional[0]}", file=sys.stderr)
+        sys.exit(1)
+    for option in script_directives(positional[0]) + options:
+        name, _, value = option.partition("=")
+        if name in NUMERIC_OPTIONS and not value.isdigit():
+            print(f'sbatch: error: Invalid numeric value "{value}" for {name}.', file=sys.stderr)
+            sys.exit(1)
+
+    jobs = load_jobs()
+    job = {
+        "id": 1000 + len(jobs),
+        "options": options,
+        "script": positional[0],
+        "args": positional[1:],
+        "array": array,
+        "polls": int(os.environ.get("FAKE_SLURM_POLLS", "0")),
+    }
+    jobs.append(job)
+    save_jobs(jobs)
+    print(f"Submitted batch job {job['id']}")
+
+
+def squeue(args):
+    errors_file = os.path.join(STATE_DIR, "squeue_errors")
+    errors = int(open(errors_file).read()) if os.path.exists(errors_file) else 0
+    if errors < int(os.environ.get("FAKE_SLURM_SQUEUE_ERRORS", "0")):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(errors_file, "w") as f:
+            f.write(str(errors + 1))
+        print("slurm_load_jobs error: Socket timed out on send/recv operation", file=sys.stderr)
+        sys.exit(1)
+
+    jobs, selected = selected_jobs(args)
+    running = poll(jobs, selected)
+    if "--noheader" not in args:
+        print("JOBID PARTITION NAME USER ST TIME NODES NODELIST(REASON)")
+    for job in running:
+        for task_id in task_ids(job):
+            if any(arg.startswith("--format=") for arg in args):
+                print(f"{task_id}|RUNNING")
+            else:
+                print(f"{task_id} prod bench {os.environ.get('USER', 'user')} R 0:01 1 node001")
+    if not running and any(arg.startswith("--jobs=") for arg in args):
+        # As squeue, once the jobs have left the queue
+        print("slurm_load_jobs error: Invalid job id specified", file=sys.stderr)
+        sys.exit(1)
+
+
+def sacct(args):
+    jobs, selected = selected_jobs(args)
+    running = poll(jobs, selected)
+    if "--noheader" not in args:
+        print("JobID|State")
+    for job in selected:
+        for task_id in task_ids(job):
+            print(f"{task_id}|{'RUNNING' if job in running else final_state(task_id)}")
+
+
+if __name__ == "__main__":
+    commands = {"sbatch": sbatch, "squeue": squeue, "sacct": sacct}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("Usage: python fake_slurm.py <sbatch|squeue|sacct> [arguments]")
+        sys.exit(1)
+    commands[sys.argv[1]](sys.argv[2:])
@@ -0,0 +1,142 @@
+#################### LOCAL EXECUTOR ####################
+# Run the benchmark jobs on this machine, without Slurm, e.g. the low
+# resolution sweeps on a workstation:
+#   - the job scripts are rendered from the same templates, without their
+#     #SBATCH directives, and run with bash, so the mpirun MPMD lines, the
+#     run folders and the outputs/ logs are the same as on the cluster
+#   - the software is built once before the jobs (their make is then a no-op)
+#   - the jobs run concurrently as long as their NTOT ranks fit in the cores;
+#     a job larger than the machine runs alone
+#   - the options of mpirun (e.g. --oversubscribe) are passed with the
+#     MPIRUN_OPTIONS environment variable, read by the templates
+
+import os
+import signal
+import subprocess
+import time
+from datetime import datetime
+
+from benchmark_executor import BenchmarkExecutor
+
+class LocalExecutor(BenchmarkExecutor):
+    """
+    Run a benchmark job per configuration (n, m) or (n, m, levels) of
+    nm_list with bash on this machine (see BenchmarkExecutor for the common
+    arguments).
+
+    cores is the number of ranks run at the same time (all the cores by
+    default), timeout the time limit of a job in seconds, build the command
+    run in the software folder before the jobs (None to skip it) and
+    mpirun_options the MPIRUN_OPTIONS of the jobs (the environment one by
+    default). The stdout and stderr of the jobs are written to results_dir
+    as with Slurm.
+    """
+
+    def __init__(
+        self,
+        nm_list,
+        res,
+        software_path,
+        template_file,
+        results_dir,
+        output_dir,
+        do_interpolation=None,
+        interpolation_iterations=None,
+        run_dir_suffix="",
+        min_ntasks=None,
+        cores=None,
+        timeout=None,
+        build=("make",),
+        mpirun_options=None,
+        poll_interval=0.5):
+
+        super().__init__(nm_list, res, software_path, template_file, results_dir, output_dir,
+                         do_interpolation=do_interpolation,
+                         interpolation_iterations=interpolation_iterations,
+                         run_dir_suffix=run_dir_suffix,
+                         min_ntasks=min_ntasks)
+
+        self.CORES = cores or os.cpu_count()
+        self.TIMEOUT = timeout
+        self.BUILD = None if build is None else list(build)
+        self.MPIRUN_OPTIONS = mpirun_options
+        self.POLL_INTERVAL = poll_interval
+        self.JOBS = {}
+
+    # The #SBATCH directives mean nothing without Slurm (and have placeholders of their own)
+    def read_template(self):
+        lines = super().read_template().splitlines(keepends=True)
+        return "".join(line for line in lines if not line.startswith("#SBATCH"))
+
+    # Environment of a job: the Slurm variables used by the templates, for a single node
+    def job_env(self, values):
+        env = dict(os.environ)
+        env["SLURM_NTASKS"] = str(values["NTOT"])
+        env["SLURM_JOB_NUM_NODES"] = "1"
+        if self.MPIRUN_OPTIONS is not None:
+            env["MPIRUN_OPTIONS"] = self.MPIRUN_OPTIONS
+        return env
+
+    # Build the software, then write the job scripts. Return one job ID per configuration, in order
+    def submit_all_jobs(self):
+        if self.BUILD is not None:
+            subprocess.run(self.BUILD, cwd=self.SOFTWARE_PATH, check=True)
+
+        template = self.read_template()
+        job_ids = []
+        for index, config in enumerate(self.NM_LIST):
+            values = self.task_values(*config)
+            job_id = f"local_{index}"
+            self.JOBS[job_id] = {
+                "script": self.write_job_script(*config, template=template),
+                "log": f"n{values['N']}_m{values['M']}{values['SUFFIX']}",
+                "ranks": min(values["NTOT"], self.CORES),
+                "env": self.job_env(values),
+            }
+            job_ids.append(job_id)
+        return job_ids
+
+    def start_job(self, job_id):
+        job = self.JOBS[job_id]
+        with open(f"{self.RESULTS_DIR_PATH}/out_{job['log']}.txt", "w") as out, \
+             open(f"{self.RESULTS_DIR_PATH}/err_{job['log']}.txt", "w") as err:
+            # Run from the folder of the benchmark drivers, as sbatch would
+            return subprocess.Popen(["bash", job["script"]] + self.script_args(), stdout=out, stderr=err,
+                                    env=job["env"], start_new_session=True)
+
+    # Run the jobs in order, as many at a time as the cores allow
+    def wait_for_jobs(self, job_ids, on_finish=None, labels=None):
+        labels = labels or {}
+        pending = list(job_ids)
+        running = {}
+        final = {}
+        while pending or running:
+            # In order, so that a large job is not overtaken forever by the small ones
+            used = sum(self.JOBS[job_id]["ranks"] for job_id in running)
+            while pending and (not running or used + self.JOBS[pending[0]]["ranks"] <= self.CORES):
+                job_id = pending.pop(0)
+                running[job_id] = (self.start_job(job_id), time.monotonic())
+                used += self.JOBS[job_id]["ranks"]
+                print(f"[{datetime.now():%H:%M:%S}] Job {job_id} {labels.get(job_id, '')} started")
+
+            time.sleep(self.POLL_INTERVAL)
+            newly_finished = False
+            for job_id, (process, start) in list(running.items()):
+                if process.poll() is None:
+                    if self.TIMEOUT is None or time.monotonic() - start < self.TIMEOUT:
+                        continue
+                    # The whole process group, with mpirun and its ranks
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+                    state = "TIMEOUT"
+                else:
+                    state = "COMPLETED" if process.returncode == 0 else "FAILED"
+                del running[job_id]
+                final[job_id] = state
+                newly_finished = True
+                self.report_job(job_id, state, labels.get(job_id, ""))
+                if on_finish is not None:
+                    on_finish(job_id, state)
+            if newly_finished:
+                print(f"[{datetime.now():%H:%M:%S}] {len(final)}/{len(job_ids)} jobs finished, {len(running)} running")
+        return final
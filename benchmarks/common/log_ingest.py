@@ -0,0 +1,90 @@
+#################### LOG INGESTION ####################
+# Extract the timings of the benchmark logs into NumPy arrays:
+#   - the logs are memory-mapped and the lines starting with the prefix are
+#     found with bytes searches, the other lines are never decoded
+#   - several logs are scanned in parallel by a pool of processes
+#   - the samples of every (log, prefix) are cached in an .npz file, valid
+#     as long as the size and modification time of the log do not change,
+#     so collecting the results again after a change of the plots does not
+#     read the logs at all
+
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def scan_samples(path, prefix):
+    """
+    Return the last number of every line of path starting with prefix, as a
+    float64 array, in file order. With an empty prefix every non-blank line
+    is read.
+    """
+    prefix = prefix.encode()
+    values = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.empty(0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            needle = b"\n" + prefix
+            start = 0 if mm[:len(prefix)] == prefix else None
+            if start is None:
+                found = mm.find(needle)
+                start = found + 1 if found >= 0 else -1
+            while start >= 0:
+                end = mm.find(b"\n", start)
+                if end < 0:
+                    end = len(mm)
+                tokens = mm[start:end].split()
+                if tokens:
+                    values.append(float(tokens[-1]))
+                found = mm.find(needle, end)
+                start = found + 1 if found >= 0 else -1
+    return np.array(values, dtype=np.float64)
+
+
+def _cache_file(cache_dir, path, prefix):
+    key = hashlib.sha1(f"{os.path.abspath(path)}\0{prefix}".encode()).hexdigest()[:20]
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def load_samples(path, prefix, cache_dir=None):
+    """Samples of scan_samples(path, prefix), read from the cache in cache_dir if still valid."""
+    if cache_dir is None:
+        return scan_samples(path, prefix)
+
+    stat = os.stat(path)
+    cache_file = _cache_file(cache_dir, path, prefix)
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cached:
+            if cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                return cached["samples"]
+
+    samples = scan_samples(path, prefix)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(f, samples=samples, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                 path=os.path.abspath(path), prefix=prefix)
+    os.replace(tmp_file, cache_file)
+    return samples
+
+
+def _load_samples(args):
+    return load_samples(*args)
+
+
+def load_all_samples(requests, cache_dir=None, workers=1):
+    """
+    Return the samples of every (path, prefix) of requests, in order.
+
+    The logs that are not in the cache are scanned by a pool of workers
+    processes.
+    """
+    tasks = [(path, prefix, cache_dir) for path, prefix in requests]
+    if workers <= 1 or len(tasks) <= 1:
+        return [_load_samples(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(_load_samples, tasks))
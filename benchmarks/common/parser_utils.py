@@ -2,41 +2,117 @@ import pandas as pd
 import os
 import numpy as np
 import matplotlib.pyplot as plt
+from array import array
+from log_ingest import load_all_samples
+from scaling_models import exchanged_bytes, fit_hockney
+from trace_analysis import steady_state
+
+class StreamingStats:
+    """
+    Statistics of a stream of samples, updated in a single pass.
+
+    Mean and variance use Welford's update (and Chan's merge for chunks of
+    samples), min and max are tracked as the samples arrive. The samples are
+    kept once, in a compact array of doubles, for the exact quantiles and
+    the outlier trimming.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.samples = array("d")
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        self.samples.append(x)
+
+    def update(self, values):
+        """Add a chunk of samples (array-like) at once."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        count = self.count + values.size
+        chunk_mean = values.mean()
+        delta = chunk_mean - self.mean
+        self.m2 += ((values - chunk_mean) ** 2).sum() + delta ** 2 * self.count * values.size / count
+        self.mean += delta * values.size / count
+        self.count = count
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        # Copied as one block, extend() would iterate over the elements in Python
+        self.samples.frombytes(values.tobytes())
+
+    @property
+    def var(self):
+        """Sample variance (ddof=1, as pandas), NaN with less than two samples."""
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    def values(self):
+        """The samples as a NumPy array, without copy."""
+        return np.frombuffer(self.samples, dtype=np.float64)
+
+    def quantiles(self, qs):
+        """Exact quantiles (linear interpolation, as pandas), in one partition of the samples."""
+        return np.quantile(self.values(), qs)
+
+    def trimmed(self, percent):
+        """
+        Statistics of the samples without the highest percent/2 % of them,
+        then the lowest percent/2 % of the remaining ones (the order of the
+        published results).
+        """
+        values = self.values()
+        values = values[values < self.quantiles(1 - percent / 200)]
+        if values.size:
+            values = values[values > np.quantile(values, percent / 200)]
+        stats = StreamingStats()
+        stats.update(values)
+        return stats
+
 
 # Parse ping pong times from an output log file.
 # @param n: Number of processes modelA
 # @param m: Number of processes modelB (in this benchmark, n == m)
 # @param LOGS_FILE_PATH: Path to the log file containing ping pong timings
-# @param trim_outliers: Percentage of outliers to trim from the data
+# @param trim_outliers: Percentage of outliers to trim from the data, half on each side
 def parse_ping_pongs(LOGS_FILE_PATH, LINE_PREFIX, trim_outliers=0):
-    times = []
+    stats = StreamingStats()
     with open(LOGS_FILE_PATH) as f:
         for line in f:
             if line.startswith(LINE_PREFIX):
-                times.append(float(line.strip().split()[-1]))
-
-    if not times:
-            return None, None, None, None
+                stats.add(float(line.split()[-1]))
 
-    # Remove outliers (top trim_outliers percent)
-    if trim_outliers > 0:
-        times = pd.Series(times)
-        times = times[times < times.quantile(1 - trim_outliers//2 / 100)]
-        times = times[times > times.quantile(trim_outliers//2 / 100)]
-        #print("Removed outliers, new size:", len(times))
+    return ping_pong_stats(stats, trim_outliers)
 
+# Mean, median, variance, 5-95% range, min and max of the ping pong times (a StreamingStats)
+def ping_pong_stats(stats, trim_outliers=0):
+    if not stats.count:
+        return None, None, None, None, None, None
 
-    avg = pd.Series(times).mean()
-    var = pd.Series(times).var()
-    median = pd.Series(times).median()
-    ci = pd.Series(times).quantile(0.95) - pd.Series(times).quantile(0.05)
-    min = pd.Series(times).min()
-    max = pd.Series(times).max()
+    # Remove outliers (trim_outliers/2 percent on each side)
+    if trim_outliers > 0:
+        stats = stats.trimmed(trim_outliers)
+        # Tied timings (quantized timers) can all fall on the bounds: NaN, as pandas
+        if not stats.count:
+            return (np.nan,) * 6
 
-    return avg, median, var, ci, min, max
+    q05, median, q95 = stats.quantiles([0.05, 0.5, 0.95])
+    return stats.mean, median, stats.var, q95 - q05, stats.min, stats.max
 
 # Parse interpolation times from an output log file.
-def parse_interpolations(n, LOGS_FILE_PATH, LINE_PREFIX):
+# @param n: Number of processes modelA
+# @param m: Number of processes modelB (default: n)
+def parse_interpolations(n, LOGS_FILE_PATH, LINE_PREFIX, m=None):
     interp_times = []
     with open(LOGS_FILE_PATH) as f:
         for line in f:
@@ -45,59 +121,119 @@ def parse_interpolations(n, LOGS_FILE_PATH, LINE_PREFIX):
                 # Example line: "Interpolation time for src->dst: 0.123456 seconds"
                 # We assume the time is always the last element in the line
                 interp_times.append(float(line.strip().split()[-1]))
-    if not interp_times:
-        return None
-
-
-    
-    n_iters = len(interp_times) // (2*n)
-
-    # Average every n processes 
-    interp_times = [np.mean(interp_times[i:i + n]) for i in range(0, len(interp_times), n)]
-
-    # Average of time of two interpolations (src->dst and dst->src) in one iteration
-    avg = pd.Series(interp_times).sum() / (n_iters)
-
-    # Sum every two element of interp_times to get the total time for each iteration
-    interp_times = [interp_times[i] + interp_times[i + 1] for i in range(0, len(interp_times), 2)]
-    min_times = pd.Series(interp_times).min()
-    max_times = pd.Series(interp_times).max()
-
-    return avg, min_times, max_times
+    return interpolation_stats(n, interp_times, m)
+
+# Per-rank interpolation times as an (iteration x model x rank) array.
+# Every iteration logs n + m times: the n ranks of modelA, then the m ranks of modelB
+# (XIOS: "compute" lines of xios_client_*.out, whose zero-padded names are expanded in
+# rank order; OASIS: YAC mapping lines, in print order). If n != m, the ranks missing
+# in the smaller model are NaN.
+def interpolation_matrix(interp_times, n, m=None):
+    m = n if m is None else m
+    interp_times = np.asarray(interp_times, dtype=np.float64)
+    n_iters = len(interp_times) // (n + m)
+    per_iteration = interp_times[:n_iters * (n + m)].reshape(n_iters, n + m)
+
+    matrix = np.full((n_iters, 2, max(n, m)), np.nan)
+    matrix[:, 0, :n] = per_iteration[:, :n]
+    matrix[:, 1, :m] = per_iteration[:, n:]
+    return matrix
+
+# Load imbalance of an (iteration x model x rank) matrix, per iteration and model:
+#   time: mean time of the ranks
+#   critical: time of the slowest rank, which the model waits for
+#   imbalance: critical / time (1 when perfectly balanced)
+# and critical_rank: the rank of each model which is the slowest most often
+def imbalance_metrics(matrix):
+    time = np.nanmean(matrix, axis=2)
+    critical = np.nanmax(matrix, axis=2)
+    slowest = np.nanargmax(matrix, axis=2)
+    critical_rank = np.array([np.bincount(slowest[:, model]).argmax() for model in range(matrix.shape[1])])
+    return {
+        "time": time,
+        "critical": critical,
+        "imbalance": critical / time,
+        "critical_rank": critical_rank,
+    }
+
+# Average, min and max time of an iteration (two interpolations) from the times of the n + m processes
+def interpolation_stats(n, interp_times, m=None):
+    return matrix_interpolation_stats(interpolation_matrix(interp_times, n, m))
+
+# Average, min and max time of an iteration of an (iteration x model x rank) matrix
+def matrix_interpolation_stats(matrix):
+    if matrix.shape[0] == 0:
+        return None, None, None
+
+    # Sum of the mean time of the two interpolations (src->dst and dst->src) in each iteration
+    iteration_times = np.nanmean(matrix, axis=2).sum(axis=1)
+    return iteration_times.mean(), iteration_times.min(), iteration_times.max()
+
+# Per-rank interpolation matrices of each process count of NM_LIST (see interpolation_matrix)
+def interpolation_matrices(IS_XIOS, NM_LIST, RAW_TIMES_DIR, INTERPOLATION_LINE_PREFIX="", CACHE_DIR=None, workers=1):
+    # Path to the log file for each process count
+    if IS_XIOS:
+        interp_file_paths = [os.path.join(RAW_TIMES_DIR, f"interpolations_times_n{n}_m{m}.txt") for n, m in NM_LIST]
+    else:
+        interp_file_paths = [os.path.join(RAW_TIMES_DIR, f"ocean_times_n{n}_m{m}.txt") for n, m in NM_LIST]
+    all_samples = load_all_samples([(path, INTERPOLATION_LINE_PREFIX) for path in interp_file_paths], CACHE_DIR, workers)
+    return [interpolation_matrix(samples, n, m) for (n, m), samples in zip(NM_LIST, all_samples)]
+
+# Results of a CSV file merged with df: the rows of the configurations of df are replaced
+def merge_results(df, RESULTS_CSV):
+    keys = [key for key in ("n", "m", "levels") if key in df.columns]
+    if not os.path.exists(RESULTS_CSV):
+        return df
+    old = pd.read_csv(RESULTS_CSV, float_precision="round_trip")
+    old = old[~old.set_index(keys).index.isin(df.set_index(keys).index)]
+    return pd.concat([old, df], ignore_index=True).sort_values(keys, ignore_index=True)
+
+# Write a results CSV file atomically, so it can be read while jobs are still being collected
+def write_results(df, RESULTS_CSV):
+    os.makedirs(os.path.dirname(RESULTS_CSV), exist_ok=True)
+    tmp_file = f"{RESULTS_CSV}.{os.getpid()}.tmp"
+    df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, RESULTS_CSV)
 
+# @param CACHE_DIR: Directory of the cache of the parsed logs (None: no cache, see log_ingest.py)
+# @param workers: Number of processes parsing the logs
+# @param MERGE: Update the rows of NM_LIST in the existing RESULTS_CSV instead of overwriting it
 def collect_interpolations_results(IS_XIOS, 
                                    NM_LIST, 
                                    RAW_TIMES_DIR, 
                                    RESULTS_CSV, 
-                                   INTERPOLATION_LINE_PREFIX=""):
-    records = []
-    for proc in NM_LIST:
-        n = proc[0]
-        m = proc[1]
-
-        # Path to the log file for this process count
-        if IS_XIOS:
-            interp_file_path = os.path.join(RAW_TIMES_DIR, f"interpolations_times_n{n}_m{m}.txt")
-        else:
-            interp_file_path = os.path.join(RAW_TIMES_DIR, f"ocean_times_n{n}_m{m}.txt")
-
-        interp_processes = n  #@TODO: Handle case m != n if necessary
-        avg_interp, min_interp, max_interp = parse_interpolations(interp_processes, interp_file_path, INTERPOLATION_LINE_PREFIX)
+                                   INTERPOLATION_LINE_PREFIX="",
+                                   CACHE_DIR=None,
+                                   workers=1,
+                                   MERGE=False):
+    matrices = interpolation_matrices(IS_XIOS, NM_LIST, RAW_TIMES_DIR, INTERPOLATION_LINE_PREFIX, CACHE_DIR, workers)
 
+    records = []
+    for (n, m), matrix in zip(NM_LIST, matrices):
+        avg_interp, min_interp, max_interp = matrix_interpolation_stats(matrix)
+        record = {"n": n, "m": m, "avg_interp": avg_interp, "min_interp": min_interp, "max_interp": max_interp}
+        if matrix.shape[0] > 0:
+            metrics = imbalance_metrics(matrix)
+            record.update({
+                # Per model (a: n processes, b: m processes), averaged over the iterations
+                "avg_interp_a": metrics["time"][:, 0].mean(),
+                "avg_interp_b": metrics["time"][:, 1].mean(),
+                "critical_interp_a": metrics["critical"][:, 0].mean(),
+                "critical_interp_b": metrics["critical"][:, 1].mean(),
+                "imbalance_a": metrics["imbalance"][:, 0].mean(),
+                "imbalance_b": metrics["imbalance"][:, 1].mean(),
+                "critical_rank_a": metrics["critical_rank"][0],
+                "critical_rank_b": metrics["critical_rank"][1],
+            })
 
         # Append parsed data for this process count to the records
-        records.append({
-            "n": n,
-            "m": m,
-            "avg_interp": avg_interp,
-            "min_interp": min_interp,
-            "max_interp": max_interp
-            })
+        records.append(record)
 
     # Create a DataFrame from the records and save it to a CSV file
     df = pd.DataFrame(records)
-    os.makedirs(os.path.dirname(RESULTS_CSV), exist_ok=True)
-    df.to_csv(RESULTS_CSV, index=False)
+    if MERGE:
+        df = merge_results(df, RESULTS_CSV)
+    write_results(df, RESULTS_CSV)
 
     return df
 
@@ -108,6 +244,9 @@ def collect_interpolations_results(IS_XIOS,
 # @param INTERPOLATION_LINE_PREFIX: Prefix for interpolation timing lines in the log file
 # @param DO_INTERPOLATION: Whether to include interpolation results in the output
 # @param RESULTS_CSV: Path to save the results CSV file
+# @param CACHE_DIR: Directory of the cache of the parsed logs (None: no cache, see log_ingest.py)
+# @param workers: Number of processes parsing the logs
+# @param MERGE: Update the rows of NM_LIST in the existing RESULTS_CSV instead of overwriting it
 def collect_results(IS_XIOS, 
                     NM_LIST, 
                     RAW_TIMES_DIR, 
@@ -115,30 +254,41 @@ def collect_results(IS_XIOS,
                     PING_PONG_LINE_PREFIX="",
                     INTERPOLATION_LINE_PREFIX="",
                     PARSE_INTERPOLATIONS=True, 
-                    trim_outliers=0):
-    records = []
-    for proc in NM_LIST:
-        n = proc[0]
-        m = proc[1]
-
-        # Path to the log file for this process count
+                    trim_outliers=0,
+                    CACHE_DIR=None,
+                    workers=1,
+                    exclude_warmup=False,
+                    MERGE=False):
+    # Path to the log files for each process count
+    requests = []
+    for n, m in NM_LIST:
         log_file_path = os.path.join(RAW_TIMES_DIR, f"ocean_times_n{n}_m{m}.txt")
-
-        avg_pp, med_pp, var_pp, ci_pp, min_pp, max_pp = parse_ping_pongs(log_file_path, PING_PONG_LINE_PREFIX, trim_outliers=trim_outliers)
-
+        requests.append((log_file_path, PING_PONG_LINE_PREFIX))
         if PARSE_INTERPOLATIONS:
             if IS_XIOS:
                 interp_file_path = os.path.join(RAW_TIMES_DIR, f"interpolations_times_n{n}_m{m}.txt")
             else:
                 interp_file_path = log_file_path # For OASIS, YAC mapping times are in the same file 
-            avg_interp = parse_interpolations(interp_file_path, INTERPOLATION_LINE_PREFIX)
+            requests.append((interp_file_path, INTERPOLATION_LINE_PREFIX))
+    all_samples = iter(load_all_samples(requests, CACHE_DIR, workers))
+
+    records = []
+    for n, m in NM_LIST:
+        stats = StreamingStats()
+        samples = next(all_samples)
+        # Without the first exchange and the warm-up iterations
+        stats.update(steady_state(samples) if exclude_warmup else samples)
+        avg_pp, med_pp, var_pp, ci_pp, min_pp, max_pp = ping_pong_stats(stats, trim_outliers=trim_outliers)
+
+        if PARSE_INTERPOLATIONS:
+            avg_interp = interpolation_stats(n, next(all_samples), m)[0]
         else:
             avg_interp = None
 
         # Append parsed data for this process count to the records
         records.append({
             "n": n,
-            "m": n,
+            "m": m,
             "avg_pp": avg_pp,
             "var_pp": var_pp,
             "medi_pp": med_pp,
@@ -149,8 +299,53 @@ def collect_results(IS_XIOS,
 
     # Create a DataFrame from the records and save it to a CSV file
     df = pd.DataFrame(records)
-    os.makedirs(os.path.dirname(RESULTS_CSV), exist_ok=True)
-    df.to_csv(RESULTS_CSV, index=False)
+    if MERGE:
+        df = merge_results(df, RESULTS_CSV)
+    write_results(df, RESULTS_CSV)
+
+    return df
+
+# Ping pong results of the weak scaling and message size sweeps, configurations (n, m, levels)
+def collect_sweep_results(NML_LIST, 
+                          RAW_TIMES_DIR, 
+                          RESULTS_CSV, 
+                          RES="high",
+                          PING_PONG_LINE_PREFIX="",
+                          trim_outliers=0,
+                          CACHE_DIR=None,
+                          workers=1,
+                          exclude_warmup=False,
+                          MERGE=False):
+    requests = []
+    for n, m, levels in NML_LIST:
+        suffix = "" if levels == 1 else f"_l{levels}"
+        requests.append((os.path.join(RAW_TIMES_DIR, f"ocean_times_n{n}_m{m}{suffix}.txt"), PING_PONG_LINE_PREFIX))
+    all_samples = load_all_samples(requests, CACHE_DIR, workers)
+
+    records = []
+    for (n, m, levels), samples in zip(NML_LIST, all_samples):
+        stats = StreamingStats()
+        stats.update(steady_state(samples) if exclude_warmup else samples)
+        avg_pp, med_pp, var_pp, ci_pp, min_pp, max_pp = ping_pong_stats(stats, trim_outliers=trim_outliers)
+        records.append({
+            "n": n,
+            "m": m,
+            "levels": levels,
+            "bytes_per_rank": exchanged_bytes(n, RES, levels, m),
+            "avg_pp": avg_pp,
+            "medi_pp": med_pp,
+            "min_pp": min_pp,
+            "max_pp": max_pp})
+
+    df = pd.DataFrame(records)
+    if MERGE:
+        df = merge_results(df, RESULTS_CSV)
+    # Effective bandwidth of a rank, and its ratio to the one of the first
+    # configuration: T(p0) / T(p) for weak scaling (same bytes per rank), the
+    # amortization of the latency for the message size sweep
+    df["bandwidth_per_rank"] = df["bytes_per_rank"] / df["medi_pp"]
+    df["efficiency"] = df["bandwidth_per_rank"] / df["bandwidth_per_rank"].iloc[0]
+    write_results(df, RESULTS_CSV)
 
     return df
 
@@ -300,3 +495,83 @@ def make_interpolation_plot(df, title, save_path):
     print(speedup_df)
 
 
+# Heatmap of the per-rank times of an (iteration x model x rank) matrix, one panel per model
+def make_imbalance_heatmap(matrix, title, save_path, model_names=("modelA", "modelB")):
+    metrics = imbalance_metrics(matrix)
+    vmin, vmax = np.nanmin(matrix), np.nanmax(matrix)
+
+    fig, axes = plt.subplots(1, matrix.shape[1], figsize=(12, 6), sharey=True)
+    for model, ax in enumerate(axes):
+        # Ranks on the x-axis, iterations on the y-axis
+        image = ax.imshow(matrix[:, model, :], aspect='auto', origin='lower', interpolation='nearest',
+                          cmap='viridis', vmin=vmin, vmax=vmax)
+        ax.set_title(f"{model_names[model]}: max/mean {metrics['imbalance'][:, model].mean():.3f}, "
+                     f"critical rank {metrics['critical_rank'][model]}")
+        ax.set_xlabel('Rank')
+    axes[0].set_ylabel('Iteration')
+    fig.colorbar(image, ax=axes, label='Time (seconds)')
+    fig.suptitle(title)
+    fig.savefig(save_path)
+
+
+# Efficiency and effective bandwidth per rank of the weak scaling sweep
+def make_weak_scaling_plot(df, title, save_path):
+    fig, (ax_eff, ax_bw) = plt.subplots(1, 2, figsize=(14, 6))
+
+    ax_eff.plot(df['n'], df['efficiency'], 'o-', color='blue', label=r'Efficiency $T(p_0) / T(p)$')
+    ax_eff.axhline(1, linestyle='--', color='red', label='Perfect weak scaling')
+    ax_eff.set_xscale('log', base=2)
+    ax_eff.set_xlabel('p (Processes per model, levels growing with p)')
+    ax_eff.set_ylabel('Efficiency')
+    ax_eff.set_ylim(bottom=0)
+    ax_eff.legend()
+    ax_eff.grid(True)
+
+    ax_bw.plot(df['n'], df['bandwidth_per_rank'] / 1e6, 'o-', color='green', label='Effective bandwidth')
+    ax_bw.set_xscale('log', base=2)
+    ax_bw.set_xlabel('p (Processes per model, levels growing with p)')
+    ax_bw.set_ylabel('Bandwidth per rank (MB/s)')
+    ax_bw.legend()
+    ax_bw.grid(True)
+
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
+    df.to_latex(save_path.replace('.svg', '.tex'), index=False)
+
+
+# Time and effective bandwidth per rank of the message size sweep, with the
+# latency/bandwidth (Hockney) fit: below the half-performance size alpha * bandwidth,
+# the exchanges are latency-bound
+def make_message_size_plot(df, title, save_path):
+    hockney = fit_hockney(df['bytes_per_rank'], df['medi_pp'])
+    half_size = hockney['alpha'] * hockney['bandwidth']
+    sizes = np.logspace(np.log10(df['bytes_per_rank'].min()), np.log10(df['bytes_per_rank'].max()), 100)
+
+    fig, (ax_time, ax_bw) = plt.subplots(1, 2, figsize=(14, 6))
+
+    ax_time.plot(df['bytes_per_rank'], df['medi_pp'], 'o', color='blue', label='Median Ping Pong Time')
+    ax_time.fill_between(df['bytes_per_rank'], df['min_pp'], df['max_pp'], color='lightgray', alpha=0.5, label='Range (min-max)')
+    ax_time.plot(sizes, hockney['alpha'] + sizes / hockney['bandwidth'], '--r',
+                 label=rf"$\alpha$ = {hockney['alpha'] * 1e6:.3g} µs, $\beta^{{-1}}$ = {hockney['bandwidth'] / 1e6:.3g} MB/s")
+    ax_time.set_xscale('log')
+    ax_time.set_yscale('log')
+    ax_time.set_xlabel('Bytes per rank')
+    ax_time.set_ylabel('Time (seconds)')
+    ax_time.legend()
+    ax_time.grid(True)
+
+    ax_bw.plot(df['bytes_per_rank'], df['bandwidth_per_rank'] / 1e6, 'o-', color='green', label='Effective bandwidth')
+    ax_bw.plot(sizes, sizes / (hockney['alpha'] + sizes / hockney['bandwidth']) / 1e6, '--r', label='Hockney model')
+    if np.isfinite(half_size):
+        ax_bw.axvline(half_size, linestyle=':', color='gray', label=f'Half-performance size {half_size / 1e6:.3g} MB')
+    ax_bw.set_xscale('log')
+    ax_bw.set_xlabel('Bytes per rank')
+    ax_bw.set_ylabel('Bandwidth per rank (MB/s)')
+    ax_bw.legend()
+    ax_bw.grid(True)
+
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
+    df.to_latex(save_path.replace('.svg', '.tex'), index=False)
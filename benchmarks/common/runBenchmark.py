@@ -1,25 +1,90 @@
+import benchmark_executor as be
 import slurm_sbatcher as sb
+from local_executor import LocalExecutor
+from parser_utils import collect_results, collect_sweep_results
 
-# Get XIOS or OASIS from argv
+# Get XIOS or OASIS, the sweep and where to run it from argv
 import sys
 if len(sys.argv) < 2:
-    print("Usage: python runBenchmark.py <xios|oasis>")
+    print("Usage: python runBenchmark.py <xios|oasis> [strong|weak|message_size] [slurm|local]")
     sys.exit(1)
 software = sys.argv[1].lower()
 if software not in ["xios", "oasis"]:
     print("Invalid software. Choose 'xios' or 'oasis'.")
     sys.exit(1)
+mode = sys.argv[2].lower() if len(sys.argv) > 2 else "strong"
+backend = sys.argv[3].lower() if len(sys.argv) > 3 else "slurm"
+if backend not in ["slurm", "local"]:
+    print("Invalid backend. Choose 'slurm' or 'local'.")
+    sys.exit(1)
+
+if mode == "strong":
+    # Same fields, more processes
+    nm_list = [(n, n) for n in [64]]
+    do_interpolation = True
+elif mode == "weak":
+    # Levels growing with the processes, same bytes per rank
+    nm_list = be.weak_scaling_configs([1, 2, 4, 8, 16, 32, 64])
+    do_interpolation = False
+elif mode == "message_size":
+    # Levels growing at a fixed process count
+    nm_list = be.message_size_configs(64, [1, 2, 4, 8, 16, 32, 64])
+    do_interpolation = False
+else:
+    print("Invalid sweep. Choose 'strong', 'weak' or 'message_size'.")
+    sys.exit(1)
+
+if backend == "slurm":
+    res = "high"
+    executor = sb.SlurmSbatcher(
+        nm_list=nm_list,
+        do_interpolation=do_interpolation,
+        res=res,
+        partition="prod",
+        time_limit="01:00:00",
+        software_path=f"../{software}/",
+        template_file="job_template.sh",
+        results_dir="results",
+        output_dir="outputs",
+        job_array=True)  # One sbatch per number of tasks of the sweep
+else:
+    # Low resolution grids, small enough for a workstation
+    res = "low"
+    executor = LocalExecutor(
+        nm_list=nm_list,
+        do_interpolation=do_interpolation,
+        res=res,
+        software_path=f"../{software}/",
+        template_file="job_template.sh",
+        results_dir="results",
+        output_dir="outputs")  # As many jobs at a time as the cores allow
 
+# Collect the results of every job as soon as it is over (same settings as the collect_and_plot scripts)
+SWEEP_CSV = {"weak": "weak_scaling_results.csv", "message_size": "message_size_results.csv"}
 
-sbatcher = sb.SlurmSbatcher(
-    nm_list=[(n, n) for n in [64]],  
-    do_interpolation=True,
-    res="high",
-    partition="prod",
-    time_limit="01:00:00",
-    software_path=f"../{software}/",
-    template_file="job_template.sh",
-    results_dir="results",
-    output_dir="outputs")
+def collect(config, state):
+    if state not in be.SUCCESS_STATES:
+        return
+    if mode == "strong":
+        collect_results(
+            IS_XIOS=software == "xios",
+            NM_LIST=[config],
+            PING_PONG_LINE_PREFIX=" TIMING:",
+            RESULTS_CSV=f"../{software}/results/scaling_results.csv",
+            RAW_TIMES_DIR=f"../{software}/outputs",
+            PARSE_INTERPOLATIONS=False,
+            trim_outliers=10,
+            exclude_warmup=True,
+            MERGE=True)
+    else:
+        collect_sweep_results(
+            NML_LIST=[config],
+            RAW_TIMES_DIR=f"../{software}/outputs",
+            RESULTS_CSV=f"../{software}/results/{SWEEP_CSV[mode]}",
+            RES=res,
+            PING_PONG_LINE_PREFIX=" TIMING:",
+            trim_outliers=10,
+            exclude_warmup=True,
+            MERGE=True)
 
-sbatcher.run()
+executor.run(on_finish=collect)
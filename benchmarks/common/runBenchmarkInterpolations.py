@@ -1,25 +1,59 @@
-import slurm_sbatcher_interp as sb
-# Get XIOS or OASIS from argv
+import benchmark_executor as be
+import slurm_sbatcher as sb
+from local_executor import LocalExecutor
+from parser_utils import collect_interpolations_results
+# Get XIOS or OASIS and where to run the benchmark from argv
 import sys
 if len(sys.argv) < 2:
-    print("Usage: python runBenchmark.py <xios|oasis>")
+    print("Usage: python runBenchmarkInterpolations.py <xios|oasis> [slurm|local]")
     sys.exit(1)
 software = sys.argv[1].lower()
 if software not in ["xios", "oasis"]:
     print("Invalid software. Choose 'xios' or 'oasis'.")
     sys.exit(1)
+backend = sys.argv[2].lower() if len(sys.argv) > 2 else "slurm"
+if backend not in ["slurm", "local"]:
+    print("Invalid backend. Choose 'slurm' or 'local'.")
+    sys.exit(1)
+
 
+if backend == "slurm":
+    executor = sb.SlurmSbatcher(
+        # nm_list=[(n, n) for n in [1, 2, 4, 8, 16, 64]],  # List of (n, m) pairs for the benchmark
+        nm_list=[(n, n) for n in [2, 4, 8, 16]],  # List of (n, m) pairs for the benchmark
+        interpolation_iterations=20,  # Number of iterations for the interpolation benchmark
+        res="high",
+        partition="prod",
+        time_limit="12:00:00",
+        software_path=f"../{software}/",
+        template_file="job_template_interp_lowproc.sh",
+        results_dir="results_interp",
+        output_dir="outputs_interp",
+        run_dir_suffix="_interp",
+        min_ntasks=64,  # Whole node for the small process counts
+        job_array=True)  # One sbatch per number of tasks of the sweep
+else:
+    # Low resolution grids on this machine, without reserving whole nodes
+    executor = LocalExecutor(
+        nm_list=[(n, n) for n in [1, 2, 4]],  # List of (n, m) pairs for the benchmark
+        interpolation_iterations=20,  # Number of iterations for the interpolation benchmark
+        res="low",
+        software_path=f"../{software}/",
+        template_file="job_template_interp.sh",
+        results_dir="results_interp",
+        output_dir="outputs_interp",
+        run_dir_suffix="_interp")
 
-sbatcher = sb.SlurmSbatcherInterpolations(
-    # nm_list=[(n, n) for n in [1, 2, 4, 8, 16, 64]],  # List of (n, m) pairs for the benchmark
-    nm_list=[(n, n) for n in [2, 4, 8, 16]],  # List of (n, m) pairs for the benchmark
-    interpolation_iterations=20,  # Number of iterations for the interpolation benchmark
-    res="high",
-    partition="prod",
-    time_limit="12:00:00",
-    software_path=f"../{software}/",
-    template_file="job_template_interp_lowproc.sh",
-    results_dir="results_interp",
-    output_dir="outputs_interp")
+# Collect the results of every job as soon as it is over (same files as the collect_and_plot scripts)
+def collect(config, state):
+    if state not in be.SUCCESS_STATES:
+        return
+    collect_interpolations_results(
+        IS_XIOS=software == "xios",
+        NM_LIST=[config],
+        INTERPOLATION_LINE_PREFIX="" if software == "xios" else " YAC mapping time =",
+        RESULTS_CSV="../xios/results_interp/scaling_results.csv" if software == "xios" else "../oasis/results_interp/interpolation_results.csv",
+        RAW_TIMES_DIR=f"../{software}/outputs_interp",
+        MERGE=True)
 
-sbatcher.run()
+executor.run(on_finish=collect)
@@ -0,0 +1,186 @@
+#################### SCALING MODELS ####################
+# Fit performance models to the strong scaling results (time per process
+# count p, one row per (n, m) with n = m = p processes per model):
+#   - Amdahl:      T(p) = T1 * (s + (1 - s) / p), s the serial fraction
+#   - Karp-Flatt:  experimentally determined serial fraction at each p,
+#                  e(p) = (1/S - 1/r) / (1 - 1/r), with S = T(p0) / T(p) and
+#                  r = p / p0 relative to the first process count p0; an e
+#                  growing with p points to parallel overheads, not to a
+#                  serial part
+#   - Hockney:     T = alpha + beta * bytes, the latency alpha and inverse
+#                  bandwidth beta of the ping-pong, each rank exchanging its
+#                  part of the two fields
+#   - overhead:    T(p) = a + b / p + c * log2(p), with a, b, c >= 0, used to
+#                  predict the process count minimizing the time, and the
+#                  largest one keeping a target parallel efficiency
+
+import itertools
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# Points of the grids of the benchmarks (see the namcouple files)
+GRID_POINTS = {"t12e": 4322 * 3147, "icoh": 2016012, "torc": 182 * 149, "lmdz": 96 * 72}
+RES_GRIDS = {"high": ("t12e", "icoh"), "low": ("torc", "lmdz")}
+
+
+def nonnegative_lstsq(columns, t):
+    """Least squares fit of t on the columns with nonnegative coefficients (enumerating the active sets)."""
+    best = None
+    for k in range(len(columns), 0, -1):
+        for subset in itertools.combinations(range(len(columns)), k):
+            A = np.column_stack([columns[i] for i in subset])
+            coeffs, *_ = np.linalg.lstsq(A, t, rcond=None)
+            if (coeffs < 0).any():
+                continue
+            residual = np.sum((A @ coeffs - t) ** 2)
+            if best is None or residual < best[0]:
+                full = np.zeros(len(columns))
+                full[list(subset)] = coeffs
+                best = (residual, full)
+    return best[1] if best is not None else np.zeros(len(columns))
+
+
+def fit_amdahl(p, t):
+    """Serial fraction s and time on one process T1 of the Amdahl law fitted to (p, t)."""
+    p, t = np.asarray(p, dtype=np.float64), np.asarray(t, dtype=np.float64)
+    a, b = nonnegative_lstsq([np.ones_like(p), 1 / p], t)
+    t1 = a + b
+    return {"serial_fraction": a / t1 if t1 > 0 else np.nan, "t1": t1}
+
+
+def karp_flatt(p, t):
+    """Karp-Flatt metric at each process count, relative to the first one (NaN there)."""
+    p, t = np.asarray(p, dtype=np.float64), np.asarray(t, dtype=np.float64)
+    speedup = t[0] / t
+    ratio = p / p[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        e = (1 / speedup - 1 / ratio) / (1 - 1 / ratio)
+    e[ratio == 1] = np.nan
+    return e
+
+
+def exchanged_bytes(p, res="high", levels=1, m=None):
+    """
+    Bytes exchanged by a rank in a ping-pong: the two fields in double
+    precision with their levels, split over the p ranks of the source model
+    and the m (default p) ranks of the destination one.
+    """
+    src, dst = RES_GRIDS[res]
+    p = np.asarray(p, dtype=np.float64)
+    m = p if m is None else np.asarray(m, dtype=np.float64)
+    return 8 * np.asarray(levels) * (GRID_POINTS[src] / p + GRID_POINTS[dst] / m)
+
+
+def fit_hockney(message_bytes, t):
+    """Latency alpha (s) and bandwidth (bytes/s) of T = alpha + bytes / bandwidth."""
+    message_bytes, t = np.asarray(message_bytes, dtype=np.float64), np.asarray(t, dtype=np.float64)
+    alpha, beta = nonnegative_lstsq([np.ones_like(message_bytes), message_bytes], t)
+    return {"alpha": alpha, "bandwidth": 1 / beta if beta > 0 else np.inf}
+
+
+def fit_overhead_model(p, t):
+    """Coefficients (a, b, c) of T(p) = a + b / p + c * log2(p)."""
+    p, t = np.asarray(p, dtype=np.float64), np.asarray(t, dtype=np.float64)
+    return nonnegative_lstsq([np.ones_like(p), 1 / p, np.log2(p)], t)
+
+
+def predict_time(coeffs, p):
+    a, b, c = coeffs
+    p = np.asarray(p, dtype=np.float64)
+    return a + b / p + c * np.log2(p)
+
+
+def optimal_process_counts(coeffs, p_ref, p_max, efficiency=0.5):
+    """
+    Power of two process counts up to p_max minimizing the predicted time,
+    and the largest one whose predicted efficiency relative to p_ref is at
+    least efficiency (the cheapest in core-hours for a given time budget).
+    """
+    candidates = 2 ** np.arange(int(np.log2(p_ref)), int(np.log2(p_max)) + 1)
+    times = predict_time(coeffs, candidates)
+    predicted_efficiency = predict_time(coeffs, p_ref) * p_ref / (times * candidates)
+    efficient = candidates[predicted_efficiency >= efficiency]
+    return int(candidates[np.argmin(times)]), int(efficient.max()) if efficient.size else int(p_ref)
+
+
+def scaling_report(results, column, res="high", ping_pong=False, efficiency=0.5, extrapolate=4):
+    """
+    Fit the models to the column of every results DataFrame of results
+    (label -> DataFrame with n and the column) and return one row per label.
+    The optimal process counts are searched up to extrapolate times the
+    largest measured one.
+    """
+    records = []
+    for label, df in results.items():
+        df = df.dropna(subset=[column])
+        p, t = df["n"].to_numpy(dtype=np.float64), df[column].to_numpy(dtype=np.float64)
+        amdahl = fit_amdahl(p, t)
+        coeffs = fit_overhead_model(p, t)
+        p_min_time, p_efficient = optimal_process_counts(coeffs, p[0], p[-1] * extrapolate, efficiency)
+        record = {
+            "label": label,
+            "serial_fraction": amdahl["serial_fraction"],
+            "t1": amdahl["t1"],
+            "karp_flatt_max": np.nanmax(karp_flatt(p, t)) if len(p) > 1 else np.nan,
+            "a": coeffs[0],
+            "b": coeffs[1],
+            "c": coeffs[2],
+            "p_min_time": p_min_time,
+            "t_min_time": predict_time(coeffs, p_min_time),
+            f"p_efficiency_{efficiency:g}": p_efficient,
+        }
+        if ping_pong:
+            hockney = fit_hockney(exchanged_bytes(p, res), t)
+            record["alpha"] = hockney["alpha"]
+            record["bandwidth"] = hockney["bandwidth"]
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+def karp_flatt_table(results, column):
+    """Karp-Flatt metric of every label at each process count (rows: n, columns: labels)."""
+    series = {}
+    for label, df in results.items():
+        df = df.dropna(subset=[column])
+        series[label] = pd.Series(karp_flatt(df["n"], df[column]), index=df["n"].to_numpy())
+    return pd.DataFrame(series).rename_axis("n")
+
+
+def make_scaling_comparison_plot(results, column, title, save_path, report=None):
+    """Measured times and fitted models of every label on the same log-log axes."""
+    if report is None:
+        report = scaling_report(results, column)
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+
+    fig, (ax_time, ax_kf) = plt.subplots(1, 2, figsize=(14, 6))
+    for i, (label, df) in enumerate(results.items()):
+        df = df.dropna(subset=[column])
+        row = report[report["label"] == label].iloc[0]
+        color = colors[i % len(colors)]
+        p_fit = np.logspace(np.log2(df["n"].iloc[0]), np.log2(max(df["n"].iloc[-1], row["p_min_time"])), 100, base=2)
+
+        ax_time.plot(df["n"], df[column], 'o', color=color, label=f'{label}')
+        ax_time.plot(p_fit, predict_time((row["a"], row["b"], row["c"]), p_fit), '-', color=color,
+                     label=f'{label} fit, serial fraction {row["serial_fraction"]:.3g}')
+        ax_time.plot(row["p_min_time"], row["t_min_time"], '*', color=color, markersize=14,
+                     label=f'{label} minimum at p={row["p_min_time"]}')
+        ax_kf.plot(df["n"], karp_flatt(df["n"], df[column]), 'o-', color=color, label=label)
+
+    ax_time.set_xscale('log', base=2)
+    ax_time.set_yscale('log')
+    ax_time.set_xlabel('p (Processes per model)')
+    ax_time.set_ylabel('Time (seconds)')
+    ax_time.legend()
+    ax_time.grid(True)
+
+    ax_kf.set_xscale('log', base=2)
+    ax_kf.set_xlabel('p (Processes per model)')
+    ax_kf.set_ylabel('Karp-Flatt metric')
+    ax_kf.legend()
+    ax_kf.grid(True)
+
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
@@ -1,107 +1,240 @@
 import os
+import re
 import subprocess
 import time
-import pandas as pd
-import matplotlib.pyplot as plt
-
-class SlurmSbatcher:
+from datetime import datetime
+
+from benchmark_executor import (BenchmarkExecutor, FINISHED, PLACEHOLDER, SUCCESS_STATES, TASK_PLACEHOLDERS,
+                                message_size_configs, render_template, weak_scaling_configs)
+
+# Job states after which a job will not run anymore (see sacct --helpformat)
+FINAL_STATES = {"COMPLETED", "FAILED", "TIMEOUT", "CANCELLED", "OUT_OF_MEMORY", "NODE_FAIL",
+                "PREEMPTED", "BOOT_FAIL", "DEADLINE", "REVOKED"}
+
+# Job IDs of a line of sacct/squeue: 123, 123_4, or pending array tasks 123_[0-3,7%2]
+def expand_job_id(job_id):
+    match = re.fullmatch(r"(\d+)_\[([^\]%]*)(%\d+)?\]", job_id)
+    if match is None:
+        return [job_id]
+    ids = []
+    for part in match.group(2).split(","):
+        first, _, last = part.partition("-")
+        ids += [f"{match.group(1)}_{index}" for index in range(int(first), int(last or first) + 1)]
+    return ids
+
+class SlurmSbatcher(BenchmarkExecutor):
+    """
+    Submit a benchmark job per configuration (n, m) or (n, m, levels) of
+    nm_list to Slurm (see BenchmarkExecutor for the common arguments).
+
+    With job_array, the configurations needing the same number of tasks are
+    submitted as a single job array, which runs the template with the
+    parameters of its task read from a table.
+
+    The jobs are followed with sacct (squeue when accounting is disabled),
+    polled with an exponential backoff from poll_interval to
+    max_poll_interval seconds. sbatch, squeue and sacct are the commands
+    used to submit and follow the jobs (e.g. fake_slurm.py for tests).
+    """
 
     def __init__(
         self,
         nm_list,
-        do_interpolation,
         res,
         partition,
         time_limit,
         software_path,
         template_file,
         results_dir,
-        output_dir):
-
-        self.NM_LIST = nm_list
-        self.DO_INTERPOLATION = do_interpolation
-        self.RES = res
-
-        # High resolution grids labels
-        if self.RES == "high":
-            self.GRIDS = (("t12e", "LR"), ("icoh", "U"))  # Highres
-        # Low resolution grids labels for debugging
-        elif self.RES == "low":
-            self.GRIDS = (("torc", "LR"), ("lmdz", "LR"))  # Lowres
-        else:
-            raise ValueError("RES must be either 'high' or 'low'")
+        output_dir,
+        do_interpolation=None,
+        interpolation_iterations=None,
+        run_dir_suffix="",
+        min_ntasks=None,
+        job_array=False,
+        sbatch=("sbatch",),
+        squeue=("squeue",),
+        sacct=("sacct",),
+        poll_interval=5,
+        max_poll_interval=300):
+
+        super().__init__(nm_list, res, software_path, template_file, results_dir, output_dir,
+                         do_interpolation=do_interpolation,
+                         interpolation_iterations=interpolation_iterations,
+                         run_dir_suffix=run_dir_suffix,
+                         min_ntasks=min_ntasks)
 
         self.PARTITION = partition
         self.TIME_LIMIT = time_limit
-        self.SOFTWARE_PATH = software_path
-        self.TEMPLATE_PATH = software_path+template_file
-        self.RESULTS_DIR_PATH = software_path+results_dir
-        self.OUTPUT_DIR_PATH = software_path+output_dir
-
-        os.makedirs(self.RESULTS_DIR_PATH, exist_ok=True)
-        os.makedirs(self.OUTPUT_DIR_PATH, exist_ok=True)
-
-    def submit_job(self, n, m):
-
-        # Create folder named run_n_m
-        run_dir = f"{self.SOFTWARE_PATH}/run_{n}_{m}"
-        os.makedirs(run_dir, exist_ok=True)
-
-        # Create job script name based on n and m in 
-        job_script = f"{run_dir}/job_n{n}_m{m}.sh"
-
-
-        # Customize the job script content using the template
-        with open(self.TEMPLATE_PATH) as f:
-            template = f.read()
-
-        content = template.replace("{{N}}", str(n)).replace("{{M}}", str(m))
-        content = content.replace("{{NTOT}}", str(n + m)).replace("{{PARTITION}}", self.PARTITION)
-        content = content.replace("{{TIME}}", self.TIME_LIMIT)
-        content = content.replace("{{RES}}", self.RES)
-        content = content.replace("{{GRID_NAME_SRC}}", self.GRIDS[0][0])
-        content = content.replace("{{GRID_TYPE_SRC}}", self.GRIDS[0][1])
-        content = content.replace("{{GRID_NAME_DST}}", self.GRIDS[1][0])
-        content = content.replace("{{GRID_TYPE_DST}}", self.GRIDS[1][1])
-        content = content.replace("{{SLURM_OUTPUT}}", self.RESULTS_DIR_PATH)
-
-        # Apply modifications
-        with open(job_script, "w") as f:
-            f.write(content)
-
+        self.JOB_ARRAY = job_array
+        self.SBATCH = list(sbatch)
+        self.SQUEUE = list(squeue)
+        self.SACCT = list(sacct)
+        self.POLL_INTERVAL = poll_interval
+        self.MAX_POLL_INTERVAL = max_poll_interval
+        # Seconds before a hanging sacct or squeue call is given up
+        self.COMMAND_TIMEOUT = 60
+
+    # Values of the placeholders common to all the jobs, with the #SBATCH directives ones
+    def common_values(self):
+        return {
+            **super().common_values(),
+            "PARTITION": self.PARTITION,
+            "TIME": self.TIME_LIMIT,
+            "SLURM_OUTPUT": self.RESULTS_DIR_PATH,
+        }
+
+    def sbatch(self, args):
         # Run command and get job ID
-        job_id = subprocess.check_output(
-            # Run the bash command, pass also if to generate the weights or not during the run
-            ["sbatch", job_script, str(self.DO_INTERPOLATION).lower()]
-        ).decode().strip().split()[-1]
-
-        return job_id
-
-    # Wait for all jobs to finish
-    def wait_for_jobs(self, job_ids):
-        while True:
-            out = subprocess.check_output(["squeue", "-u", os.getenv("USER")]).decode()
-            active_jobs = [jid for jid in job_ids if jid in out]
-            if not active_jobs:
+        return subprocess.check_output(self.SBATCH + args).decode().strip().split()[-1]
+
+    def submit_job(self, n, m, levels=1, template=None):
+        job_script = self.write_job_script(n, m, levels, template)
+        return self.sbatch([job_script] + self.script_args())
+
+    # Submit the configurations as one job array, return the job IDs of its tasks
+    def submit_job_array(self, configs, template=None):
+        template = template or self.read_template()
+        tasks = [self.task_values(*config) for config in configs]
+        for values in tasks:
+            self.make_run_dir(values)
+
+        # Parameter table of the array, one line per task
+        template_name = os.path.splitext(os.path.basename(self.TEMPLATE_PATH))[0]
+        array_name = f"{self.SOFTWARE_PATH}/array_{template_name}_ntasks{tasks[0]['NTOT']}"
+        with open(f"{array_name}.txt", "w") as f:
+            f.write(" ".join(["INDEX"] + [name for name in TASK_PLACEHOLDERS]) + "\n")
+            for index, values in enumerate(tasks):
+                f.write(" ".join([str(index)] + [str(values[name]) for name in TASK_PLACEHOLDERS]) + "\n")
+
+        # The #SBATCH directives are read by sbatch before any shell expansion:
+        # they get the values shared by all the tasks (NTOT, and the others
+        # when they are the same), the directives depending on the task are
+        # replaced by the options below
+        options = [
+            f"--array=0-{len(tasks) - 1}",
+            f"--job-name=bench_array_{template_name}",
+            f"--output={self.RESULTS_DIR_PATH}/out_%A_%a.txt",
+            f"--error={self.RESULTS_DIR_PATH}/err_%A_%a.txt",
+        ]
+        shared = {name: tasks[0][name] for name in TASK_PLACEHOLDERS if all(values[name] == tasks[0][name] for values in tasks)}
+        lines = template.splitlines(keepends=True)
+        header_end = max((i + 1 for i, line in enumerate(lines) if line.startswith("#SBATCH")), default=1)
+        overridden = [option.split("=")[0] for option in options]
+        header = []
+        for line in lines[:header_end]:
+            per_task = [name for name in PLACEHOLDER.findall(line) if name in TASK_PLACEHOLDERS and name not in shared]
+            if not per_task:
+                header.append(render_template(line, {**self.common_values(), **shared}))
+            elif not (line.startswith("#SBATCH") and line.split()[1:2] and line.split()[1].split("=")[0] in overridden):
+                raise ValueError(f"{line.strip()} changes between the tasks of the array ({', '.join(per_task)})")
+
+        # In the script, the configuration placeholders are shell variables,
+        # set after the #SBATCH directives (SUFFIX is last since it can be empty)
+        body = render_template("".join(lines[header_end:]), {**self.common_values(),
+                                                             **{name: f"${{BENCH_{name}}}" for name in TASK_PLACEHOLDERS}})
+        read_params = (
+            "\n# Parameters of this array task, from the line of SLURM_ARRAY_TASK_ID in the table\n"
+            f"read -r {' '.join(f'BENCH_{name}' for name in TASK_PLACEHOLDERS)} <<< "
+            f"\"$(awk -v id=\"$SLURM_ARRAY_TASK_ID\" 'NR > 1 && $1 == id {{$1 = \"\"; print}}' {os.path.abspath(array_name)}.txt)\"\n"
+        )
+        with open(f"{array_name}.sh", "w") as f:
+            f.write("".join(header) + read_params + body)
+
+        array_id = self.sbatch(options + [f"{array_name}.sh"] + self.script_args())
+        return [f"{array_id}_{index}" for index in range(len(tasks))]
+
+    # States of the jobs of job_ids reported by sacct, or by squeue if sacct fails.
+    # The jobs whose state could not be queried are left out
+    def job_states(self, job_ids):
+        # Query the arrays rather than each of their tasks
+        jobs = ",".join(dict.fromkeys(job_id.split("_")[0] for job_id in job_ids))
+        try:
+            out = subprocess.run(self.SACCT + [f"--jobs={jobs}", "--allocations", "--noheader", "--parsable2",
+                                               "--format=JobID,State"], capture_output=True, check=True,
+                                 timeout=self.COMMAND_TIMEOUT).stdout.decode()
+            reported = {}
+            for line in out.splitlines():
+                if "|" in line:
+                    job_id, state = line.split("|")[:2]
+                    for task_id in expand_job_id(job_id.strip()):
+                        # "CANCELLED by 1234"
+                        reported[task_id] = state.split()[0] if state.split() else "PENDING"
+            # Not yet in the accounting: still pending
+            return {job_id: reported.get(job_id, "PENDING") for job_id in job_ids}
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            pass
+
+        try:
+            result = subprocess.run(self.SQUEUE + [f"--jobs={jobs}", "--noheader", "--format=%i|%T"],
+                                    capture_output=True, timeout=self.COMMAND_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️ squeue failed ({e}), the jobs will be polled again")
+            return {}
+        # squeue fails with this error once all the jobs have left the queue,
+        # any other failure (e.g. controller not responding) says nothing on them
+        if result.returncode != 0:
+            if "Invalid job id specified" in result.stderr.decode():
+                return {job_id: FINISHED for job_id in job_ids}
+            print(f"⚠️ squeue failed ({result.stderr.decode().strip() or result.returncode}), the jobs will be polled again")
+            return {}
+        queued = {}
+        for line in result.stdout.decode().splitlines():
+            if "|" in line:
+                job_id, state = line.split("|")[:2]
+                for task_id in expand_job_id(job_id.strip()):
+                    queued[task_id] = state.strip()
+        return {job_id: queued.get(job_id, FINISHED) for job_id in job_ids}
+
+    # Wait for the jobs, polling sacct (or squeue) less and less often
+    def wait_for_jobs(self, job_ids, on_finish=None, labels=None):
+        labels = labels or {}
+        final = {}
+        # Last known state of every job, kept when a poll fails
+        states = {job_id: "PENDING" for job_id in job_ids}
+        delay = self.POLL_INTERVAL
+        last_summary = None
+        while len(final) < len(job_ids):
+            states = {job_id: state for job_id, state in states.items() if job_id not in final}
+            states.update(self.job_states(list(states)))
+            newly_finished = False
+            for job_id, state in states.items():
+                if state in FINAL_STATES or state == FINISHED:
+                    final[job_id] = state
+                    newly_finished = True
+                    self.report_job(job_id, state, labels.get(job_id, ""))
+                    if on_finish is not None:
+                        on_finish(job_id, state)
+
+            counts = {}
+            for job_id, state in states.items():
+                if job_id not in final:
+                    counts[state] = counts.get(state, 0) + 1
+            summary = f"{len(final)}/{len(job_ids)} jobs finished" + "".join(f", {count} {state.lower()}" for state, count in sorted(counts.items()))
+            if summary != last_summary:
+                print(f"[{datetime.now():%H:%M:%S}] {summary}")
+                last_summary = summary
+            if len(final) == len(job_ids):
                 break
 
-            os.system('clear')
-            # Print SQUEUE every second. Comment if needed
-            print(out)
-            time.sleep(1)
+            # Poll again soon after a change, less and less often otherwise
+            delay = self.POLL_INTERVAL if newly_finished else min(delay * 2, self.MAX_POLL_INTERVAL)
+            time.sleep(delay)
+        return final
 
-    # Create and submit all jobs with different process counts
+    # Create and submit all jobs with different process counts, (n, m) or (n, m, levels).
+    # Return one job ID per configuration, in order
     def submit_all_jobs(self):
-        job_ids = []
-        for n, m in self.NM_LIST:
-            job_id = self.submit_job(n, m)
-            job_ids.append(job_id)
+        template = self.read_template()
+        if not self.JOB_ARRAY:
+            return [self.submit_job(*config, template=template) for config in self.NM_LIST]
+
+        # A job array shares the allocation of its tasks: one array per number of tasks
+        groups = {}
+        for index, config in enumerate(self.NM_LIST):
+            groups.setdefault(self.task_values(*config)["NTOT"], []).append(index)
+        job_ids = [None] * len(self.NM_LIST)
+        for indexes in groups.values():
+            for index, job_id in zip(indexes, self.submit_job_array([self.NM_LIST[i] for i in indexes], template)):
+                job_ids[index] = job_id
         return job_ids
-
-    def run(self):
-        job_ids = self.submit_all_jobs()
-        self.wait_for_jobs(job_ids)
-        print("All jobs have finished.")
-
-
-
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from compare_results import bootstrap_ratio_ci, compare_result_sets
+
+
+def samples(median, seed, n=500):
+    return np.random.default_rng(seed).normal(median, 0.02 * median, size=n)
+
+
+def test_interval_contains_the_ratio():
+    ratio, low, high = bootstrap_ratio_ci(samples(1.0, 0), samples(1.2, 1))
+    assert ratio == pytest.approx(1.2, rel=0.01)
+    assert low < ratio < high
+    assert high - low < 0.02
+
+
+def test_interval_does_not_depend_on_the_chunks():
+    base, cand = samples(1.0, 0, n=50), samples(1.1, 1, n=70)
+    assert bootstrap_ratio_ci(base, cand, n_resamples=300) == bootstrap_ratio_ci(base, cand, n_resamples=300,
+                                                                                  max_chunk=1)
+    assert bootstrap_ratio_ci(base, cand, n_resamples=300) == bootstrap_ratio_ci(base, cand, n_resamples=300,
+                                                                                  max_chunk=70 * 7)
+
+
+def test_interval_coverage():
+    # Same distribution: the 95% interval contains 1 for most pairs of samples
+    covered = [low <= 1 <= high for low, high in
+               (bootstrap_ratio_ci(samples(1.0, 2 * i, n=100), samples(1.0, 2 * i + 1, n=100), n_resamples=500)[1:]
+                for i in range(40))]
+    assert np.mean(covered) >= 0.85
+
+
+def test_status():
+    baseline = {(1, 1): samples(1.0, 0), (2, 2): samples(1.0, 1), (4, 4): samples(1.0, 2), (8, 8): 1.0}
+    candidate = {(1, 1): samples(1.2, 3), (2, 2): samples(0.8, 4), (4, 4): samples(1.01, 5), (8, 8): 1.1,
+                 (16, 16): samples(1.0, 6)}
+    df = compare_result_sets(baseline, candidate, threshold=0.05, n_resamples=500)
+    assert list(zip(df["n"], df["status"])) == [(1, "regression"), (2, "improvement"), (4, "unchanged"),
+                                                (8, "regression")]
+    # Single values: no interval
+    assert df["ci_low"].iloc[-1] == df["ci_high"].iloc[-1] == df["ratio"].iloc[-1]
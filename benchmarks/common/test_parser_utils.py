@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parser_utils import StreamingStats, collect_results, ping_pong_stats
+
+
+def pandas_stats(times, trim_outliers=0):
+    """Reference statistics of ping_pong_stats, computed with pandas as the published results."""
+    times = pd.Series(times)
+    if trim_outliers > 0:
+        times = times[times < times.quantile(1 - trim_outliers / 200)]
+        times = times[times > times.quantile(trim_outliers / 200)]
+    return (times.mean(), times.median(), times.var(), times.quantile(0.95) - times.quantile(0.05),
+            times.min(), times.max())
+
+
+def streamed(chunks):
+    stats = StreamingStats()
+    for chunk in chunks:
+        if np.ndim(chunk) == 0:
+            stats.add(float(chunk))
+        else:
+            stats.update(chunk)
+    return stats
+
+
+@pytest.mark.parametrize("trim_outliers", [0, 5, 10, 20])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_pandas(seed, trim_outliers):
+    rng = np.random.default_rng(seed)
+    times = rng.lognormal(-3, 0.5, size=1000)
+    # Chunks of any size, mixed with single samples
+    cuts = np.sort(rng.choice(np.arange(1, times.size), size=20, replace=False))
+    chunks = np.split(times, cuts)
+    chunks = [chunk[0] if chunk.size == 1 else chunk for chunk in chunks] + [times[-1]]
+    times = np.append(times, times[-1])
+
+    np.testing.assert_allclose(ping_pong_stats(streamed(chunks), trim_outliers), pandas_stats(times, trim_outliers),
+                               rtol=1e-12)
+
+
+def test_samples_are_kept_in_order():
+    stats = streamed([np.array([3.0, 1.0]), 2.0, np.arange(4.0, 7.0)])
+    assert stats.values().tolist() == [3.0, 1.0, 2.0, 4.0, 5.0, 6.0]
+    assert stats.count == 6
+
+
+def test_tied_samples_trimmed_to_nothing():
+    stats = StreamingStats()
+    stats.update(np.full(50, 1.0))
+    result = ping_pong_stats(stats, 10)
+    assert np.isnan(result).all()
+    assert np.isnan(pandas_stats(np.full(50, 1.0), 10)).all()
+
+
+def test_tied_samples_untrimmed():
+    stats = StreamingStats()
+    stats.update(np.full(50, 1.0))
+    assert ping_pong_stats(stats) == (1.0, 1.0, 0.0, 0.0, 1.0, 1.0)
+
+
+def test_no_samples():
+    assert ping_pong_stats(StreamingStats(), 10) == (None,) * 6
+
+
+def test_variance_needs_two_samples():
+    stats = streamed([0.5])
+    assert np.isnan(stats.var)
+    assert stats.mean == stats.min == stats.max == 0.5
+
+
+def test_even_percentages_match_the_published_trimming():
+    times = np.random.default_rng(7).lognormal(-3, 0.5, size=1000)
+    series = pd.Series(times)
+    # Trimming of the published results (trim_outliers // 2 percent on each side)
+    series = series[series < series.quantile(1 - 10 // 2 / 100)]
+    series = series[series > series.quantile(10 // 2 / 100)]
+    assert ping_pong_stats(streamed([times]), 10)[:2] == pytest.approx((series.mean(), series.median()), rel=1e-12)
+
+
+def write_logs(directory, n, m, iterations=3):
+    """Ping pong and interpolation logs of an XIOS run: rank r of modelA takes r + 1 s, of modelB 10 (r + 1) s."""
+    (directory / f"ocean_times_n{n}_m{m}.txt").write_text("".join(f"{n + m / 10}\n" for _ in range(5)))
+    iteration = [f"{r + 1}\n" for r in range(n)] + [f"{10 * (r + 1)}\n" for r in range(m)]
+    (directory / f"interpolations_times_n{n}_m{m}.txt").write_text("".join(iteration * iterations))
+
+
+def test_collect_results_with_different_process_counts(tmp_path):
+    for n, m in [(2, 4), (4, 2), (2, 2)]:
+        write_logs(tmp_path, n, m)
+    results_csv = str(tmp_path / "results" / "results.csv")
+
+    collect_results(True, [(2, 4), (4, 2)], str(tmp_path), results_csv)
+    df = collect_results(True, [(2, 2)], str(tmp_path), results_csv, MERGE=True)
+    # Mean of the ranks of modelA + mean of the ranks of modelB
+    assert df[["n", "m", "avg_pp", "avg_interp"]].values.tolist() == [
+        [2, 2, 2.2, 1.5 + 15], [2, 4, 2.4, 1.5 + 25], [4, 2, 4.2, 2.5 + 15]]
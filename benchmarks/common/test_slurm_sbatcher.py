@@ -0,0 +1,139 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark_executor import FINISHED
+from slurm_sbatcher import SlurmSbatcher, expand_job_id
+
+FAKE_SLURM = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_slurm.py")]
+
+TEMPLATE = """#!/bin/bash
+#SBATCH --job-name=bench_{{N}}_{{M}}{{SUFFIX}}
+#SBATCH --ntasks={{NTOT}}
+#SBATCH --partition={{PARTITION}}
+#SBATCH --time={{TIME}}
+#SBATCH --output={{SLURM_OUTPUT}}/out_{{N}}_{{M}}{{SUFFIX}}.txt
+cd {{SOFTWARE_DIR}}/run_{{N}}_{{M}}{{SUFFIX}}
+echo {{LEVELS}}
+"""
+
+
+@pytest.fixture
+def fake_slurm(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_DIR", str(tmp_path / "fake_slurm"))
+    monkeypatch.setenv("USER", "me")
+    monkeypatch.delenv("FAKE_SLURM_POLLS", raising=False)
+    monkeypatch.delenv("FAKE_SLURM_STATES", raising=False)
+    monkeypatch.delenv("FAKE_SLURM_SQUEUE_ERRORS", raising=False)
+    (tmp_path / "job.sh").write_text(TEMPLATE)
+    return tmp_path
+
+
+def sbatcher(software_path, nm_list, job_array=False, sacct=True):
+    return SlurmSbatcher(nm_list, "low", "prod", "00:10:00", f"{software_path}/", "job.sh", "results", "outputs",
+                         job_array=job_array,
+                         sbatch=FAKE_SLURM + ["sbatch"],
+                         squeue=FAKE_SLURM + ["squeue"],
+                         # A failing command, as when the accounting is disabled
+                         sacct=FAKE_SLURM + ["sacct"] if sacct else FAKE_SLURM + ["no_sacct"],
+                         poll_interval=0, max_poll_interval=0)
+
+
+@pytest.mark.parametrize("job_id, expected", [
+    ("123", ["123"]),
+    ("123_4", ["123_4"]),
+    ("123_[0-3,7%2]", ["123_0", "123_1", "123_2", "123_3", "123_7"]),
+    ("123_[5]", ["123_5"]),
+    ("123.batch", ["123.batch"]),
+])
+def test_expand_job_id(job_id, expected):
+    assert expand_job_id(job_id) == expected
+
+
+def test_jobs_are_submitted_and_followed_with_sacct(fake_slurm, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_POLLS", "2")
+    monkeypatch.setenv("FAKE_SLURM_STATES", "1001=TIMEOUT")
+    executor = sbatcher(fake_slurm, [(1, 1), (2, 2, 4)])
+
+    job_ids = executor.submit_all_jobs()
+    assert job_ids == ["1000", "1001"]
+    assert (fake_slurm / "run_2_2_l4" / "job_n2_m2_l4.sh").read_text().startswith(
+        "#!/bin/bash\n#SBATCH --job-name=bench_2_2_l4\n#SBATCH --ntasks=4\n#SBATCH --partition=prod\n")
+    assert executor.job_states(job_ids) == {"1000": "RUNNING", "1001": "RUNNING"}
+
+    finished = []
+    assert executor.wait_for_jobs(job_ids, on_finish=lambda *job: finished.append(job)) == {
+        "1000": "COMPLETED", "1001": "TIMEOUT"}
+    assert finished == [("1000", "COMPLETED"), ("1001", "TIMEOUT")]
+
+
+def test_job_states_fall_back_to_squeue(fake_slurm, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_POLLS", "1")
+    executor = sbatcher(fake_slurm, [(1, 1), (2, 2)], sacct=False)
+    job_ids = executor.submit_all_jobs()
+
+    assert executor.job_states(job_ids) == {"1000": "RUNNING", "1001": "RUNNING"}
+    # Left the queue, squeue fails: their final state is unknown
+    assert executor.job_states(job_ids) == {"1000": FINISHED, "1001": FINISHED}
+
+
+def test_squeue_failures_do_not_finish_the_jobs(fake_slurm, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_POLLS", "1")
+    monkeypatch.setenv("FAKE_SLURM_SQUEUE_ERRORS", "2")
+    executor = sbatcher(fake_slurm, [(1, 1)], sacct=False)
+    job_ids = executor.submit_all_jobs()
+
+    # Nothing is known about the jobs while squeue fails
+    assert executor.job_states(job_ids) == {}
+
+    finished = []
+    assert executor.wait_for_jobs(job_ids, on_finish=lambda *job: finished.append(job)) == {"1000": FINISHED}
+    assert finished == [("1000", FINISHED)]
+    # Collected only once squeue answered: the job was still running before it left the queue
+    assert (fake_slurm / "fake_slurm" / "squeue_errors").read_text() == "2"
+    assert '"polls": 0' in (fake_slurm / "fake_slurm" / "jobs.json").read_text()
+
+
+def test_job_array_tasks(fake_slurm, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_POLLS", "1")
+    monkeypatch.setenv("FAKE_SLURM_STATES", "1000_1=OUT_OF_MEMORY")
+    # (1, 3) and (2, 2) share their number of tasks, (1, 1) does not
+    executor = sbatcher(fake_slurm, [(1, 3), (1, 1), (2, 2)], job_array=True)
+
+    assert executor.run() == {(1, 3): "COMPLETED", (1, 1): "COMPLETED", (2, 2): "OUT_OF_MEMORY"}
+    table = (fake_slurm / "array_job_ntasks4.txt").read_text().splitlines()
+    assert table == ["INDEX N M NTOT LEVELS SUFFIX", "0 1 3 4 1 ", "1 2 2 4 1 "]
+    assert "--array=0-1" in (fake_slurm / "fake_slurm" / "jobs.json").read_text()
+
+
+def test_array_directives_are_literal(fake_slurm):
+    executor = sbatcher(fake_slurm, [(1, 3, 2), (2, 2, 2)], job_array=True)
+    assert executor.submit_all_jobs() == ["1000_0", "1000_1"]
+    script = (fake_slurm / "array_job_ntasks4.sh").read_text()
+    header, body = script.split("\n\n# Parameters of this array task", 1)
+
+    # NTOT and LEVELS are shared by the tasks, N, M and SUFFIX come from the command line
+    assert header.splitlines() == ["#!/bin/bash", "#SBATCH --ntasks=4", "#SBATCH --partition=prod",
+                                   "#SBATCH --time=00:10:00"]
+    assert "${BENCH_N}" in body and "{{" not in body
+
+
+def test_fake_sbatch_rejects_shell_variables_in_directives(fake_slurm):
+    script = fake_slurm / "array.sh"
+    script.write_text("#!/bin/bash\n#SBATCH --ntasks=${BENCH_NTOT}\nsrun true\n")
+    result = subprocess.run(FAKE_SLURM + ["sbatch", "--array=0-1", str(script)], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert 'Invalid numeric value "${BENCH_NTOT}" for --ntasks' in result.stderr
+
+    # Directives after the first command are not read
+    script.write_text("#!/bin/bash\nsrun true\n#SBATCH --ntasks=${BENCH_NTOT}\n")
+    assert subprocess.run(FAKE_SLURM + ["sbatch", str(script)], capture_output=True).returncode == 0
+
+
+def test_array_rejects_other_directives_changing_per_task(fake_slurm):
+    (fake_slurm / "job.sh").write_text(TEMPLATE.replace("#SBATCH --time={{TIME}}", "#SBATCH --comment=levels{{LEVELS}}"))
+    executor = sbatcher(fake_slurm, [(1, 1, 1), (1, 1, 2)], job_array=True)
+    with pytest.raises(ValueError, match=r"#SBATCH --comment=levels\{\{LEVELS\}\} changes between the tasks of the array \(LEVELS\)"):
+        executor.submit_all_jobs()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from trace_analysis import analyze_trace, detect_warmup, lag1_autocorrelation, steady_state
+
+
+def trace(warmup, n=400, seed=0):
+    """Slow warm-up iterations followed by a noisy steady state around 1."""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(1.0, 0.01, size=n)
+    x[:warmup] = np.linspace(3.0, 2.0, warmup)
+    return x
+
+
+@pytest.mark.parametrize("warmup", [1, 5, 40])
+def test_detects_the_warmup(warmup):
+    assert detect_warmup(trace(warmup)) == warmup
+
+
+def test_first_exchange_is_always_dropped():
+    x = np.ones(100)
+    assert detect_warmup(x) == 1
+    assert steady_state(x).size == 99
+
+
+def test_level_shift_in_the_steady_state_is_not_warmup():
+    # MSER alone would also drop the iterations before a later, slower phase
+    x = trace(10, n=200)
+    x[60:] += 0.05
+    assert detect_warmup(x) == 10
+
+
+def test_short_traces():
+    assert detect_warmup([]) == 0
+    assert detect_warmup([2.0, 1.0, 1.0]) == 1
+    assert analyze_trace([]) == {"iterations": 0}
+
+
+def test_autocorrelation_and_effective_samples():
+    rng = np.random.default_rng(1)
+    noise = rng.normal(size=20000)
+    assert abs(lag1_autocorrelation(noise)) < 0.05
+    # AR(1) with coefficient 0.8
+    ar = np.empty_like(noise)
+    ar[0] = noise[0]
+    for i in range(1, ar.size):
+        ar[i] = 0.8 * ar[i - 1] + noise[i]
+    assert lag1_autocorrelation(ar) == pytest.approx(0.8, abs=0.02)
+    assert lag1_autocorrelation(np.ones(10)) == 0.0
+
+    stats = analyze_trace(1.0 + 0.01 * ar)
+    assert stats["effective_samples"] == pytest.approx(stats["iterations"] * 0.2 / 1.8, rel=0.15)
@@ -0,0 +1,140 @@
+#################### PING PONG TRACE ANALYSIS ####################
+# The TIMING lines of the ping pongs are printed by rank 0 in iteration
+# order, so every log is a time series:
+#   - the first exchange (connections, buffers allocation) is reported on
+#     its own and never enters the steady state statistics
+#   - the warm-up is detected with the MSER rule (White, 1997): the number
+#     d of leading iterations dropped is the one minimizing the squared
+#     standard error of the mean of the remaining ones,
+#     sum((x[d:] - mean(x[d:]))^2) / (N - d)^2, searched in the first half;
+#     since MSER also cuts at later level shifts, the warm-up stops earlier
+#     if a time falls back in the steady band (median + 3 MAD of the
+#     second half of the trace)
+#   - the steady state is described by its median, its jitter (mean
+#     absolute difference between consecutive iterations) and its lag 1
+#     autocorrelation, with the effective number of independent samples
+#     N (1 - r) / (1 + r) (at most N) that the confidence intervals should use
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from log_ingest import load_all_samples
+
+
+def detect_warmup(samples, max_fraction=0.5):
+    """
+    Number of warm-up iterations of a trace (MSER truncation point), at
+    least 1 so that the first exchange is never part of the steady state.
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    n = x.size
+    if n < 4:
+        return min(1, n)
+    # Sums of the tails x[d:] for every d
+    s1 = np.cumsum(x[::-1])[::-1]
+    s2 = np.cumsum((x * x)[::-1])[::-1]
+    d = np.arange(int(n * max_fraction) + 1)
+    remaining = n - d
+    sse = s2[d] - s1[d] ** 2 / remaining
+    warmup = int(np.argmin(sse / remaining ** 2))
+
+    tail = x[n // 2:]
+    level = np.median(tail)
+    band = level + 3 * 1.4826 * np.median(np.abs(tail - level))
+    settled = np.flatnonzero(x[1:warmup + 1] <= band)
+    if settled.size:
+        warmup = settled[0] + 1
+    return max(1, int(warmup))
+
+
+def lag1_autocorrelation(samples):
+    x = np.asarray(samples, dtype=np.float64)
+    if x.size < 3:
+        return np.nan
+    centered = x - x.mean()
+    denominator = np.dot(centered, centered)
+    if denominator == 0:
+        return 0.0
+    return np.dot(centered[:-1], centered[1:]) / denominator
+
+
+def analyze_trace(samples, max_fraction=0.5):
+    """Warm-up and steady state statistics of a ping pong trace, as a dict."""
+    x = np.asarray(samples, dtype=np.float64)
+    if x.size == 0:
+        return {"iterations": 0}
+    warmup = detect_warmup(x, max_fraction)
+    steady = x[warmup:]
+    r = lag1_autocorrelation(steady)
+    return {
+        "iterations": x.size,
+        "first_exchange": x[0],
+        "warmup_iterations": warmup,
+        "warmup_time": x[:warmup].sum(),
+        "steady_avg": steady.mean() if steady.size else np.nan,
+        "steady_medi": np.median(steady) if steady.size else np.nan,
+        "steady_std": steady.std(ddof=1) if steady.size > 1 else np.nan,
+        "jitter": np.abs(np.diff(steady)).mean() if steady.size > 1 else np.nan,
+        "autocorr": r,
+        "effective_samples": min(steady.size, steady.size * (1 - r) / (1 + r)) if np.isfinite(r) and r > -1 else steady.size,
+    }
+
+
+def steady_state(samples, max_fraction=0.5):
+    """The samples of a trace without its warm-up iterations."""
+    x = np.asarray(samples, dtype=np.float64)
+    return x[detect_warmup(x, max_fraction):]
+
+
+def load_ping_pong_traces(NM_LIST, RAW_TIMES_DIR, PING_PONG_LINE_PREFIX="", CACHE_DIR=None, workers=1):
+    """{(n, m): trace} of the ping pong logs, (n, m, levels) configurations for the sweeps."""
+    requests = []
+    for config in NM_LIST:
+        n, m, levels = (*config, 1)[:3]
+        suffix = "" if levels == 1 else f"_l{levels}"
+        requests.append((os.path.join(RAW_TIMES_DIR, f"ocean_times_n{n}_m{m}{suffix}.txt"), PING_PONG_LINE_PREFIX))
+    return dict(zip(map(tuple, NM_LIST), load_all_samples(requests, CACHE_DIR, workers)))
+
+
+def trace_results(traces, RESULTS_CSV=None, max_fraction=0.5):
+    """DataFrame of analyze_trace for every configuration of traces, saved to RESULTS_CSV if given."""
+    records = []
+    for config, samples in traces.items():
+        records.append({"n": config[0], "m": config[1], **analyze_trace(samples, max_fraction)})
+    df = pd.DataFrame(records)
+    if RESULTS_CSV is not None:
+        os.makedirs(os.path.dirname(RESULTS_CSV), exist_ok=True)
+        df.to_csv(RESULTS_CSV, index=False)
+    return df
+
+
+def make_trace_plot(traces, title, save_path, max_fraction=0.5):
+    """Per iteration times of every configuration, with the warm-up shaded and the steady state median."""
+    traces = {config: samples for config, samples in traces.items() if len(samples) > 0}
+    cols = min(3, len(traces))
+    rows = -(-len(traces) // cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, 3.5 * rows), squeeze=False)
+
+    for ax, (config, samples) in zip(axes.flat, traces.items()):
+        stats = analyze_trace(samples, max_fraction)
+        iterations = np.arange(1, len(samples) + 1)
+        ax.plot(iterations, samples, '-', color='blue', linewidth=0.8, label='Ping pong time')
+        ax.axvspan(0.5, stats["warmup_iterations"] + 0.5, color='orange', alpha=0.3,
+                   label=f'Warm-up ({stats["warmup_iterations"]} iterations)')
+        ax.plot(1, stats["first_exchange"], 'o', color='red', label=f'First exchange {stats["first_exchange"]:.3g} s')
+        ax.axhline(stats["steady_medi"], linestyle='--', color='green', label=f'Steady median {stats["steady_medi"]:.3g} s')
+        ax.set_yscale('log')
+        ax.set_title(f"n={config[0]}, m={config[1]}" + (f", {config[2]} levels" if len(config) > 2 else ""))
+        ax.set_xlabel('Iteration')
+        ax.set_ylabel('Time (seconds)')
+        ax.legend(fontsize='small')
+        ax.grid(True)
+    for ax in axes.flat[len(traces):]:
+        ax.set_visible(False)
+
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
@@ -8,13 +8,16 @@
 #SBATCH --exclusive
 #SBATCH --mem=90G 
 
-module load tools/nco/4.7.6
-module load compiler/gcc/11.2.0
-module load compiler/intel/23.2.1
-module load mpi/intelmpi/2021.10.0
-module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+# Environment of the cluster (no modules on a workstation, see local_executor.py)
+if command -v module > /dev/null; then
+    module load tools/nco/4.7.6
+    module load compiler/gcc/11.2.0
+    module load compiler/intel/23.2.1
+    module load mpi/intelmpi/2021.10.0
+    module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+fi
 
-cd /scratch/globc/ferrario/xios_experiments/benchmarks/oasis
+cd {{SOFTWARE_DIR}}
 
 make
 
@@ -36,7 +39,7 @@ for i in $(seq 1 {{INTERP_ITERATIONS}}); do
 
     rm -f rmp_*
     echo "Running interpolation iteration $i"
-    mpirun -np {{N}} ../oasis_ping_pong.exe ocean_component {{GRID_NAME_SRC}} {{GRID_TYPE_SRC}} true : -np {{M}} ../oasis_ping_pong.exe atmos_component {{GRID_NAME_DST}} {{GRID_TYPE_DST}} true >> ../outputs_interp/ocean_times_n{{N}}_m{{M}}.txt
+    mpirun $MPIRUN_OPTIONS -np {{N}} ../oasis_ping_pong.exe ocean_component {{GRID_NAME_SRC}} {{GRID_TYPE_SRC}} true : -np {{M}} ../oasis_ping_pong.exe atmos_component {{GRID_NAME_DST}} {{GRID_TYPE_DST}} true >> ../outputs_interp/ocean_times_n{{N}}_m{{M}}.txt
 
 done
 
@@ -14,6 +14,7 @@ program basic_couple
     character(len=255) :: model_id
     logical :: only_interpolation
     integer :: local_comm
+    integer :: levels = 1 ! Levels of the exchanged fields
 
     ! Mpi initialization
     call MPI_INIT_THREAD(MPI_THREAD_MULTIPLE, provided, ierr)
@@ -27,7 +28,7 @@ program basic_couple
 
     ! Get model_id from command line argument if provided
     argc = command_argument_count()
-        if (argc == 2) then
+        if (argc == 2 .or. argc == 3) then
         call get_command_argument(1, arg)
         model_id = trim(arg)
         if (model_id /= "oce" .and. model_id /= "atm") then
@@ -45,9 +46,18 @@ program basic_couple
             call MPI_FINALIZE(ierr)
             stop
         end if
+        if (argc == 3) then
+            call get_command_argument(3, arg)
+            read(arg, *) levels
+            if (levels < 1) then
+                print *, "Error: third argument must be a positive number of levels."
+                call MPI_FINALIZE(ierr)
+                stop
+            end if
+        end if
     else 
         ! Abort
-        print *, "Usage: ./executable <oce|atm> <true|false>"
+        print *, "Usage: ./executable <oce|atm> <true|false> [levels]"
         call MPI_FINALIZE(ierr)
         stop
     end if
@@ -136,6 +146,7 @@ contains
         integer, intent(in) :: local_comm
         type(coupling_config), intent(in) :: config
         type(field_description), intent(out) :: field_desc
+        integer :: k
         call xios_set_timestep(config%timestep)
 
         if (model_id=="oce") then
@@ -145,6 +156,20 @@ contains
             call init_domain(local_comm, "domain_atm", config, config%domain, field_desc)
             call init_domain(local_comm, "domain_oce_interp", config, config%domain, field_desc)
         end if
+
+        ! Fields with levels: the exchanged fields are moved to the 3D grids
+        if (levels > 1) then
+            call xios_set_axis_attr("axis_lev", n_glo=levels, value=[(dble(k), k = 1, levels)])
+            if (model_id=="oce") then
+                call xios_set_field_attr("field2D_send", grid_ref="grid_3D_oce")
+                call xios_set_field_attr("atm_to_oce", grid_ref="grid_3D_atm")
+                call xios_set_field_attr("field2D_recv", grid_ref="grid_3D_atm_interp")
+            else if (model_id=="atm") then
+                call xios_set_field_attr("field2D_send", grid_ref="grid_3D_atm")
+                call xios_set_field_attr("oce_to_atm", grid_ref="grid_3D_oce")
+                call xios_set_field_attr("field2D_recv", grid_ref="grid_3D_oce_interp")
+            end if
+        end if
         
         call xios_close_context_definition()
 
@@ -154,12 +179,12 @@ contains
     implicit none 
         type(coupling_config), intent(inout):: config 
         type(field_description), intent(in) :: field_desc
-        double precision, allocatable:: field_send(:,:), field_recv(:,:)
+        double precision, allocatable:: field_send(:,:,:), field_recv(:,:,:)
         integer :: curr_timestep
         double precision :: start_time, end_time
         
-        if (model_id == "oce") allocate(field_send(field_desc%ni, field_desc%nj))
-        allocate(field_recv(field_desc%ni, field_desc%nj))
+        if (model_id == "oce") allocate(field_send(field_desc%ni, field_desc%nj, levels))
+        allocate(field_recv(field_desc%ni, field_desc%nj, levels))
 
         ! if(model_id == "oce") call init_field2d_gulfstream(field_desc%ni_glo, field_desc%nj_glo, field_desc%lon, field_desc%lat, field_desc%mask, field_send_original)
         config%end_date = config%start_date + config%duration
@@ -175,14 +200,24 @@ contains
                 field_send = rank + 1.0d0 
                 call MPI_Barrier(local_comm, ierr)
                 start_time = MPI_Wtime()
-                call xios_send_field("field2D_send", field_send)
-                call xios_recv_field("field2D_recv", field_recv)
+                if (levels == 1) then
+                    call xios_send_field("field2D_send", field_send(:,:,1))
+                    call xios_recv_field("field2D_recv", field_recv(:,:,1))
+                else
+                    call xios_send_field("field2D_send", field_send)
+                    call xios_recv_field("field2D_recv", field_recv)
+                end if
                 call MPI_Barrier(local_comm, ierr)
                 end_time = MPI_Wtime()
                 if (rank == 0) print *, 'TIMING:', end_time - start_time
             else if (model_id=="atm") then
-                call xios_recv_field("field2D_recv", field_recv)
-                call xios_send_field("field2D_send", field_recv)
+                if (levels == 1) then
+                    call xios_recv_field("field2D_recv", field_recv(:,:,1))
+                    call xios_send_field("field2D_send", field_recv(:,:,1))
+                else
+                    call xios_recv_field("field2D_recv", field_recv)
+                    call xios_send_field("field2D_send", field_recv)
+                end if
             end if
 
             config%curr_date = config%curr_date + config%timestep
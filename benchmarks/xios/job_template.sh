@@ -1,25 +1,28 @@
 #!/bin/bash
-#SBATCH --job-name=bench_n{{N}}_m{{M}}
-#SBATCH --output=results/out_n{{N}}_m{{M}}.txt
-#SBATCH --error=results/err_n{{N}}_m{{M}}.txt
+#SBATCH --job-name=bench_n{{N}}_m{{M}}{{SUFFIX}}
+#SBATCH --output=results/out_n{{N}}_m{{M}}{{SUFFIX}}.txt
+#SBATCH --error=results/err_n{{N}}_m{{M}}{{SUFFIX}}.txt
 #SBATCH --ntasks={{NTOT}}
 #SBATCH --time={{TIME}}
 #SBATCH --partition={{PARTITION}}
 #SBATCH --exclusive
 #SBATCH --mem=90G 
 
-module load tools/nco/4.7.6
-module load compiler/gcc/11.2.0
-module load compiler/intel/23.2.1
-module load mpi/intelmpi/2021.10.0
-module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+# Environment of the cluster (no modules on a workstation, see local_executor.py)
+if command -v module > /dev/null; then
+    module load tools/nco/4.7.6
+    module load compiler/gcc/11.2.0
+    module load compiler/intel/23.2.1
+    module load mpi/intelmpi/2021.10.0
+    module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+fi
 
-cd /scratch/globc/ferrario/xios_experiments/benchmarks/xios
+cd {{SOFTWARE_DIR}}
 
 make
 
 # Folder already created
-RUN_DIR="run_{{N}}_{{M}}"
+RUN_DIR="run_{{N}}_{{M}}{{SUFFIX}}"
 cd "$RUN_DIR"
 
 if [[ "$1" == "true" ]]; then
@@ -32,12 +35,12 @@ else
     cp ../original_data/iodef_{{RES}}.xml iodef.xml
 fi
 
-echo "Running the ping-pong test with N={{N}} and M={{M}}"
-mpirun -np {{N}} ../12_ping_pong.exe oce false : -np {{M}} ../12_ping_pong.exe atm false > ../outputs/ocean_times_n{{N}}_m{{M}}.txt
+echo "Running the ping-pong test with N={{N}}, M={{M}} and {{LEVELS}} levels"
+mpirun $MPIRUN_OPTIONS -np {{N}} ../12_ping_pong.exe oce false {{LEVELS}} : -np {{M}} ../12_ping_pong.exe atm false {{LEVELS}} > ../outputs/ocean_times_n{{N}}_m{{M}}{{SUFFIX}}.txt
 
 
 # If interpolation is enabled, extract timing
 if [[ "$1" == "true" ]]; then
     # Add the time taken for interpolation to output
-    grep "compute" xios_client_*.out | awk -F " " '{print $8}'  > ../outputs/interpolations_times_n{{N}}_m{{M}}.txt
+    grep "compute" xios_client_*.out | awk -F " " '{print $8}'  > ../outputs/interpolations_times_n{{N}}_m{{M}}{{SUFFIX}}.txt
 fi
\ No newline at end of file
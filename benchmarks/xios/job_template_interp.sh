@@ -8,13 +8,16 @@
 #SBATCH --exclusive
 #SBATCH --mem=90G 
 
-module load tools/nco/4.7.6
-module load compiler/gcc/11.2.0
-module load compiler/intel/23.2.1
-module load mpi/intelmpi/2021.10.0
-module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+# Environment of the cluster (no modules on a workstation, see local_executor.py)
+if command -v module > /dev/null; then
+    module load tools/nco/4.7.6
+    module load compiler/gcc/11.2.0
+    module load compiler/intel/23.2.1
+    module load mpi/intelmpi/2021.10.0
+    module load lib/netcdf-fortran/4.4.4_phdf5_1.10.4
+fi
 
-cd /scratch/globc/ferrario/xios_experiments/benchmarks/xios
+cd {{SOFTWARE_DIR}}
 
 make
 
@@ -32,7 +35,7 @@ for i in $(seq 1 {{INTERP_ITERATIONS}}); do
     echo "Running interpolation iteration $i"
     echo "ppn: $((SLURM_NTASKS / SLURM_JOB_NUM_NODES))"
 
-    mpirun -genv I_MPI_PIN_DOMAIN=auto -genv I_MPI_JOB_RESPECT_PROCESS_PLACEMENT=0 \
+    mpirun $MPIRUN_OPTIONS -genv I_MPI_PIN_DOMAIN=auto -genv I_MPI_JOB_RESPECT_PROCESS_PLACEMENT=0 \
        -ppn $((SLURM_NTASKS / SLURM_JOB_NUM_NODES)) \
        -np {{N}} ../12_ping_pong.exe oce true : -np {{M}} ../12_ping_pong.exe atm true > ../outputs_interp/ocean_times_n{{N}}_m{{M}}.txt
 